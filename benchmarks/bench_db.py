@@ -0,0 +1,80 @@
+"""Compares point reads and writes of DatabaseManager against a connection-per-statement baseline.
+
+Usage: PYTHONPATH=src python benchmarks/bench_db.py [--notes 2000]
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from notter import sql_statements
+from notter.db_manager import DatabaseManager
+from notter.model import Content, Note, NoteType, NoteWithContent
+
+
+class LegacyDatabaseManager(DatabaseManager):
+    # The previous behaviour: connect, execute, commit and close for every statement, reads included
+    def run_statement(self, statement: str, values: tuple | None = None, many: bool = False):
+        conn = sqlite3.connect(self.db_name)
+        try:
+            cursor = conn.execute(statement, values or ())
+            conn.commit()
+            return cursor.fetchall() if many else cursor.fetchone()
+        finally:
+            conn.close()
+
+
+def make_notes(count: int) -> list[NoteWithContent]:
+    return [
+        NoteWithContent(
+            Note(str(uuid.uuid4()), f"src/module_{idx % 100}.py", idx, NoteType.TODO), Content(f"TODO {idx}")
+        )
+        for idx in range(count)
+    ]
+
+
+def run(db_manager: DatabaseManager, notes: list[NoteWithContent]) -> dict[str, float]:
+    db_manager.create_tables()
+    timings = {}
+
+    start = time.perf_counter()
+    for note in notes:
+        db_manager.insert(note)
+    timings["writes"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for note in notes:
+        db_manager.get_by_filepath_and_line(note.note.filepath, note.note.line)
+    timings["reads"] = time.perf_counter() - start
+
+    db_manager.run_statement(sql_statements.GET_NOTES, None, True)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notes", type=int, default=2000)
+    args = parser.parse_args()
+
+    notes = make_notes(args.notes)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy = run(LegacyDatabaseManager(str(Path(tmp_dir) / "legacy.db")), notes)
+        pooled_manager = DatabaseManager(str(Path(tmp_dir) / "pooled.db"))
+        pooled = run(pooled_manager, notes)
+        pooled_manager.close()
+
+    print(f"{args.notes} point writes and reads")
+    for operation in ("writes", "reads"):
+        per_op_legacy = legacy[operation] / args.notes * 1e6
+        per_op_pooled = pooled[operation] / args.notes * 1e6
+        print(
+            f"{operation:>6}: connection per statement {per_op_legacy:8.1f} us/op, "
+            f"pooled {per_op_pooled:8.1f} us/op, speedup {legacy[operation] / pooled[operation]:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
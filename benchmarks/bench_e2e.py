@@ -0,0 +1,261 @@
+"""End-to-end benchmark of discovery and the database on a synthetic repository.
+
+Usage: PYTHONPATH=src python benchmarks/bench_e2e.py [--files 2000] [--output results.json]
+                                                     [--baseline previous.json] [--max-regression 0.25]
+
+Measures the throughput of the walk, read, parse, upsert, prune, search and export phases on their own, and of whole
+`discover` runs on an empty database (cold), after changing a share of the files (warm) and with nothing changed
+(no-change). Results are written as JSON. Given the results of a previous commit as `--baseline`, every phase that
+got slower by more than its threshold is reported and the script exits with 1.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+from synthetic import TAGS, RepositorySpec, generate_repository, modify_files, parse_extensions
+
+import notter.constants as ncons
+from notter.controller import NoteController
+from notter.db_manager import DatabaseManager
+from notter.explorers.base import LexicalExplorer
+from notter.explorers.parallel import parse_batch
+from notter.explorers.tags import TagMatcher
+from notter.export import export_notes
+from notter.model import Comment, Content, Note, NoteWithContent
+from notter.notter import Notter
+
+SEARCH_QUERIES = ["cache", "parser index", "time*", '"retry timeout"', "schema worker"]
+SUBSTRING_QUERIES = ["ach", "arse", "ocke", "andl"]
+
+
+def measure(function: Callable[[], Any], repeat: int = 1) -> tuple[dict[str, float], Any]:
+    """Runs the function `repeat` times, keeps the fastest run."""
+    best: dict[str, float] = {}
+    result = None
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = function()
+        timing = {"seconds": time.perf_counter() - wall, "cpu_seconds": time.process_time() - cpu}
+        if not best or timing["seconds"] < best["seconds"]:
+            best = timing
+    return best, result
+
+
+def throughput(timing: dict[str, float], items: int, nbytes: int | None = None) -> dict[str, float]:
+    seconds = max(timing["seconds"], 1e-9)
+    result = {**timing, "items": items, "items_per_second": items / seconds}
+    if nbytes is not None:
+        result["bytes"] = nbytes
+        result["mib_per_second"] = nbytes / seconds / 1024 / 1024
+    return result
+
+
+def read_files(files: list[str], readers: int) -> list[tuple[str, str]]:
+    async def read_all() -> list[tuple[str, str]]:
+        semaphore = asyncio.Semaphore(readers)
+
+        async def read(path: str) -> tuple[str, str]:
+            async with semaphore:
+                return path, await LexicalExplorer._read_file_async(path)
+
+        return list(await asyncio.gather(*(read(path) for path in files)))
+
+    return asyncio.run(read_all())
+
+
+def to_notes(comments: list[Comment]) -> list[NoteWithContent]:
+    return [
+        NoteWithContent(Note(str(uuid.uuid4()), comment.filepath, comment.line, comment.type), Content(comment.text))
+        for comment in comments
+    ]
+
+
+def bench_phases(src_path: str, work_dir: str, repeat: int, readers: int) -> dict[str, dict[str, float]]:
+    results = {}
+    notter = Notter()
+    notter.config[ncons.SRC_PATH] = src_path
+    explorer = LexicalExplorer(notter)
+
+    timing, files = measure(explorer.find_files, repeat)
+    results["walk"] = throughput(timing, len(files))
+
+    timing, contents = measure(lambda: read_files(files, readers), repeat)
+    nbytes = sum(len(content.encode()) for _, content in contents)
+    results["read"] = throughput(timing, len(contents), nbytes)
+
+    # Serial parsing of the files that contain a tag, like a single parser worker does
+    matcher = TagMatcher(TAGS)
+    tagged = [(path, content) for path, content in contents if matcher.may_contain_todo(content)]
+    timing, comments = measure(lambda: parse_batch(tagged, matcher), repeat)
+    results["parse"] = throughput(timing, len(tagged), sum(len(content.encode()) for _, content in tagged))
+
+    db_manager = DatabaseManager(os.path.join(work_dir, "phases.db"))
+    db_manager.create_tables()
+    notes = to_notes(comments)
+    keys = [(note.note.filepath, note.note.line) for note in notes]
+    timing, _ = measure(lambda: db_manager.sync_notes(notes, keys))
+    results["upsert"] = throughput(timing, len(notes))
+
+    # Every tenth note disappears
+    kept = [key for idx, key in enumerate(keys) if idx % 10]
+    timing, pruned = measure(lambda: db_manager.prune(kept))
+    results["prune"] = throughput(timing, len(pruned))
+
+    def search() -> int:
+        found = sum(len(db_manager.full_text_search(query, 50)) for query in SEARCH_QUERIES)
+        return found + sum(len(db_manager.search(query)) for query in SUBSTRING_QUERIES)
+
+    timing, _ = measure(search, repeat)
+    results["search"] = throughput(timing, len(SEARCH_QUERIES) + len(SUBSTRING_QUERIES))
+
+    export_path = os.path.join(work_dir, "todos.ndjson")
+    timing, exported = measure(lambda: export_notes(db_manager.iter_all(), export_path, "ndjson"), repeat)
+    results["export"] = throughput(timing, exported, os.path.getsize(export_path))
+    db_manager.close()
+    return results
+
+
+def bench_discover(src_path: str, workers: int, modify_share: float) -> dict[str, dict[str, float]]:
+    results = {}
+    notter = Notter()
+    notter.config[ncons.DISCOVER_WORKERS] = workers
+    # Notter reports the folders it creates and the config it sets on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        notter.configure(Path(src_path))
+        controller = NoteController(notter)
+    tags = list(TAGS)
+
+    def discover() -> int:
+        return len(asyncio.run(controller.discover(tags)))
+
+    timing, found = measure(discover)
+    stats = controller.explorer.stats
+    results["discover_cold"] = throughput(timing, stats.files, stats.bytes) | {"comments": found}
+
+    timing, found = measure(discover)
+    results["discover_no_change"] = throughput(timing, len(controller.explorer.find_files())) | {"comments": found}
+
+    modified = modify_files(src_path, modify_share)
+    timing, found = measure(discover)
+    results["discover_warm"] = throughput(timing, len(modified)) | {"comments": found}
+    controller.close()
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=os.path.dirname(__file__)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, max_regression: float, thresholds: dict[str, float]) -> list[str]:
+    """Returns the phases that got slower than the baseline by more than their threshold."""
+    regressions = []
+    print(f"\n{'phase':<20} {'baseline':>10} {'current':>10} {'change':>8}")
+    for phase, result in results["results"].items():
+        previous = baseline.get("results", {}).get(phase)
+        if previous is None:
+            continue
+        ratio = result["seconds"] / max(previous["seconds"], 1e-9)
+        limit = thresholds.get(phase, max_regression)
+        failed = ratio > 1 + limit
+        marker = "  REGRESSION" if failed else ""
+        print(f"{phase:<20} {previous['seconds']:>9.3f}s {result['seconds']:>9.3f}s {ratio - 1:>+7.0%}{marker}")
+        if failed:
+            regressions.append(phase)
+    return regressions
+
+
+def parse_thresholds(value: str) -> dict[str, float]:
+    return {phase: float(limit) for phase, _, limit in (item.partition("=") for item in value.split(","))}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--extensions", type=parse_extensions, help="Weights like `.py=3,.js=1`, all by default.")
+    parser.add_argument("--min-lines", type=int, default=20)
+    parser.add_argument("--max-lines", type=int, default=400)
+    parser.add_argument("--comment-density", type=float, default=0.1)
+    parser.add_argument("--todo-density", type=float, default=0.2)
+    parser.add_argument("--max-depth", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per phase, the fastest one is kept.")
+    parser.add_argument("--workers", type=int, default=0, help="Parser processes of the discover runs.")
+    parser.add_argument("--readers", type=int, default=ncons.FILE_READ_CHUNK_SIZE)
+    parser.add_argument("--modify", type=float, default=0.05, help="Share of the files changed before a warm run.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Results of a previous run to compare against.")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed slowdown, 0.25 is 25%%.")
+    parser.add_argument("--threshold", type=parse_thresholds, default={}, help="Per phase, like `walk=0.5,read=1`.")
+    args = parser.parse_args()
+
+    spec = RepositorySpec(
+        files=args.files,
+        min_lines=args.min_lines,
+        max_lines=args.max_lines,
+        comment_density=args.comment_density,
+        todo_density=args.todo_density,
+        max_depth=args.max_depth,
+        seed=args.seed,
+    )
+    if args.extensions:
+        spec.extensions = args.extensions
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        src_path = os.path.join(tmp_dir, "src")
+        repository = generate_repository(src_path, spec)
+        results = bench_phases(src_path, tmp_dir, args.repeat, args.readers)
+        results.update(bench_discover(src_path, args.workers, args.modify))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "spec": asdict(spec),
+        "repository": asdict(repository),
+        "results": results,
+    }
+
+    print(f"{repository.files} files, {repository.bytes / 1024 / 1024:.1f} MiB, {repository.todos} todos")
+    for phase, result in results.items():
+        rate = f"{result['items_per_second']:12.0f} items/s"
+        if "mib_per_second" in result:
+            rate += f" {result['mib_per_second']:8.1f} MiB/s"
+        print(f"{phase:<20} {result['seconds']:8.3f} s {rate}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if regressions := compare(report, baseline, args.max_regression, args.threshold):
+            print(f"\nFAIL: {', '.join(regressions)} regressed by more than the threshold")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Peak memory of a full discovery on a synthetic repository.
+
+Usage: PYTHONPATH=src python benchmarks/bench_memory.py [--files 2000] [--comment-density 0.3] [--max-mib 400]
+
+Every run discovers in a fresh process, whose peak RSS is reported along with the RSS after the imports, so that the
+difference is what the discovery itself takes. Files are parsed in the measured process (one worker), where the
+comments live. Exits with 1 if the peak exceeds `--max-mib`.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from synthetic import TAGS, RepositorySpec, generate_repository
+
+
+def max_rss_kib(who: int = resource.RUSAGE_SELF) -> float:
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / 1024 if sys.platform == "darwin" else rss
+
+
+def measure(src_path: str) -> None:
+    """Runs in the child process, prints its measurements as JSON."""
+    import notter.constants as ncons
+    from notter.controller import NoteController
+    from notter.notter import Notter
+
+    notter = Notter()
+    notter.config[ncons.DISCOVER_WORKERS] = 1
+    with contextlib.redirect_stdout(io.StringIO()):
+        notter.configure(Path(src_path))
+        controller = NoteController(notter)
+    # Loads the explorers and the parser before the baseline is taken
+    controller.explorer.find_files()
+    baseline = max_rss_kib()
+
+    comments = asyncio.run(controller.discover(list(TAGS)))
+    print(json.dumps({"baseline_kib": baseline, "peak_kib": max_rss_kib(), "comments": len(comments)}))
+    controller.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--min-lines", type=int, default=20)
+    parser.add_argument("--max-lines", type=int, default=400)
+    parser.add_argument("--comment-density", type=float, default=0.3)
+    parser.add_argument("--todo-density", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-mib", type=float, help="Fail if the peak RSS exceeds this many MiB.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args.child)
+        return
+
+    spec = RepositorySpec(
+        files=args.files,
+        min_lines=args.min_lines,
+        max_lines=args.max_lines,
+        comment_density=args.comment_density,
+        todo_density=args.todo_density,
+        seed=args.seed,
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        src_path = os.path.join(tmp_dir, "src")
+        repository = generate_repository(src_path, spec)
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", src_path], capture_output=True, text=True, check=True
+        ).stdout
+    result = json.loads(output.splitlines()[-1])
+
+    peak_mib = result["peak_kib"] / 1024
+    discovery_kib = result["peak_kib"] - result["baseline_kib"]
+    print(f"{repository.files} files, {repository.bytes / 1024 / 1024:.1f} MiB, {result['comments']} comments")
+    print(f"baseline  {result['baseline_kib'] / 1024:8.1f} MiB")
+    print(f"peak      {peak_mib:8.1f} MiB")
+    per_comment = discovery_kib * 1024 / max(result["comments"], 1)
+    print(f"discovery {discovery_kib / 1024:8.1f} MiB, {per_comment:.0f} B/comment")
+
+    if args.max_mib is not None and peak_mib > args.max_mib:
+        print(f"\nFAIL: peak RSS {peak_mib:.1f} MiB exceeds {args.max_mib:.1f} MiB")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
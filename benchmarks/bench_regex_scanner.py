@@ -0,0 +1,95 @@
+"""Compares the single-pass RegexExplorer scanner against the previous per-pattern scanner.
+
+Usage: PYTHONPATH=src python benchmarks/bench_regex_scanner.py [--size-mb 10] [--repeat 3] [--skip-legacy]
+
+The legacy scanner is quadratic in the number of comments, on 10 MiB inputs it takes several minutes. The scanner is
+also timed on unterminated block comments, which lazy patterns like `/\*.*?\*/` retried from every opener.
+"""
+
+import argparse
+import random
+import re
+import time
+
+from notter.explorers.base import LexicalExplorer
+from notter.explorers.c import CExplorer
+from notter.model import Comment
+
+TAGS = ["todo", "fixme"]
+LEGACY_SINGLE_LINE_PATTERNS = [r"//.*"]
+LEGACY_MULTI_LINE_PATTERNS = [r"/\*.*?\*/"]
+
+
+def legacy_discover(filepath: str, file_content: str, tags: list[str]) -> list[Comment]:
+    # The scanner as it was before the combined pattern: one pass per pattern, lines counted from the file start
+    comments: list[Comment] = []
+
+    for pattern in LEGACY_SINGLE_LINE_PATTERNS:
+        for match in re.finditer(pattern, file_content):
+            line_number = file_content.count("\n", 0, match.start()) + 1
+            note_type = LexicalExplorer.determine_note_type(match.group(0), tags)
+            comments.append(Comment(filepath, match.group(0), line_number, note_type, multiline=False))
+
+    for pattern in LEGACY_MULTI_LINE_PATTERNS:
+        for match in re.finditer(pattern, file_content, re.DOTALL):
+            line_number = file_content.count("\n", 0, match.start()) + 1
+            note_type = LexicalExplorer.determine_note_type(match.group(0), tags)
+            comments.append(Comment(filepath, match.group(0), line_number, note_type, multiline="\n" in match.group(0)))
+
+    return comments
+
+
+def generate_source(size: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    chunks: list[str] = []
+    total = 0
+    while total < size:
+        roll = rng.random()
+        if roll < 0.25:
+            chunk = f"int value_{total} = {rng.randint(0, 1000)}; // TODO: check value_{total}\n"
+        elif roll < 0.35:
+            chunk = f"/* generated block {total}\n * FIXME: regenerate\n */\n"
+        elif roll < 0.6:
+            chunk = f"// plain comment {total}\n"
+        else:
+            chunk = f"static void fn_{total}(void) {{ return; }}\n"
+        chunks.append(chunk)
+        total += len(chunk)
+    return "".join(chunks)
+
+
+def measure(function, content: str, repeat: int) -> tuple[float, list[Comment]]:
+    best, comments = float("inf"), []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        comments = function("generated.c", content, TAGS)
+        best = min(best, time.perf_counter() - start)
+    return best, comments
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    content = generate_source(int(args.size_mb * 1024 * 1024))
+    new_time, new_comments = measure(CExplorer._discover_comments_in_file, content, args.repeat)
+    print(f"input: {len(content) / 1024 / 1024:.1f} MiB, {content.count(chr(10))} lines, {len(new_comments)} comments")
+    print(f"single-pass scanner: {new_time:8.3f} s")
+    for openers in (10_000, 20_000, 40_000):
+        unterminated_time, _ = measure(CExplorer._discover_comments_in_file, "/* x\n" * openers, args.repeat)
+        print(f"{openers} unterminated /*: {unterminated_time:8.3f} s")
+    if args.skip_legacy:
+        return
+
+    legacy_time, legacy_comments = measure(legacy_discover, content, 1)
+    key = lambda comment: (comment.line, comment.text)  # noqa: E731
+    assert sorted(legacy_comments, key=key) == sorted(new_comments, key=key), "scanners disagree"
+    print(f"legacy scanner:      {legacy_time:8.3f} s")
+    print(f"speedup:             {legacy_time / new_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
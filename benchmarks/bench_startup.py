@@ -0,0 +1,74 @@
+"""Measures the import time of the CLI with `python -X importtime` and fails when it exceeds a budget.
+
+Usage: PYTHONPATH=src python benchmarks/bench_startup.py [--module notter.cli] [--repeat 10] [--max-ms 120]
+
+The median of the runs is compared against the budget, so the script can gate CI. It also fails when the CLI imports
+modules that should only be loaded by the commands that need them, e.g. an explorer or asyncio.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Must not be imported just to parse the command line
+DEFERRED_MODULES = ["asyncio", "aiofiles", "notter.controller", "notter.explorers.base", "notter.explorers.python"]
+
+
+def measure(module: str) -> tuple[float, dict[str, int]]:
+    """Returns the cumulative import time of the module in milliseconds and the cumulative time of every module it
+    imported, in microseconds."""
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+
+    # Lines look like `import time:       123 |       456 |   package.module`
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    return modules[module] / 1000, modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="notter.cli")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=120.0, help="Budget for the median import time.")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to print.")
+    args = parser.parse_args()
+
+    # The first run compiles the bytecode of the package
+    measure(args.module)
+    timings = []
+    for _ in range(args.repeat):
+        elapsed, modules = measure(args.module)
+        timings.append(elapsed)
+
+    median = statistics.median(timings)
+    print(f"import {args.module}: median {median:.1f} ms, min {min(timings):.1f} ms over {args.repeat} runs")
+    print("slowest imports (cumulative):")
+    for name, cumulative in sorted(modules.items(), key=lambda item: item[1], reverse=True)[1 : args.top + 1]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if eager := [name for name in DEFERRED_MODULES if name in modules]:
+        print(f"FAIL: imported eagerly: {', '.join(eager)}")
+        failed = True
+    if median > args.max_ms:
+        print(f"FAIL: {median:.1f} ms exceeds the budget of {args.max_ms:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Generates deterministic synthetic source trees for the benchmarks.
+
+Usage: PYTHONPATH=src python benchmarks/synthetic.py OUTPUT_DIR [--files 1000] [--seed 42]
+
+The same parameters and seed always produce the same files, byte for byte, so that timings of different commits are
+measured on identical input.
+"""
+
+import argparse
+import json
+import os
+import random
+from dataclasses import asdict, dataclass, field
+
+import notter.constants as ncons
+
+# Line comment prefix per extension, the statements around the comments are valid enough for every explorer
+LINE_COMMENTS = {
+    ncons.PYTHON_EXT: "#",
+    ncons.RUBY_EXT: "#",
+    ncons.PERL_EXT: "#",
+    ncons.R_EXT: "#",
+    ncons.LUA_EXT: "--",
+    ncons.HASKELL_EXT: "--",
+}
+DEFAULT_LINE_COMMENT = "//"
+STATEMENTS = {
+    ncons.PYTHON_EXT: "value_{idx} = compute({idx}, 'text')",
+    ncons.RUBY_EXT: "value_{idx} = compute({idx}, 'text')",
+    ncons.PERL_EXT: "my $value_{idx} = compute({idx}, 'text');",
+    ncons.R_EXT: "value_{idx} <- compute({idx}, 'text')",
+    ncons.LUA_EXT: "local value_{idx} = compute({idx}, 'text')",
+    ncons.HASKELL_EXT: 'value{idx} = compute {idx} "text"',
+}
+DEFAULT_STATEMENT = 'value_{idx} = compute({idx}, "text");'
+TAGS = ["TODO", "FIXME"]
+WORDS = "cache parser index query buffer socket retry timeout config token handler worker schema".split()
+
+
+@dataclass
+class RepositorySpec:
+    files: int = 1000
+    # Relative weight per extension, every supported extension is equally likely by default
+    extensions: dict[str, float] = field(default_factory=lambda: dict.fromkeys(ncons.SUPPORTED_EXTENSIONS, 1.0))
+    min_lines: int = 20
+    max_lines: int = 400
+    # Share of the lines that are comments, and of the comments that contain a tag
+    comment_density: float = 0.1
+    todo_density: float = 0.2
+    max_depth: int = 4
+    dirs_per_level: int = 4
+    seed: int = 42
+
+
+@dataclass
+class RepositoryStats:
+    files: int = 0
+    bytes: int = 0
+    lines: int = 0
+    comments: int = 0
+    todos: int = 0
+    files_per_extension: dict[str, int] = field(default_factory=dict)
+
+
+def parse_extensions(value: str) -> dict[str, float]:
+    """Parses `.py=3,.js=1` into weights, extensions without a weight count 1."""
+    weights = {}
+    for item in value.split(","):
+        ext, _, weight = item.strip().partition("=")
+        weights[ext if ext.startswith(".") else f".{ext}"] = float(weight or 1)
+    return weights
+
+
+def generate_file(rng: random.Random, ext: str, spec: RepositorySpec, stats: RepositoryStats) -> str:
+    prefix = LINE_COMMENTS.get(ext, DEFAULT_LINE_COMMENT)
+    statement = STATEMENTS.get(ext, DEFAULT_STATEMENT)
+    lines = []
+    for idx in range(rng.randint(spec.min_lines, spec.max_lines)):
+        if rng.random() >= spec.comment_density:
+            lines.append(statement.format(idx=idx))
+            continue
+
+        words = " ".join(rng.choices(WORDS, k=rng.randint(3, 10)))
+        if rng.random() < spec.todo_density:
+            lines.append(f"{prefix} {rng.choice(TAGS)}: {words}")
+            stats.todos += 1
+        else:
+            lines.append(f"{prefix} {words}")
+        stats.comments += 1
+    stats.lines += len(lines)
+    return "\n".join(lines) + "\n"
+
+
+def generate_directories(rng: random.Random, spec: RepositorySpec) -> list[str]:
+    directories = [""]
+    frontier = [""]
+    for _ in range(spec.max_depth):
+        frontier = [
+            os.path.join(parent, f"pkg_{len(directories) + idx}")
+            for parent in frontier
+            for idx in range(rng.randint(1, spec.dirs_per_level))
+        ]
+        directories.extend(frontier)
+    return directories
+
+
+def generate_repository(root: str, spec: RepositorySpec) -> RepositoryStats:
+    """Writes `spec.files` files below `root`, spread over a directory tree at most `spec.max_depth` levels deep."""
+    rng = random.Random(spec.seed)
+    stats = RepositoryStats()
+    directories = generate_directories(rng, spec)
+    extensions = sorted(spec.extensions)
+    weights = [spec.extensions[ext] for ext in extensions]
+
+    for idx in range(spec.files):
+        ext = rng.choices(extensions, weights)[0]
+        directory = os.path.join(root, rng.choice(directories))
+        os.makedirs(directory, exist_ok=True)
+        content = generate_file(rng, ext, spec, stats)
+        with open(os.path.join(directory, f"module_{idx}{ext}"), "w", encoding="utf-8") as file:
+            file.write(content)
+
+        stats.files += 1
+        stats.bytes += len(content.encode())
+        stats.files_per_extension[ext] = stats.files_per_extension.get(ext, 0) + 1
+    return stats
+
+
+def modify_files(root: str, share: float, seed: int = 0) -> list[str]:
+    """Appends a todo to a share of the files below `root`, returns their paths."""
+    rng = random.Random(seed)
+    paths = sorted(os.path.join(path, name) for path, _, names in os.walk(root) for name in names)
+    modified = rng.sample(paths, int(len(paths) * share))
+    for path in modified:
+        ext = os.path.splitext(path)[1]
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(f"{LINE_COMMENTS.get(ext, DEFAULT_LINE_COMMENT)} TODO: added by the benchmark\n")
+    return modified
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("output", help="Directory to create the files in, usually a `src` folder.")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--extensions", type=parse_extensions, help="Weights like `.py=3,.js=1`, all by default.")
+    parser.add_argument("--min-lines", type=int, default=20)
+    parser.add_argument("--max-lines", type=int, default=400)
+    parser.add_argument("--comment-density", type=float, default=0.1)
+    parser.add_argument("--todo-density", type=float, default=0.2)
+    parser.add_argument("--max-depth", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    spec = RepositorySpec(
+        files=args.files,
+        min_lines=args.min_lines,
+        max_lines=args.max_lines,
+        comment_density=args.comment_density,
+        todo_density=args.todo_density,
+        max_depth=args.max_depth,
+        seed=args.seed,
+    )
+    if args.extensions:
+        spec.extensions = args.extensions
+    print(json.dumps(asdict(generate_repository(args.output, spec)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
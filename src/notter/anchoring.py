@@ -0,0 +1,86 @@
+from collections import defaultdict
+from collections.abc import Iterable
+
+from notter.model import Comment, Location, NoteWithContent
+
+# Above this many candidate pairs for one text, duplicates are paired in line order instead of closest lines first
+MAX_ALIGNED_PAIRS = 4096
+
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace, so that re-indenting a comment does not change its identity."""
+    return " ".join(text.split())
+
+
+def align(notes: list[NoteWithContent], comments: list[Comment]) -> Iterable[tuple[NoteWithContent, Comment]]:
+    """Pairs notes with comments of the same text, closest lines first. The same number on both sides is paired in
+    order, which is what inserting or deleting lines above them does."""
+    notes = sorted(notes, key=lambda note: note.note.line)
+    comments = sorted(comments, key=lambda comment: comment.line)
+    if len(notes) == len(comments) or len(notes) * len(comments) > MAX_ALIGNED_PAIRS:
+        return zip(notes, comments, strict=False)
+
+    distances = sorted(
+        (abs(note.note.line - comment.line), note_idx, comment_idx)
+        for note_idx, note in enumerate(notes)
+        for comment_idx, comment in enumerate(comments)
+    )
+    pairs = []
+    paired_notes: set[int] = set()
+    paired_comments: set[int] = set()
+    for _, note_idx, comment_idx in distances:
+        if note_idx not in paired_notes and comment_idx not in paired_comments:
+            paired_notes.add(note_idx)
+            paired_comments.add(comment_idx)
+            pairs.append((notes[note_idx], comments[comment_idx]))
+    return pairs
+
+
+def anchor_notes(notes: list[NoteWithContent], comments: list[Comment]) -> dict[Location, NoteWithContent]:
+    """Finds the existing note each comment was stored as, keyed by the location of the comment. Comments must have
+    distinct locations.
+
+    A note matches the comment at its own location if their normalized texts are equal. Otherwise, it matches the
+    nearest comment with the same normalized text in the same file, i.e. it moved. Notes and comments left over at the
+    same location are matched last, their text changed in place.
+    """
+    anchors: dict[Location, NoteWithContent] = {}
+    by_location = {note.location: note for note in notes}
+    anchored: set[Location] = set()
+
+    unanchored: dict[tuple[str, str], list[Comment]] = defaultdict(list)
+    for comment in comments:
+        location = comment.location
+        note = by_location.get(location)
+        if note is not None and (
+            note.content.text == comment.text or normalize_text(note.content.text) == normalize_text(comment.text)
+        ):
+            anchors[location] = note
+            anchored.add(location)
+        else:
+            unanchored[comment.filepath, normalize_text(comment.text)].append(comment)
+    if not unanchored:
+        return anchors
+
+    # Only the files with unanchored comments can have moved notes
+    candidates: dict[tuple[str, str], list[NoteWithContent]] = defaultdict(list)
+    files = {filepath for filepath, _ in unanchored}
+    for note in notes:
+        if note.note.filepath in files and note.location not in anchored:
+            candidates[note.note.filepath, normalize_text(note.content.text)].append(note)
+
+    leftover: list[Comment] = []
+    for key, group in unanchored.items():
+        paired: set[Location] = set()
+        for note, comment in align(candidates.get(key, []), group):
+            anchors[comment.location] = note
+            anchored.add(note.location)
+            paired.add(comment.location)
+        leftover.extend(comment for comment in group if comment.location not in paired)
+
+    for comment in leftover:
+        note = by_location.get(comment.location)
+        if note is not None and note.location not in anchored:
+            anchors[comment.location] = note
+            anchored.add(note.location)
+    return anchors
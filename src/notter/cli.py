@@ -1,20 +1,55 @@
-import asyncio
+import itertools
 import json
-from importlib.metadata import version as pkg_version
+from collections.abc import AsyncIterable, Callable, Iterable
 from pathlib import Path
+from typing import Any
 
 import click
 from click import Context, pass_context
 
 import notter.constants as ncons
 from notter.context import NotterContext
-from notter.controller import NoteController
 from notter.exceptions import NotterException
 from notter.model import NoteType
 from notter.notter import Notter
+from notter.utils import CustomEncoder, to_bool
+
+# NOTE: asyncio, the controller with the explorers and the database, the client and the server are imported by the
+# commands that need them, so that quick commands like `config` or `read` (forwarded to a server) start fast
 
 SRC_PATH_VAR = "SRC_PATH"
 CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
+# Commands on the editor's hot path, sent to `notter serve` if it is running instead of loading everything
+FORWARDED_COMMANDS = {"create", "read", "read-file", "search", "update", "delete", "discover-file"}
+NDJSON = "ndjson"
+
+
+def format_option(default: str) -> Callable[..., Any]:
+    return click.option(
+        "--format",
+        "output_format",
+        type=click.Choice([default, NDJSON]),
+        default=default,
+        show_default=True,
+        help="With ndjson, every result is written as a JSON object on its own line as soon as it is found.",
+    )
+
+
+def echo_ndjson(results: Iterable[Any]) -> None:
+    for result in results:
+        click.echo(json.dumps(result.to_dict()))
+
+
+def echo_comments(comments: list[Any], output_format: str) -> None:
+    if output_format == NDJSON:
+        echo_ndjson(comments)
+    else:
+        click.echo(json.dumps(comments, cls=CustomEncoder))
+
+
+async def echo_ndjson_async(results: AsyncIterable[Any]) -> None:
+    async for result in results:
+        click.echo(json.dumps(result.to_dict()))
 
 
 @click.group(invoke_without_command=True)
@@ -27,9 +62,20 @@ def cli(ctx: Context, init: bool, version: bool, src_path: str) -> None:
     notter = Notter()
 
     if version:
+        from importlib.metadata import version as pkg_version
+
         click.echo(f"{pkg_version('notter')}")
         return
 
+    if not init and ctx.invoked_subcommand in FORWARDED_COMMANDS:
+        from notter.client import NotterClient, RemoteController, get_socket_path
+
+        client = NotterClient.connect(get_socket_path(src_path))
+        if client is not None:
+            ctx.call_on_close(client.close)
+            ctx.obj = NotterContext(None, RemoteController(client))
+            return
+
     # Try to load the notter instance if exists, otherwise init
     full_path = Path(src_path).resolve()
     already_installed = (full_path / ".notter").is_dir()
@@ -40,7 +86,10 @@ def cli(ctx: Context, init: bool, version: bool, src_path: str) -> None:
     else:
         notter.load(src_path)
 
+    from notter.controller import NoteController
+
     controller = NoteController(notter)
+    ctx.call_on_close(controller.close)
     # Add a custom object to context so they are available for other commands
     if ctx.obj is None:
         ctx.obj = NotterContext(notter, controller)
@@ -103,9 +152,13 @@ def read(ctx: Context, filepath: str, line: int) -> None:
 
 @cli.command()
 @click.argument("filepath", type=str)
+@format_option("text")
 @pass_context
-def read_file(ctx: Context, filepath: str) -> None:
+def read_file(ctx: Context, filepath: str, output_format: str) -> None:
     try:
+        if output_format == NDJSON:
+            echo_ndjson(ctx.obj.controller.iter_read_file(filepath))
+            return
         note = ctx.obj.controller.read_file(filepath)
         click.echo(note)
     except NotterException as exc:
@@ -114,11 +167,25 @@ def read_file(ctx: Context, filepath: str) -> None:
 
 @cli.command()
 @click.argument("content", type=str)
+@click.option("--substring", is_flag=True, help="Match the text anywhere in notes, like SQL LIKE '%text%'.")
+@click.option("--limit", type=click.IntRange(min=1), help="Return at most this many results.")
+@format_option("json")
 @pass_context
-def search(ctx: Context, content: str) -> None:
+def search(ctx: Context, content: str, substring: bool, limit: int | None, output_format: str) -> None:
     try:
-        notes = ctx.obj.controller.search_note_with_content(content)
-        click.echo(json.dumps(notes, default=lambda o: o.__dict__))
+        if output_format == NDJSON:
+            # Rows are written as they come off the database cursor
+            if substring:
+                echo_ndjson(itertools.islice(ctx.obj.controller.iter_search_note_with_content(content), limit))
+            else:
+                echo_ndjson(ctx.obj.controller.iter_full_text_search(content, limit))
+            return
+
+        if substring:
+            notes = ctx.obj.controller.search_note_with_content(content)[:limit]
+        else:
+            notes = ctx.obj.controller.full_text_search(content, limit)
+        click.echo(json.dumps(notes, cls=CustomEncoder))
     except NotterException as exc:
         click.secho(exc.message, fg="red")
 
@@ -150,36 +217,171 @@ def delete(ctx: Context, filepath: str, line: int) -> None:
 
 
 @cli.command()
+@click.option("--full", is_flag=True, help="Rescan every file, ignoring the file manifest.")
+@click.option(
+    "--workers",
+    type=click.IntRange(min=0),
+    help="Number of parser processes, 0 decides automatically and 1 parses serially.",
+)
+@click.option("--stats", is_flag=True, help="Print discovery statistics and timings to stderr.")
+@click.option(
+    "--profile",
+    "profiler",
+    type=click.Choice(ncons.PROFILERS),
+    help="Profile the run with cProfile or trace its memory allocations, the result is written to .notter.",
+)
+@click.option("--git", "use_git", is_flag=True, help="Only rescan the files git reports as changed since the last run.")
+@format_option("json")
 @pass_context
-def discover(ctx: Context) -> None:
+def discover(
+    ctx: Context,
+    full: bool,
+    workers: int | None,
+    stats: bool,
+    profiler: str | None,
+    use_git: bool,
+    output_format: str,
+) -> None:
+    import asyncio
+    import contextlib
+
     try:
+        controller = ctx.obj.controller
+        if workers is not None:
+            controller.explorer.workers = workers
+        use_git = use_git or to_bool(ctx.obj.notter.config.get(ncons.DISCOVER_GIT, False))
         # TODO: Retrieve tags from user
         tags = ["TODO", "FIXME"]
         loop = asyncio.get_event_loop()
-        comments = loop.run_until_complete(ctx.obj.controller.discover(tags))
-        click.echo(json.dumps(comments, default=lambda o: o.__dict__))
+        with contextlib.ExitStack() as stack:
+            if profiler:
+                from notter.instrumentation import profile
+
+                # Parser processes and threads are invisible to the profilers
+                controller.explorer.inline = True
+                stack.enter_context(profile(profiler, controller.profile_path(profiler)))
+
+            if use_git and not full:
+                comments = loop.run_until_complete(controller.discover_changed(tags))
+                echo_comments(comments, output_format)
+            elif output_format == NDJSON:
+                # Written while the files are being parsed, rather than once the whole run is done
+                loop.run_until_complete(echo_ndjson_async(controller.iter_discover(tags, full=full)))
+            else:
+                comments = loop.run_until_complete(controller.discover(tags, full=full))
+                echo_comments(comments, output_format)
+        if stats:
+            click.echo(controller.explorer.stats, err=True)
+        if profiler:
+            click.echo(f"Profile written to {controller.profile_path(profiler)}", err=True)
     except NotterException as exc:
         click.secho(exc.message, fg="red")
 
 
 @cli.command()
 @click.argument("filepath", type=str)
+@format_option("json")
 @pass_context
-def discover_file(ctx: Context, filepath: str) -> None:
+def discover_file(ctx: Context, filepath: str, output_format: str) -> None:
+    import asyncio
+
     try:
         # TODO: Retrieve tags from user
         tags = ["TODO", "FIXME"]
         loop = asyncio.get_event_loop()
         comments = loop.run_until_complete(ctx.obj.controller.discover_single_file(filepath, tags))
-        click.echo(json.dumps(comments, default=lambda o: o.__dict__))
+        echo_comments(comments, output_format)
+    except NotterException as exc:
+        click.secho(exc.message, fg="red")
+
+
+@cli.command()
+@click.option("--poll", is_flag=True, help="Poll for changes instead of subscribing to filesystem events.")
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=0.1),
+    default=ncons.WATCH_POLL_INTERVAL,
+    show_default=True,
+    help="Seconds between two polls.",
+)
+@pass_context
+def watch(ctx: Context, poll: bool, interval: float) -> None:
+    """Keeps the notes up to date while files are being edited, until interrupted."""
+    import asyncio
+
+    def on_sync(filepaths: set[str] | None) -> None:
+        synced = "all files" if filepaths is None else f"{len(filepaths)} file(s)"
+        click.echo(f"Synced {synced}", err=True)
+
+    try:
+        # TODO: Retrieve tags from user
+        tags = ["TODO", "FIXME"]
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(ctx.obj.controller.watch(tags, poll, interval, on_sync))
+    except KeyboardInterrupt:
+        pass
+    except NotterException as exc:
+        click.secho(exc.message, fg="red")
+
+
+@cli.command()
+@click.option("--stdio", is_flag=True, help="Talk over stdin/stdout instead of the Unix socket.")
+@click.option("--watch", "watch_files", is_flag=True, help="Keep the notes in sync with the files while serving.")
+@pass_context
+def serve(ctx: Context, stdio: bool, watch_files: bool) -> None:
+    """Serves JSON-RPC requests, one per line, keeping the database connection open between them."""
+    import asyncio
+
+    from notter.client import get_socket_path
+    from notter.server import NotterServer
+
+    notter = ctx.obj.notter
+    # TODO: Retrieve tags from user
+    tags = ["TODO", "FIXME"]
+    server = NotterServer(ctx.obj.controller, tags)
+    socket_path = get_socket_path(notter.get_config(ncons.SRC_PATH))
+
+    async def run() -> None:
+        tasks = [server.serve_stdio() if stdio else server.serve_unix(socket_path, started)]
+        if watch_files:
+            tasks.append(ctx.obj.controller.watch(tags))
+        await asyncio.gather(*tasks)
+
+    def started() -> None:
+        click.echo(f"Listening on {socket_path}", err=True)
+
+    try:
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(run())
+    except KeyboardInterrupt:
+        pass
     except NotterException as exc:
         click.secho(exc.message, fg="red")
 
 
 @cli.command()
+@click.option("-o", "--output", type=click.Path(dir_okay=False), help="Defaults to todos.<format> in .notter.")
+@click.option("--format", "output_format", type=click.Choice(ncons.EXPORT_FORMATS), default="json", show_default=True)
+@click.option(
+    "--compress", type=click.Choice(ncons.EXPORT_COMPRESSIONS), help="Compress the export, zstd needs `zstandard`."
+)
+@click.option("--type", "note_type", type=NoteType, help="Only export notes of this type.")
+@click.option("--path-prefix", help="Only export notes of files whose path starts with this prefix.")
+@click.option("--updated-since", help="Only export notes updated at or after this ISO 8601 timestamp.")
 @pass_context
-def export(ctx: Context) -> None:
+def export(
+    ctx: Context,
+    output: str | None,
+    output_format: str,
+    compress: str | None,
+    note_type: NoteType | None,
+    path_prefix: str | None,
+    updated_since: str | None,
+) -> None:
+    """Exports the notes, streaming them from the database so that memory use does not grow with their number."""
     try:
-        ctx.obj.controller.export()
+        output = output or ctx.obj.controller.default_export_path(output_format, compress)
+        count = ctx.obj.controller.export(output, output_format, compress, note_type, path_prefix, updated_since)
+        click.secho(f"Exported {count} notes to {output}", fg="green", err=True)
     except NotterException as exc:
         click.secho(exc.message, fg="red")
@@ -0,0 +1,108 @@
+import itertools
+import json
+import socket
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import notter.constants as ncons
+from notter import exceptions
+from notter.model import Comment, NoteType, NoteWithContent, SearchResult
+
+# Seconds to wait for a response, discovering a large file may take a while but a stuck server must not hang the CLI
+DEFAULT_TIMEOUT = 60.0
+
+
+def get_socket_path(src_path: str) -> str:
+    return str(Path(src_path).resolve().parent / ".notter" / ncons.SOCKET_FILENAME)
+
+
+class NotterClient:
+    """Talks to a `notter serve` instance over its Unix socket."""
+
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self.file = sock.makefile("rb")
+        self.ids = itertools.count(1)
+
+    @staticmethod
+    def connect(socket_path: str, timeout: float | None = DEFAULT_TIMEOUT) -> "NotterClient | None":
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            # No server, or a stale socket left behind by one
+            sock.close()
+            return None
+        return NotterClient(sock)
+
+    def close(self) -> None:
+        self.file.close()
+        self.sock.close()
+
+    def call(self, method: str, **params: Any) -> Any:
+        request = {"jsonrpc": "2.0", "id": next(self.ids), "method": method, "params": params}
+        try:
+            self.sock.sendall(json.dumps(request).encode() + b"\n")
+            line = self.file.readline()
+        except TimeoutError:
+            raise exceptions.ServerNotResponding from None
+        if not line:
+            raise exceptions.NotterException
+
+        response = json.loads(line)
+        if "error" in response:
+            error_type = (response["error"].get("data") or {}).get("type", "")
+            exception_class = getattr(exceptions, error_type, None)
+            if isinstance(exception_class, type) and issubclass(exception_class, exceptions.NotterException):
+                raise exception_class
+            raise RuntimeError(response["error"]["message"])
+        return response["result"]
+
+
+class RemoteController:
+    """Mirrors the `NoteController` methods used by the CLI, forwarding them to a running server."""
+
+    def __init__(self, client: NotterClient) -> None:
+        self.client = client
+
+    def close(self) -> None:
+        self.client.close()
+
+    def create(self, filepath: str, line: int, text: str, type: NoteType = NoteType.NOTE) -> None:
+        self.client.call("create", filepath=filepath, line=line, text=text, type=NoteType(type).value)
+
+    def read(self, filepath: str, line: int) -> NoteWithContent:
+        return NoteWithContent.from_dict(self.client.call("read", filepath=filepath, line=line))
+
+    def read_file(self, filepath: str) -> list[NoteWithContent]:
+        return [NoteWithContent.from_dict(note) for note in self.client.call("read_file", filepath=filepath)]
+
+    def iter_read_file(self, filepath: str) -> Iterator[NoteWithContent]:
+        # A response is a single message, the results have already been collected by the server
+        return iter(self.read_file(filepath))
+
+    def search_note_with_content(self, content: str) -> list[NoteWithContent]:
+        return [NoteWithContent.from_dict(note) for note in self.client.call("search", content=content)]
+
+    def iter_search_note_with_content(self, content: str) -> Iterator[NoteWithContent]:
+        return iter(self.search_note_with_content(content))
+
+    def full_text_search(self, query: str, limit: int | None = None) -> list[SearchResult]:
+        results = self.client.call("full_text_search", query=query, limit=limit)
+        return [SearchResult.from_dict(result) for result in results]
+
+    def iter_full_text_search(self, query: str, limit: int | None = None) -> Iterator[SearchResult]:
+        return iter(self.full_text_search(query, limit))
+
+    def update(self, filepath: str, line: int, text: str, type: NoteType = NoteType.NOTE) -> None:
+        self.client.call("update", filepath=filepath, line=line, text=text, type=NoteType(type).value)
+
+    def delete(self, filepath: str, line: int) -> None:
+        self.client.call("delete", filepath=filepath, line=line)
+
+    async def discover_single_file(self, filepath: str, tags: list[str]) -> list[Comment]:
+        # The server discovers with its own tags
+        comments = self.client.call("discover_file", filepath=filepath)
+        return [Comment(**{**comment, "type": NoteType(comment["type"])}) for comment in comments]
@@ -6,9 +6,24 @@ NOTES_DB_FILENAME = "notes.db"
 EXPORT_FILENAME = "todos.json"
 
 CONFIG_FILENAME = "config.json"
+GIT_STATE_FILENAME = "git_state.json"
+SOCKET_FILENAME = "notter.sock"
+PROFILE_FILENAME = "discover.prof"
+MEMORY_PROFILE_FILENAME = "discover_memory.txt"
 
 INITIALIZED_FLAG = "initialized"
 DB_INITIALIZED_FLAG = "db_initialized"
+MANIFEST_HASH = "manifest_hash"
+DISCOVER_WORKERS = "discover_workers"
+DISCOVER_CHUNK_SIZE = "discover_chunk_size"
+DISCOVER_READERS = "discover_readers"
+TAG_WORD_BOUNDARY = "tag_word_boundary"
+DB_CACHE_SIZE = "db_cache_size_kib"
+DB_MMAP_SIZE = "db_mmap_size"
+SEARCH_TRIGRAM = "search_trigram"
+DISCOVER_EXCLUDE = "discover_exclude"
+DISCOVER_FOLLOW_SYMLINKS = "discover_follow_symlinks"
+DISCOVER_GIT = "discover_git"
 
 CPP_EXT = ".cpp"
 C_EXT = ".c"
@@ -60,4 +75,17 @@ SUPPORTED_EXTENSIONS = [
     VUE_EXT,
 ]
 
+# Number of files read concurrently during discovery
 FILE_READ_CHUNK_SIZE = 16
+
+# Bump whenever a change to the explorers changes which comments they find, so that the next discovery rescans every
+# file instead of trusting the manifest
+PARSER_VERSION = 2
+
+# Seconds between two scans of the polling watcher
+WATCH_POLL_INTERVAL = 1.0
+
+EXPORT_FORMATS = ["json", "ndjson", "csv"]
+EXPORT_COMPRESSIONS = ["gzip", "zstd"]
+
+PROFILERS = ["cprofile", "tracemalloc"]
@@ -1,8 +1,15 @@
-from notter.controller import NoteController
+from typing import TYPE_CHECKING
+
 from notter.notter import Notter
 
+# Only needed for the annotations, importing the controller loads the explorers and the database
+if TYPE_CHECKING:
+    from notter.client import RemoteController
+    from notter.controller import NoteController
+
 
 class NotterContext:
-    def __init__(self, notter: Notter, controller: NoteController):
+    # Without a Notter instance when the command is forwarded to a running server
+    def __init__(self, notter: Notter | None, controller: "NoteController | RemoteController"):
         self.notter = notter
         self.controller = controller
@@ -1,23 +1,51 @@
-import json
+import os
+import time
 import uuid
+from collections.abc import AsyncIterator, Callable, Iterator
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import notter.constants as ncons
-from notter.exceptions import NoteAlreadyExists
-from notter.explorers.base import LexicalExplorer
-from notter.model import Comment, Content, Note, NoteType, NoteWithContent
+from notter.anchoring import anchor_notes
+from notter.export import JSON, export_filename, export_notes
+from notter.git import GitRepository, GitState
+from notter.instrumentation import DiscoveryStats, profile_filename
+from notter.manifest import FileFingerprint, diff_manifest, manifest_key
+from notter.model import Comment, Content, Location, Note, NoteType, NoteWithContent, SearchResult
 from notter.notter import Notter
 from notter.repository import SQLiteRepository
+from notter.utils import to_bool
+
+if TYPE_CHECKING:
+    from notter.explorers.base import LexicalExplorer
 
 
 class NoteController:
     def __init__(self, notter: Notter):
         self.notter = notter
         self.repository = SQLiteRepository(self.notter)
-        self.explorer = LexicalExplorer(self.notter)
+        self._explorer: LexicalExplorer | None = None
 
         notter_path = Path(self.notter.get_config(ncons.PATH))
+        self.notter_path = str(notter_path)
         self.export_path = str(notter_path / ncons.EXPORT_FILENAME)
+        self.git_state_path = str(notter_path / ncons.GIT_STATE_FILENAME)
+
+    @property
+    def explorer(self) -> "LexicalExplorer":
+        # Created on first use, importing the explorers costs more than the CRUD commands take to run
+        if self._explorer is None:
+            from notter.explorers.base import LexicalExplorer
+
+            self._explorer = LexicalExplorer(self.notter)
+        return self._explorer
+
+    @explorer.setter
+    def explorer(self, explorer: "LexicalExplorer") -> None:
+        self._explorer = explorer
+
+    def close(self) -> None:
+        self.repository.close()
 
     def _create_note_with_content(self, filepath: str, line: int, text: str, type: NoteType) -> NoteWithContent:
         # TODO: Add input validation, max number of characters for each field
@@ -32,11 +60,25 @@ class NoteController:
     def get_all(self) -> list[NoteWithContent]:
         return self.repository.get_all()
 
-    def export(self) -> None:
-        todos = self.get_all()
-        todo_dicts = [todo.to_dict() for todo in todos]
-        with open(self.export_path, "w") as export_file:
-            json.dump(todo_dicts, export_file)
+    def default_export_path(self, format: str = JSON, compression: str | None = None) -> str:
+        stem = os.path.splitext(self.export_path)[0]
+        return export_filename(stem, format, compression)
+
+    def export(
+        self,
+        path: str | None = None,
+        format: str = JSON,
+        compression: str | None = None,
+        type: NoteType | None = None,
+        path_prefix: str | None = None,
+        updated_since: str | None = None,
+    ) -> int:
+        """Exports the notes matching the filters straight from the database cursor, returns how many were written."""
+        notes = self.repository.iter_notes(type.value if type else None, path_prefix, updated_since)
+        return export_notes(notes, path or self.default_export_path(format, compression), format, compression)
+
+    def profile_path(self, profiler: str) -> str:
+        return os.path.join(self.notter_path, profile_filename(profiler))
 
     def read(self, filepath: str, line: int) -> NoteWithContent:
         return self.repository.read(filepath, line)
@@ -44,9 +86,21 @@ class NoteController:
     def read_file(self, filepath: str) -> list[NoteWithContent]:
         return self.repository.read_file(filepath)
 
+    def iter_read_file(self, filepath: str) -> Iterator[NoteWithContent]:
+        return self.repository.iter_read_file(filepath)
+
     def search_note_with_content(self, content: str) -> list[NoteWithContent]:
         return self.repository.search(content)
 
+    def iter_search_note_with_content(self, content: str) -> Iterator[NoteWithContent]:
+        return self.repository.iter_search(content)
+
+    def full_text_search(self, query: str, limit: int | None = None) -> list[SearchResult]:
+        return self.repository.full_text_search(query, limit)
+
+    def iter_full_text_search(self, query: str, limit: int | None = None) -> Iterator[SearchResult]:
+        return self.repository.iter_full_text_search(query, limit)
+
     def update(self, filepath: str, line: int, text: str, type: NoteType = NoteType.NOTE) -> None:
         note_with_content = self._create_note_with_content(filepath, line, text, type)
         self.repository.update(filepath, line, note_with_content)
@@ -57,41 +111,158 @@ class NoteController:
     def delete_all_in_file(self, filepath: str) -> None:
         self.repository.delete_all_in_file(filepath)
 
-    async def discover(self, tags: list[str], filepath: str | None = None) -> list[Comment]:
-        existing_comments: list[NoteWithContent] = self.get_all()
-        existing_comments_locations: list[str] = [comment.location_id for comment in existing_comments]
-
-        comments: list[Comment] = await self.explorer.discover(tags)
+    def _sync_discovered(
+        self, existing_comments: list[NoteWithContent], comments: list[Comment], filepath: str | None
+    ) -> None:
+        # Keyed by location, the first comment found at a location wins
+        unique: dict[Location, Comment] = {}
         for comment in comments:
-            try:
-                if comment.location_id in existing_comments_locations:
-                    self.update(comment.filepath, comment.line, comment.text, comment.type)
-                else:
-                    self.create(comment.filepath, comment.line, comment.text, comment.type)
-            except NoteAlreadyExists:
+            unique.setdefault(comment.location, comment)
+        # Notes whose comment only moved keep their id and creation date, e.g. when lines are inserted above them
+        anchors = anchor_notes(existing_comments, list(unique.values()))
+
+        changed: dict[Location, NoteWithContent] = {}
+        moves: list[tuple[str, int]] = []
+        for location, comment in unique.items():
+            note = anchors.get(location)
+            if note is not None and note.location != location:
+                moves.append((note.note.id, comment.line))
+            if note and note.content.text == comment.text and note.note.type == comment.type:
                 continue
+            changed[location] = self._create_note_with_content(
+                comment.filepath, comment.line, comment.text, comment.type
+            )
 
-        _ = self.repository.prune(comments, filepath)
-        return comments
+        # Notes are moved before the upsert, and those that were not found again are pruned in the same transaction
+        keys = [comment.location for comment in comments]
+        self.repository.sync_notes(list(changed.values()), keys, filepath, moves=moves)
+
+    async def discover(self, tags: list[str], filepath: str | None = None, full: bool = False) -> list[Comment]:
+        return [comment async for comment in self.iter_discover(tags, filepath, full)]
+
+    async def iter_discover(
+        self, tags: list[str], filepath: str | None = None, full: bool = False
+    ) -> AsyncIterator[Comment]:
+        """Yields the comments as they are found, the database is synced once the last one has been consumed.
+        The time spent in each phase is recorded in the stats of the explorer."""
+        stats = self.explorer.stats = DiscoveryStats()
+        # Wall time includes the time the consumer spends on the comments, CPU time that of the reader threads
+        with stats.phase("total", time.process_time):
+            with stats.phase("load"):
+                existing_comments: list[NoteWithContent] = self.get_all()
+
+            # Only re-read the files that changed since the last discovery, notes of the others are still up to date
+            with stats.phase("walk"):
+                files = self.explorer.find_files()
+            with stats.phase("manifest"):
+                # Files may hold other comments with other tags or parsers, the manifest then says nothing about them
+                word_boundary = to_bool(self.notter.config.get(ncons.TAG_WORD_BOUNDARY, False))
+                key = manifest_key(tags, word_boundary)
+                rescan = full or self.repository.get_manifest_key() != key
+                manifest = {} if rescan else self.repository.get_manifest()
+                use_hash = to_bool(self.notter.config.get(ncons.MANIFEST_HASH, False))
+                diff = diff_manifest(manifest, files, use_hash)
+                stats.unreadable += len(diff.unreadable)
+                stats.unreadable_files.extend(diff.unreadable)
+
+            unchanged_files = set(diff.unchanged)
+            comments: list[Comment] = []
+            for note_with_content in existing_comments:
+                if note_with_content.note.filepath in unchanged_files:
+                    comment = Comment.from_note_with_content(note_with_content)
+                    comments.append(comment)
+                    yield comment
+
+            async for comment in self.explorer.iter_discover(tags, diff.changed):
+                comments.append(comment)
+                yield comment
+
+            with stats.phase("write"):
+                self._sync_discovered(existing_comments, comments, filepath)
+                if rescan:
+                    self.repository.clear_manifest()
+                unreadable = set(stats.unreadable_files)
+                fingerprints = [
+                    fingerprint for fingerprint in diff.fingerprints if fingerprint.filepath not in unreadable
+                ]
+                self.repository.save_manifest(fingerprints, [*diff.deleted, *unreadable], key)
 
     async def discover_single_file(self, filepath: str, tags: list[str]) -> list[Comment]:
         existing_comments: list[NoteWithContent] = self.read_file(filepath)
-        existing_comments_locations: list[str] = [comment.location_id for comment in existing_comments]
 
         try:
             comments: list[Comment] = await self.explorer.discover_single_file(tags, filepath)
         except FileNotFoundError:
             self.delete_all_in_file(filepath)
+            self.repository.save_manifest([], [filepath])
+            return []
+        except OSError:
+            # Unreadable, e.g. its permissions changed, the notes are kept and the next discovery tries it again
+            self.repository.save_manifest([], [filepath])
             return []
 
-        for comment in comments:
-            try:
-                if comment.location_id in existing_comments_locations:
-                    self.update(comment.filepath, comment.line, comment.text, comment.type)
-                else:
-                    self.create(comment.filepath, comment.line, comment.text, comment.type)
-            except NoteAlreadyExists:
-                continue
+        self._sync_discovered(existing_comments, comments, filepath)
+        try:
+            fingerprint = FileFingerprint.from_path(filepath)
+        except OSError:
+            # Deleted or made unreadable since it was read
+            self.repository.save_manifest([], [filepath])
+        else:
+            self.repository.save_manifest([fingerprint], [])
+        return comments
 
-        _ = self.repository.prune(comments, filepath)
+    async def discover_changed(self, tags: list[str]) -> list[Comment]:
+        """Rediscovers only the files that git reports as changed since the last run, falls back to a full discovery
+        outside of a git repository or when the last run is unknown."""
+        git = GitRepository.find(self.explorer.source_path)
+        head = git.head() if git else None
+        if git is None or head is None:
+            return await self.discover(tags)
+
+        # Taken before scanning, so that edits made during the scan are picked up by the next run
+        dirty = git.dirty_files()
+        state = GitState.load(self.git_state_path)
+        changes = git.changes_since(state, head, dirty) if state else None
+        if changes is None:
+            comments = await self.discover(tags)
+        else:
+            # Same files as a full discovery would scan, i.e. no ignored or excluded ones
+            walker = self.explorer.walker()
+            included = set(walker.filter_paths([new_filepath for _, new_filepath in changes.renamed]))
+            for filepath, new_filepath in changes.renamed:
+                if new_filepath in included:
+                    self.repository.move_file(filepath, new_filepath)
+
+            for filepath in sorted(walker.filter_paths(changes.changed)):
+                await self.discover_single_file(filepath, tags)
+            comments = [Comment.from_note_with_content(note) for note in self.get_all()]
+
+        GitState(head, dirty).save(self.git_state_path)
         return comments
+
+    async def sync_files(self, filepaths: set[str] | None, tags: list[str]) -> None:
+        """Rediscovers the given files, or every file that changed according to the manifest if `filepaths` is None."""
+        if filepaths is None:
+            await self.discover(tags)
+            return
+
+        for filepath in sorted(filepaths):
+            await self.discover_single_file(filepath, tags)
+
+    async def watch(
+        self,
+        tags: list[str],
+        polling: bool = False,
+        interval: float = ncons.WATCH_POLL_INTERVAL,
+        on_sync: Callable[[set[str] | None], None] | None = None,
+    ) -> None:
+        # Catch up with the changes made while nothing was watching
+        await self.discover(tags)
+
+        from notter.watcher import create_watcher
+
+        watcher = create_watcher(self.explorer.walker(), polling, interval)
+        async for filepaths in watcher.watch():
+            await self.sync_files(filepaths, tags)
+            if on_sync is not None:
+                on_sync(filepaths)
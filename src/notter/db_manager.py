@@ -1,46 +1,220 @@
+import re
 import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager
 from datetime import datetime
 from typing import Any
 
-from notter import sql_statements
+from notter import migrations, sql_statements
 from notter.exceptions import NoteNotFound
-from notter.model import NoteWithContent
+from notter.manifest import FileFingerprint
+from notter.model import NoteWithContent, SearchResult
+
+STATEMENT_CACHE_SIZE = 64
+BUSY_TIMEOUT_MS = 5000
+DEFAULT_CACHE_SIZE_KIB = 16 * 1024
+DEFAULT_MMAP_SIZE = 64 * 1024 * 1024
+
+# Rows fetched from SQLite at a time when streaming results
+FETCH_SIZE = 256
+
+# Setting holding the key of the discovery settings the manifest was built with
+MANIFEST_KEY = "manifest_key"
+
+SNIPPET_START = "["
+SNIPPET_END = "]"
+SNIPPET_TOKENS = 16
+# A quoted phrase or a bare term, either optionally followed by `*` for a prefix query
+SEARCH_TERM_PATTERN = re.compile(r'"([^"]*)"(\*?)|(\S+)')
+
+
+def build_match_query(text: str) -> str:
+    """Turns user input into an FTS5 query matching notes that contain all terms.
+
+    Every term is quoted so that characters like `:` or `-` are not read as FTS5 operators, `"fix bug"` stays a phrase
+    and a trailing `*` makes a prefix query (`fix*` matches fixme).
+    """
+    terms = []
+    for match in SEARCH_TERM_PATTERN.finditer(text):
+        phrase, phrase_prefix, term = match.groups()
+        if term is not None:
+            phrase, phrase_prefix = term.rstrip("*"), "*" if term.endswith("*") else ""
+        if phrase.strip():
+            escaped = phrase.replace('"', '""')
+            terms.append(f'"{escaped}"{phrase_prefix}')
+    return " ".join(terms)
 
 
-# TODO: Check if this is the best way to do this
 class ConnectionManager:
-    def __init__(self, db_name: str) -> None:
+    """Keeps one long-lived connection per thread instead of connecting for every statement."""
+
+    def __init__(
+        self, db_name: str, cache_size_kib: int = DEFAULT_CACHE_SIZE_KIB, mmap_size: int = DEFAULT_MMAP_SIZE
+    ) -> None:
         self.db_name = db_name
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.local = threading.local()
+        self.connections: list[sqlite3.Connection] = []
+        self.lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Each thread only uses its own connection, the check is disabled so that close() can run on any thread
+        conn = sqlite3.connect(self.db_name, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        # A negative cache size is in KiB rather than pages
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        with self.lock:
+            self.connections.append(conn)
+        return conn
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = self._connect()
+            self.local.transaction_depth = 0
+        return conn
+
+    @property
+    def in_transaction(self) -> bool:
+        return getattr(self.local, "transaction_depth", 0) > 0
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self.connection
+        # Nested transactions join the outer one
+        if self.in_transaction:
+            yield conn
+            return
+
+        # Take the write lock right away, upgrading a read transaction later may fail with SQLITE_BUSY
+        conn.execute("BEGIN IMMEDIATE")
+        self.local.transaction_depth = 1
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.local.transaction_depth = 0
 
     def __enter__(self) -> sqlite3.Connection:
-        self.conn = sqlite3.connect(self.db_name)
-        return self.conn
+        return self.connection
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.conn.close()
+        pass
+
+    def close(self) -> None:
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections.clear()
+        self.local = threading.local()
 
 
-# TODO: Add tests for DatabaseManager
 class DatabaseManager:
-    def __init__(self, db_name: str) -> None:
+    def __init__(
+        self, db_name: str, cache_size_kib: int = DEFAULT_CACHE_SIZE_KIB, mmap_size: int = DEFAULT_MMAP_SIZE
+    ) -> None:
         self.db_name = db_name
-        self.conn = ConnectionManager(db_name)
+        self.conn = ConnectionManager(db_name, cache_size_kib, mmap_size)
+        self.trigram = False
 
-    def run_statement(self, statement: str, values: tuple | None = None, many: bool = False) -> list[Any] | Any:
-        cursor, result = None, None
+    def close(self) -> None:
+        self.conn.close()
 
-        with self.conn as conn:
-            if values:
-                cursor = conn.execute(statement, values)
-            else:
-                cursor = conn.execute(statement)
+    def transaction(self) -> AbstractContextManager[sqlite3.Connection]:
+        return self.conn.transaction()
 
-            conn.commit()
+    def run_statement(self, statement: str, values: tuple | dict | None = None, many: bool = False) -> list[Any] | Any:
+        with self.conn as conn:
+            cursor = conn.execute(statement, values or ())
             result = cursor.fetchall() if many else cursor.fetchone()
+
+            # Reads never open a transaction, a single write outside of an explicit transaction is committed at once
+            if conn.in_transaction and not self.conn.in_transaction:
+                conn.commit()
         return result
 
+    def iter_statement(self, statement: str, values: tuple | dict | None = None) -> Iterator[Any]:
+        """Yields the rows of a read as SQLite produces them, so that large results are never held in memory."""
+        cursor = self.conn.connection.execute(statement, values or ())
+        try:
+            while rows := cursor.fetchmany(FETCH_SIZE):
+                yield from rows
+        finally:
+            cursor.close()
+
+    def _prune(
+        self, conn: sqlite3.Connection, keys: list[tuple[str, int]], filepath: str | None
+    ) -> list[tuple[str, int]]:
+        conn.execute(sql_statements.CREATE_DISCOVERED_TABLE)
+        conn.execute(sql_statements.CLEAR_DISCOVERED)
+        conn.executemany(sql_statements.INSERT_DISCOVERED, keys)
+        pruned = conn.execute(sql_statements.PRUNE_NOTES, {"filepath": filepath}).fetchall()
+        conn.execute(sql_statements.CLEAR_DISCOVERED)
+        return [(pruned_filepath, line) for pruned_filepath, line in pruned]
+
+    def prune(self, keys: list[tuple[str, int]], filepath: str | None = None) -> list[tuple[str, int]]:
+        """Deletes the notes (in `filepath` if given) whose (filepath, line) is not in `keys`, returns their keys."""
+        with self.transaction() as conn:
+            return self._prune(conn, keys, filepath)
+
+    def _move_notes(self, conn: sqlite3.Connection, moves: list[tuple[str, int]]) -> None:
+        conn.executemany(sql_statements.PARK_NOTE, ((note_id,) for note_id, _ in moves))
+        for note_id, line in moves:
+            values = {"id": note_id, "line": line}
+            conn.execute(sql_statements.CLEAR_NOTE_TARGET, values)
+            conn.execute(sql_statements.MOVE_NOTE, values)
+
+    def move_notes(self, moves: list[tuple[str, int]]) -> None:
+        """Moves notes to other lines of their file, given as (id, line). A note already at one of the new lines that
+        is not moved itself is deleted."""
+        with self.transaction() as conn:
+            self._move_notes(conn, moves)
+
+    def sync_notes(
+        self,
+        notes: list[NoteWithContent],
+        keys: list[tuple[str, int]],
+        filepath: str | None = None,
+        moves: list[tuple[str, int]] | None = None,
+    ) -> list[tuple[str, int]]:
+        # Move, upsert and prune in a single transaction, i.e. one commit per discovery
+        with self.transaction() as conn:
+            if moves:
+                self._move_notes(conn, moves)
+            conn.executemany(sql_statements.UPSERT_NOTE, (note.to_db_row() for note in notes))
+            return self._prune(conn, keys, filepath)
+
+    def migrate(self) -> list[int]:
+        # The version is read again after taking the write lock, another process may have migrated in the meantime
+        with self.transaction() as conn:
+            return migrations.migrate(conn)
+
     def create_tables(self) -> None:
-        self.run_statement(sql_statements.CREATE_NOTE_TABLE)
+        self.migrate()
+
+    def set_trigram_index(self, enabled: bool) -> None:
+        """Creates or drops the optional trigram index that serves substring searches."""
+        with self.transaction() as conn:
+            exists = conn.execute(sql_statements.HAS_NOTE_TRIGRAM).fetchone() is not None
+            if enabled and not exists:
+                conn.execute(sql_statements.CREATE_NOTE_TRIGRAM_TABLE)
+                for statement in sql_statements.CREATE_NOTE_TRIGRAM_TRIGGERS:
+                    conn.execute(statement)
+                conn.execute(sql_statements.REBUILD_NOTE_TRIGRAM)
+            elif not enabled and exists:
+                for statement in sql_statements.DROP_NOTE_TRIGRAM:
+                    conn.execute(statement)
+        self.trigram = enabled
 
     def get(self, note_id: str) -> NoteWithContent:
         cursor = self.run_statement(sql_statements.GET_NOTE, (note_id,))
@@ -52,30 +226,58 @@ class DatabaseManager:
         self.run_statement(sql_statements.INSERT_NOTE, note.to_db_row())
 
     def update(self, filepath: str, line: int, update: NoteWithContent) -> None:
-        existing: NoteWithContent = self.get_by_filepath_and_line(filepath, line)
-        existing.note.filepath = update.note.filepath
-        existing.note.line = update.note.line
-        existing.note.type = update.note.type
-        existing.note.updated_at = datetime.now().isoformat()
-        existing.content = update.content
+        with self.transaction():
+            existing: NoteWithContent = self.get_by_filepath_and_line(filepath, line)
+            existing.note.filepath = update.note.filepath
+            existing.note.line = update.note.line
+            existing.note.type = update.note.type
+            existing.note.updated_at = datetime.now().isoformat()
+            existing.content = update.content
 
-        update_tuple = existing.to_db_row()[1:] + (existing.note.id,)
-        self.run_statement(sql_statements.UPDATE_NOTE, update_tuple)
+            update_tuple = existing.to_db_row()[1:] + (existing.note.id,)
+            self.run_statement(sql_statements.UPDATE_NOTE, update_tuple)
 
     def delete(self, filepath: str, line: int) -> None:
-        existing: NoteWithContent = self.get_by_filepath_and_line(filepath, line)
-        self.run_statement(sql_statements.DELETE_NOTE, (existing.note.id,))
+        with self.transaction():
+            existing: NoteWithContent = self.get_by_filepath_and_line(filepath, line)
+            self.run_statement(sql_statements.DELETE_NOTE, (existing.note.id,))
 
     def delete_all_in_file(self, filepath: str) -> None:
         self.run_statement(sql_statements.DELETE_NOTES_IN_FILE, (filepath,))
 
+    def move_file(self, filepath: str, new_filepath: str) -> None:
+        with self.transaction():
+            self.run_statement(sql_statements.MOVE_NOTES_TO_FILE, (new_filepath, filepath))
+            self.run_statement(sql_statements.DELETE_NOTES_IN_FILE, (filepath,))
+            self.run_statement(sql_statements.DELETE_FILE, (filepath,))
+
     def get_all(self) -> list[NoteWithContent]:
-        cursor = self.run_statement(sql_statements.GET_NOTES, None, True)
-        return [NoteWithContent.from_db_row(row) for row in cursor]
+        return list(self.iter_all())
+
+    def iter_all(self) -> Iterator[NoteWithContent]:
+        for row in self.iter_statement(sql_statements.GET_NOTES):
+            yield NoteWithContent.from_db_row(row)
 
     def get_by_filepath(self, filepath: str) -> list[NoteWithContent]:
-        cursor = self.run_statement(sql_statements.GET_NOTE_BY_FILEPATH, (filepath,), True)
-        return [NoteWithContent.from_db_row(row) for row in cursor]
+        return list(self.iter_by_filepath(filepath))
+
+    def iter_by_filepath(self, filepath: str) -> Iterator[NoteWithContent]:
+        for row in self.iter_statement(sql_statements.GET_NOTE_BY_FILEPATH, (filepath,)):
+            yield NoteWithContent.from_db_row(row)
+
+    def iter_notes(
+        self, type: str | None = None, path_prefix: str | None = None, updated_since: str | None = None
+    ) -> Iterator[NoteWithContent]:
+        """Yields the notes matching every given filter, ordered by location."""
+        values = {
+            "type": type,
+            "prefix": path_prefix or None,
+            # The first string after every string starting with the prefix, SQLite compares text by code point
+            "prefix_end": path_prefix[:-1] + chr(ord(path_prefix[-1]) + 1) if path_prefix else None,
+            "updated_since": updated_since,
+        }
+        for row in self.iter_statement(sql_statements.GET_NOTES_FILTERED, values):
+            yield NoteWithContent.from_db_row(row)
 
     def get_by_filepath_and_line(self, filepath: str, line: int) -> NoteWithContent:
         cursor = self.run_statement(sql_statements.GET_NOTE_BY_FILEPATH_AND_LINE, (filepath, line))
@@ -88,5 +290,50 @@ class DatabaseManager:
         return [NoteWithContent.from_db_row(row) for row in cursor]
 
     def search(self, content: str) -> list[NoteWithContent]:
-        cursor = self.run_statement(sql_statements.SEARCH_NOTES_WITH_CONTENT, (f"%{content}%",), True)
-        return [NoteWithContent.from_db_row(row) for row in cursor]
+        return list(self.iter_search(content))
+
+    def iter_search(self, content: str) -> Iterator[NoteWithContent]:
+        # Same LIKE semantics either way, the trigram index only avoids scanning every note
+        statement = (
+            sql_statements.SEARCH_NOTES_WITH_CONTENT_TRIGRAM
+            if self.trigram
+            else sql_statements.SEARCH_NOTES_WITH_CONTENT
+        )
+        for row in self.iter_statement(statement, (f"%{content}%",)):
+            yield NoteWithContent.from_db_row(row)
+
+    def full_text_search(self, query: str, limit: int | None = None) -> list[SearchResult]:
+        return list(self.iter_full_text_search(query, limit))
+
+    def iter_full_text_search(self, query: str, limit: int | None = None) -> Iterator[SearchResult]:
+        match_query = build_match_query(query)
+        if not match_query:
+            return
+
+        values = {
+            "query": match_query,
+            "start": SNIPPET_START,
+            "end": SNIPPET_END,
+            "tokens": SNIPPET_TOKENS,
+            "limit": -1 if limit is None else limit,
+        }
+        for row in self.iter_statement(sql_statements.SEARCH_NOTES_FULL_TEXT, values):
+            yield SearchResult.from_db_row(row)
+
+    def get_manifest(self) -> dict[str, FileFingerprint]:
+        cursor = self.run_statement(sql_statements.GET_FILES, None, True)
+        return {row[0]: FileFingerprint.from_db_row(row) for row in cursor}
+
+    def get_manifest_key(self) -> str | None:
+        row = self.run_statement(sql_statements.GET_SETTING, (MANIFEST_KEY,))
+        return row[0] if row else None
+
+    def save_manifest(self, fingerprints: list[FileFingerprint], deleted: list[str], key: str | None = None) -> None:
+        with self.transaction() as conn:
+            conn.executemany(sql_statements.UPSERT_FILE, [fingerprint.to_db_row() for fingerprint in fingerprints])
+            conn.executemany(sql_statements.DELETE_FILE, [(filepath,) for filepath in deleted])
+            if key is not None:
+                conn.execute(sql_statements.SET_SETTING, (MANIFEST_KEY, key))
+
+    def clear_manifest(self) -> None:
+        self.run_statement(sql_statements.DELETE_FILES)
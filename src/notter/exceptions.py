@@ -8,3 +8,15 @@ class NoteNotFound(NotterException):
 
 class NoteAlreadyExists(NotterException):
     message = "That node already exists"
+
+
+class ServerAlreadyRunning(NotterException):
+    message = "A Notter server is already running for this source folder"
+
+
+class ServerNotResponding(NotterException):
+    message = "The Notter server did not respond in time, stop it or try again"
+
+
+class CompressionNotAvailable(NotterException):
+    message = "zstd compression requires the zstandard package, install it with `pip install notter[zstd]`"
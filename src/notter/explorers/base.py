@@ -1,13 +1,21 @@
-import asyncio
+import mmap
 import os
+from collections.abc import AsyncIterator
 from pathlib import Path
 
 import aiofiles
 
 import notter.constants as ncons
+from notter.explorers.parallel import DEFAULT_CHUNK_SIZE, MIN_PARALLEL_FILES, ParallelParser
+from notter.explorers.pipeline import DiscoveryPipeline
 from notter.explorers.registry import registry
+from notter.explorers.source import ASCII_COMPATIBLE, MMAP_MIN_BYTES, decode_source, detect_bom, map_file
+from notter.explorers.tags import TagMatcher, TagsLike
+from notter.instrumentation import DiscoveryStats
 from notter.model import Comment, NoteType
 from notter.notter import Notter
+from notter.utils import to_bool, to_list
+from notter.walker import Walker
 
 
 class BaseExplorer:
@@ -22,40 +30,61 @@ class LexicalExplorer(BaseExplorer):
     def __init__(self, notter: Notter) -> None:
         self.notter = notter
         self.source_path = notter.get_config(ncons.SRC_PATH)
+        # 0 picks serial or parallel parsing depending on the number of files, 1 forces serial parsing
+        self.workers = int(notter.config.get(ncons.DISCOVER_WORKERS, 0))
+        self.chunk_size = int(notter.config.get(ncons.DISCOVER_CHUNK_SIZE, DEFAULT_CHUNK_SIZE))
+        self.readers = int(notter.config.get(ncons.DISCOVER_READERS, ncons.FILE_READ_CHUNK_SIZE))
+        # Patterns in gitignore syntax, excluded on top of the .gitignore and .notterignore files
+        self.exclude = to_list(notter.config.get(ncons.DISCOVER_EXCLUDE))
+        self.follow_symlinks = to_bool(notter.config.get(ncons.DISCOVER_FOLLOW_SYMLINKS, False))
+        # Parse in the event loop's thread, e.g. to see the parsers in a profile
+        self.inline = False
+        # Statistics of the last discovery run, `iter_discover` adds to them
+        self.stats = DiscoveryStats()
+
+    def walker(self) -> Walker:
+        return Walker(str(Path(self.source_path)), ncons.SUPPORTED_EXTENSIONS, self.exclude, self.follow_symlinks)
+
+    def find_files(self) -> list[str]:
+        return list(self.walker().walk())
+
+    def tag_matcher(self, tags: TagsLike) -> TagMatcher:
+        if isinstance(tags, TagMatcher):
+            return tags
+        return TagMatcher(tags, word_boundary=to_bool(self.notter.config.get(ncons.TAG_WORD_BOUNDARY, False)))
+
+    async def discover(self, tags: TagsLike, filepaths: list[str] | None = None) -> list[Comment]:
+        self.stats = DiscoveryStats()
+        comments = [comment async for comment in self.iter_discover(tags, filepaths)]
+        # Files finish parsing in no particular order, sort to keep the output stable across runs
+        comments.sort(key=lambda comment: comment.filepath)
+        return comments
 
-    async def discover(self, tags: list[str]) -> list[Comment]:
-        comments = []
-        tags = [tag.lower() for tag in tags]
-
-        files_per_ext = LexicalExplorer._find_files_with_extensions(
-            str(Path(self.source_path)), ncons.SUPPORTED_EXTENSIONS
-        )
-
-        for ext, files in files_per_ext.items():
-            explorer_class = registry.get(ext)
-
-            # Skip if unrecognized file format
-            if not explorer_class:
-                continue
+    async def iter_discover(self, tags: TagsLike, filepaths: list[str] | None = None) -> AsyncIterator[Comment]:
+        # Compile the tags once for the whole run, the matcher is shipped to the parser workers along with the files
+        matcher = self.tag_matcher(tags)
 
-            explorer = explorer_class(self.notter)
+        if filepaths is None:
+            with self.stats.phase("walk"):
+                filepaths = self.find_files()
+        files_per_ext = LexicalExplorer._group_files_by_extension(filepaths, ncons.SUPPORTED_EXTENSIONS)
 
-            # Read and process files chunk by chunk
-            read_file_calls = [LexicalExplorer._read_file_async(file) for file in files]
-            results = dict(zip(files, await asyncio.gather(*read_file_calls, return_exceptions=True), strict=False))
-            file_contents: dict[str, str] = {
-                file: content for file, content in results.items() if isinstance(content, str)
-            }
+        # Skip unrecognized file formats, the explorers themselves are only imported by the parser that needs them
+        files = [file for ext, ext_files in files_per_ext.items() if ext in registry for file in ext_files]
 
-            # Discover comments in files
-            for file, content in file_contents.items():
-                discovered_comments = explorer._discover_todos_in_file(file, content, tags)
-                comments.extend(discovered_comments)
+        # Parse on all cores if there are enough files to make it worthwhile
+        workers = self.workers
+        if workers == 0 and len(files) < MIN_PARALLEL_FILES:
+            workers = 1
 
-        return comments
+        with ParallelParser(workers or None, self.chunk_size, self.inline) as parser:
+            pipeline = DiscoveryPipeline(LexicalExplorer._read_file_async, parser, self.readers, self.stats)
+            async for comments in pipeline.run(files, matcher):
+                for comment in comments:
+                    yield comment
 
-    async def discover_single_file(self, tags: list[str], filepath: str) -> list[Comment]:
-        tags = [tag.lower() for tag in tags]
+    async def discover_single_file(self, tags: TagsLike, filepath: str) -> list[Comment]:
+        matcher = self.tag_matcher(tags)
 
         file_ext = os.path.splitext(filepath)[-1].lower()
         explorer_class = registry.get(file_ext)
@@ -64,37 +93,65 @@ class LexicalExplorer(BaseExplorer):
 
         explorer = explorer_class(self.notter)
         file_content = await LexicalExplorer._read_file_async(filepath)
-        return explorer._discover_todos_in_file(filepath, file_content, tags)
+        if file_content is None:
+            return explorer._discover_todos_in_mapped_file(filepath, matcher)
+        if not matcher.may_contain_todo(file_content):
+            return []
+        return explorer._discover_todos_in_file(filepath, file_content, matcher)
 
     @staticmethod
-    async def _read_file_async(filepath: str) -> str:
-        async with aiofiles.open(filepath, encoding="utf-8") as file:
-            file_content = await file.read()
-        return file_content
+    async def _read_file_async(filepath: str) -> str | None:
+        """Reads and decodes the file, or returns None for files large enough to be mapped by the parser instead."""
+        async with aiofiles.open(filepath, "rb") as file:
+            if os.fstat(file.fileno()).st_size >= MMAP_MIN_BYTES:
+                return None
+            data = await file.read()
+        return decode_source(data)
 
     @staticmethod
-    def _find_files_with_extensions(source_path: str, extensions: list[str]) -> dict[str, list[str]]:
-        found_files: dict[str, list[str]] = {ext: [] for ext in extensions}
+    def _group_files_by_extension(filepaths: list[str], extensions: list[str]) -> dict[str, list[str]]:
+        grouped_files: dict[str, list[str]] = {ext: [] for ext in extensions}
 
-        for root, dirs, files in os.walk(source_path):
-            for file in files:
-                file_ext = os.path.splitext(file)[-1].lower()
-                if file_ext in extensions:
-                    found_files[file_ext].append(os.path.join(root, file))
+        for filepath in filepaths:
+            file_ext = os.path.splitext(filepath)[-1].lower()
+            if file_ext in extensions:
+                grouped_files[file_ext].append(filepath)
 
-        return found_files
+        return grouped_files
 
     @classmethod
-    def _discover_comments_in_file(cls, filepath: str, file_content: str, tags: list[str]) -> list[Comment]:
+    def _discover_comments_in_file(cls, filepath: str, file_content: str, tags: TagMatcher) -> list[Comment]:
         raise NotImplementedError
 
     @classmethod
-    def _discover_todos_in_file(cls, filepath: str, file_content: str, tags: list[str]) -> list[Comment]:
-        comments: list[Comment] = cls._discover_comments_in_file(filepath, file_content, tags)
+    def _discover_comments_in_bytes(cls, filepath: str, data: mmap.mmap, start: int, tags: TagMatcher) -> list[Comment]:
+        """Extracts the comments from the raw bytes of a file in an ASCII compatible encoding, from offset `start` on.
+        Explorers that cannot scan bytes decode the whole file."""
+        return cls._discover_comments_in_file(filepath, decode_source(data[:]), tags)
+
+    @classmethod
+    def _discover_todos_in_file(cls, filepath: str, file_content: str, tags: TagsLike) -> list[Comment]:
+        matcher = TagMatcher.from_tags(tags)
+        comments: list[Comment] = cls._discover_comments_in_file(filepath, file_content, matcher)
+        return [comment for comment in comments if comment.type == NoteType.TODO]
+
+    @classmethod
+    def _discover_todos_in_mapped_file(cls, filepath: str, tags: TagsLike) -> list[Comment]:
+        matcher = TagMatcher.from_tags(tags)
+        with map_file(filepath) as data:
+            encoding, start = detect_bom(data)
+            if encoding not in ASCII_COMPATIBLE:
+                # Delimiters and tags are not ASCII bytes in UTF-16 and UTF-32, such files are decoded as a whole
+                return cls._discover_todos_in_file(filepath, decode_source(data[:]), matcher)
+            if not matcher.may_contain_todo_bytes(data):
+                return []
+            return cls._discover_todos_in_bytes(filepath, data, start, matcher)
+
+    @classmethod
+    def _discover_todos_in_bytes(cls, filepath: str, data: mmap.mmap, start: int, tags: TagMatcher) -> list[Comment]:
+        comments = cls._discover_comments_in_bytes(filepath, data, start, tags)
         return [comment for comment in comments if comment.type == NoteType.TODO]
 
     @staticmethod
-    def determine_note_type(text: str, tags: list[str]) -> NoteType:
-        text = text.lower().strip()
-        tags = [tag.lower() for tag in tags]
-        return NoteType.TODO if any(tag in text for tag in tags) else NoteType.NOTE
+    def determine_note_type(text: str, tags: TagsLike) -> NoteType:
+        return TagMatcher.from_tags(tags).classify(text)
@@ -1,12 +1,17 @@
 import notter.constants as ncons
+from notter.explorers.lexer import BlockComment, LanguageSpec, StringLiteral
 from notter.explorers.regex import RegexExplorer
 from notter.explorers.registry import register_explorer
 
 
 @register_explorer(ncons.C_EXT)
 class CExplorer(RegexExplorer):
-    single_line_comment_patterns = [r"//.*"]
-    multi_line_comment_patterns = [r"/\*.*?\*/"]
+    spec = LanguageSpec(
+        line_comments=("//",),
+        block_comments=(BlockComment("/*", "*/"),),
+        strings=(StringLiteral('"'),),
+        char_literals=True,
+    )
 
 
 @register_explorer(ncons.CPP_EXT)
@@ -26,4 +31,10 @@ class HPPExplorer(CExplorer):
 
 @register_explorer(ncons.C_SHARP_EXT)
 class CSharpExplorer(CExplorer):
-    pass
+    # Verbatim strings escape quotes by doubling them, which reads as two strings in a row
+    spec = LanguageSpec(
+        line_comments=("//",),
+        block_comments=(BlockComment("/*", "*/"),),
+        strings=(StringLiteral('"'), StringLiteral('@"', '"', escapes=False, multiline=True)),
+        char_literals=True,
+    )
@@ -1,12 +1,17 @@
 from notter.constants import JAVASCRIPT_EXT, TYPESCRIPT_EXT
+from notter.explorers.lexer import BlockComment, LanguageSpec, StringLiteral
 from notter.explorers.regex import RegexExplorer
 from notter.explorers.registry import register_explorer
 
 
 @register_explorer(JAVASCRIPT_EXT)
 class JavascriptExplorer(RegexExplorer):
-    single_line_comment_patterns = [r"//.*"]
-    multi_line_comment_patterns = [r"/\*.*?\*/"]
+    spec = LanguageSpec(
+        line_comments=("//",),
+        block_comments=(BlockComment("/*", "*/"),),
+        strings=(StringLiteral('"'), StringLiteral("'"), StringLiteral("`", multiline=True, interpolation="${")),
+        regex_literals=True,
+    )
 
 
 @register_explorer(TYPESCRIPT_EXT)
@@ -0,0 +1,215 @@
+import functools
+import mmap
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any
+
+Source = str | bytes | mmap.mmap
+
+# What the lexer does with a match of each alternative of its token pattern
+COMMENT, NESTED_COMMENT, SKIP, TEMPLATE, OPEN_BRACE, CLOSE_BRACE = range(6)
+# A char literal is one character or a short escape sequence like '\n' or '\u{1F600}', any other quote is code
+CHAR_LITERAL = r"'(?:\\.[^'\n]{0,9}|[^\\'\n])'"
+# A `/` starts a regex literal rather than a division after an operator, punctuator or keyword, with at most one space
+# or tab in between. Braces and angle brackets are left out, in JSX text like `{done}/{total}` or `</a>` they are not
+# code. The keywords are grouped by length, each lookbehind has a fixed width
+REGEX_KEYWORDS = ("in|of", "case|else|void", "await|throw|yield", "delete|return|typeof")
+REGEX_PRECEDERS = [r"[(,=:\[!&|?;~+\-*%^]", *(rf"(?<![\w$])(?:{keywords})" for keywords in REGEX_KEYWORDS)]
+# The body is on one line, and a `/` in a class like `[/]` does not end it
+REGEX_LITERAL = (
+    "(?:"
+    + "|".join(f"(?<={preceder}{space})" for preceder in REGEX_PRECEDERS for space in ("", r"[ \t]"))
+    + r")/(?![/*])(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\[\n])+/[A-Za-z]*"
+)
+
+
+@dataclass(frozen=True)
+class BlockComment:
+    open: str
+    close: str
+    nested: bool = False
+    # Both delimiters only count at the start of a line, like Ruby's =begin and =end
+    line_start: bool = False
+
+
+@dataclass(frozen=True)
+class StringLiteral:
+    open: str
+    # Same as `open` if empty
+    close: str = ""
+    # Backslash escapes, a raw string ends at the first closing delimiter
+    escapes: bool = True
+    # Strings that cannot span lines end at the newline if they are not closed, so that a stray quote (e.g. an
+    # apostrophe in JSX text) only hides the rest of its line
+    multiline: bool = False
+    # Opens an expression inside the string, like `${` in JavaScript templates, that lasts until the matching `}`
+    interpolation: str | None = None
+
+    @property
+    def end(self) -> str:
+        return self.close or self.open
+
+
+@dataclass(frozen=True)
+class LanguageSpec:
+    line_comments: tuple[str, ...] = ()
+    block_comments: tuple[BlockComment, ...] = ()
+    strings: tuple[StringLiteral, ...] = ()
+    char_literals: bool = False
+    # JavaScript regex literals like /`/, found with the heuristic of REGEX_LITERAL
+    regex_literals: bool = False
+
+
+def _string_body(string: StringLiteral) -> str:
+    """Pattern of the characters up to the closing delimiter, the interpolation or the end of the line or input."""
+    close = string.end
+    stops = [re.escape(delimiter) for delimiter in (close, string.interpolation) if delimiter]
+    newline = "" if string.multiline else r"\n"
+    escape = "\\\\" if string.escapes else ""
+    if len(stops) == 1 and len(close) == 1:
+        # Runs of plain characters are consumed at once
+        plain = f"[^{re.escape(close)}{escape}{newline}]"
+        if string.escapes:
+            return f"{plain}*(?:\\\\(?s:.){plain}*)*"
+        return f"{plain}*"
+    char = f"(?!{'|'.join(stops)})[^{escape}{newline}]" if escape or newline else f"(?!{'|'.join(stops)})(?s:.)"
+    if string.escapes:
+        return f"(?:\\\\(?s:.)|{char})*"
+    return f"(?:{char})*"
+
+
+class Lexer:
+    """Finds the comments of a language in a single pass, skipping over its string and char literals.
+
+    Every comment and literal is matched by one alternative of a combined pattern, searched from the end of the
+    previous token. The alternatives for a delimiter only ever scan forward from it, an unterminated block comment or
+    multi-line string lasts until the end of the input, so the time taken is linear in the size of the input.
+    """
+
+    def __init__(self, spec: LanguageSpec) -> None:
+        self.spec = spec
+        alternatives: list[tuple[int, str, int, Any]] = []
+
+        for delimiter in spec.line_comments:
+            alternatives.append((len(delimiter), f"{re.escape(delimiter)}[^\\n]*", COMMENT, None))
+        for block in spec.block_comments:
+            open, close = re.escape(block.open), re.escape(block.close)
+            if block.line_start:
+                open, close = f"(?m:^){open}", f"(?m:^){close}"
+            if block.nested:
+                alternatives.append((len(block.open), open, NESTED_COMMENT, block))
+            else:
+                alternatives.append((len(block.open), f"{open}(?:(?s:.*?){close}|(?s:.*))", COMMENT, None))
+        for string in spec.strings:
+            open = re.escape(string.open)
+            # Prefixed strings like Rust's r"" do not start in the middle of an identifier
+            if string.open[0].isalpha():
+                open = f"(?<!\\w){open}"
+            if string.interpolation:
+                alternatives.append((len(string.open), open, TEMPLATE, string))
+            else:
+                body = _string_body(string)
+                alternatives.append((len(string.open), f"{open}{body}(?:{re.escape(string.end)})?", SKIP, None))
+        if spec.char_literals:
+            alternatives.append((1, CHAR_LITERAL, SKIP, None))
+        if spec.regex_literals:
+            alternatives.append((1, REGEX_LITERAL, SKIP, None))
+
+        # Longer delimiters go first, so that e.g. Lua's `--[[` is not taken for its `--`
+        alternatives.sort(key=lambda alternative: -alternative[0])
+        # The lookahead on the first characters lets the search skip the code between tokens quickly
+        starts = {delimiter[0] for delimiter in spec.line_comments}
+        starts.update(block.open[0] for block in spec.block_comments)
+        starts.update(string.open[0] for string in spec.strings)
+        if spec.char_literals:
+            starts.add("'")
+        if spec.regex_literals:
+            starts.add("/")
+        token = "|".join(f"({pattern})" for _, pattern, _, _ in alternatives)
+        self.token = f"(?=[{''.join(map(re.escape, sorted(starts)))}])(?:{token})" if token else "(?!)"
+        # Inside an interpolation the braces are counted too, to find the one that closes it
+        self.interpolation_token = (
+            f"(?=[{''.join(map(re.escape, sorted(starts | set('{}'))))}])(?:{token}|(\\{{)|(\\}}))"
+        )
+        self.kinds = [(kind, arg) for _, _, kind, arg in alternatives] + [(OPEN_BRACE, None), (CLOSE_BRACE, None)]
+        self.templates = {
+            string: (_string_body(string), f"({re.escape(string.end)})|({re.escape(string.interpolation)})")
+            for string in spec.strings
+            if string.interpolation
+        }
+        self.nested = {
+            block: f"({re.escape(block.open)})|({re.escape(block.close)})"
+            for block in spec.block_comments
+            if block.nested
+        }
+
+    def _nested_end(self, block: BlockComment, data: Source, pos: int, binary: bool) -> int:
+        depth = 1
+        for match in compile_pattern(self.nested[block], binary).finditer(data, pos):
+            depth += 1 if match.lastindex == 1 else -1
+            if depth == 0:
+                return match.end()
+        return len(data)
+
+    def _template_end(self, string: StringLiteral, data: Source, pos: int, binary: bool) -> tuple[int, bool]:
+        """Returns where the template body starting at `pos` ends, and whether an interpolation starts there."""
+        body, delimiters = self.templates[string]
+        # The body pattern always matches, if only the empty string
+        body_match = compile_pattern(body, binary).match(data, pos)
+        pos = body_match.end() if body_match else pos
+        match = compile_pattern(delimiters, binary).match(data, pos)
+        if match is None:
+            return len(data), False
+        return match.end(), match.lastindex == 2
+
+    def spans(self, data: Source, pos: int = 0) -> Iterator[tuple[int, int]]:
+        """Yields the start and end offsets of the comments in `data` from `pos` on. Mapped files are scanned as bytes,
+        the delimiters are all ASCII."""
+        binary = not isinstance(data, str)
+        token = compile_pattern(self.token, binary)
+        interpolation_token = compile_pattern(self.interpolation_token, binary)
+        # Templates whose interpolation is being scanned, with the depth of the braces opened in it
+        templates: list[list[Any]] = []
+
+        while True:
+            # Comments and literals are self-contained tokens, the iteration only restarts after the others
+            for match in (interpolation_token if templates else token).finditer(data, pos):
+                # Every alternative is a group, the one that matched is the last index
+                kind, arg = self.kinds[match.lastindex - 1]  # type: ignore [operator]
+                if kind == COMMENT:
+                    yield match.start(), match.end()
+                elif kind != SKIP:
+                    break
+            else:
+                return
+
+            pos = match.end()
+            if kind == NESTED_COMMENT:
+                pos = self._nested_end(arg, data, pos, binary)
+                yield match.start(), pos
+            elif kind == TEMPLATE:
+                pos, interpolation = self._template_end(arg, data, pos, binary)
+                if interpolation:
+                    templates.append([arg, 0])
+            elif kind == OPEN_BRACE:
+                templates[-1][1] += 1
+            elif templates[-1][1]:
+                templates[-1][1] -= 1
+            else:
+                # The interpolation is closed, the template goes on
+                pos, interpolation = self._template_end(templates[-1][0], data, pos, binary)
+                if not interpolation:
+                    templates.pop()
+
+
+@functools.cache
+def compile_pattern(pattern: str, binary: bool) -> re.Pattern[Any]:
+    """Compiles a pattern for decoded text, or for the bytes of mapped files."""
+    return re.compile(pattern.encode("ascii") if binary else pattern)
+
+
+@functools.cache
+def get_lexer(spec: LanguageSpec) -> Lexer:
+    """Explorers declaring the same spec, e.g. subclasses, share one lexer and its compiled patterns."""
+    return Lexer(spec)
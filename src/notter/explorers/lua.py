@@ -1,9 +1,13 @@
 from notter.constants import LUA_EXT
+from notter.explorers.lexer import BlockComment, LanguageSpec, StringLiteral
 from notter.explorers.regex import RegexExplorer
 from notter.explorers.registry import register_explorer
 
 
 @register_explorer(LUA_EXT)
 class LuaExplorer(RegexExplorer):
-    single_line_comment_patterns = [r"--.*"]
-    multi_line_comment_patterns = [r"--\[\[.*?\]\]"]
+    spec = LanguageSpec(
+        line_comments=("--",),
+        block_comments=(BlockComment("--[[", "]]"),),
+        strings=(StringLiteral('"'), StringLiteral("'"), StringLiteral("[[", "]]", escapes=False, multiline=True)),
+    )
@@ -0,0 +1,131 @@
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TypeVar
+
+from notter.explorers.registry import registry
+from notter.explorers.tags import TagMatcher
+from notter.model import Comment
+
+# Max. number of files and bytes sent to a worker at once, large enough to amortize the IPC overhead
+DEFAULT_CHUNK_SIZE = 64
+MAX_BATCH_BYTES = 4 * 1024 * 1024
+# Below this number of files, spawning worker processes costs more than parsing serially
+MIN_PARALLEL_FILES = 256
+# Forking a process that runs an event loop and holds open files, threads and database connections is unsafe, workers
+# are started from a clean server process instead, or spawned where that is not available
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+T = TypeVar("T")
+# Pairs of a filepath and its content, or None for files that are mapped by the parser instead of being read
+SourceBatch = Sequence[tuple[str, str | None]]
+
+
+def is_free_threaded() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def parse_batch(batch: SourceBatch, tags: TagMatcher) -> list[Comment]:
+    comments: list[Comment] = []
+    for filepath, content in batch:
+        explorer_class = registry.get(os.path.splitext(filepath)[-1].lower())
+        if not explorer_class:
+            continue
+        if content is not None:
+            comments.extend(explorer_class._discover_todos_in_file(filepath, content, tags))
+            continue
+        try:
+            comments.extend(explorer_class._discover_todos_in_mapped_file(filepath, tags))
+        except (OSError, ValueError):
+            # The file was deleted or truncated since it was listed, mapping an empty file raises a ValueError
+            pass
+    return comments
+
+
+def parse_batch_timed(batch: SourceBatch, tags: TagMatcher) -> tuple[list[Comment], list[tuple[str, float, float]]]:
+    """Like `parse_batch`, also returns the wall and CPU seconds each file took to parse, measured by the worker."""
+    comments: list[Comment] = []
+    timings: list[tuple[str, float, float]] = []
+    for filepath, content in batch:
+        wall, cpu = time.perf_counter(), time.thread_time()
+        comments.extend(parse_batch([(filepath, content)], tags))
+        timings.append((filepath, time.perf_counter() - wall, time.thread_time() - cpu))
+    return comments, timings
+
+
+def split_batches(files: list[tuple[str, str]], chunk_size: int) -> list[list[tuple[str, str]]]:
+    batches: list[list[tuple[str, str]]] = []
+    batch: list[tuple[str, str]] = []
+    batch_bytes = 0
+
+    for filepath, content in files:
+        if batch and (len(batch) >= chunk_size or batch_bytes + len(content) > MAX_BATCH_BYTES):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append((filepath, content))
+        batch_bytes += len(content)
+
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class ParallelParser:
+    """Extracts comments from (filepath, content) pairs on all CPU cores.
+
+    Batches are parsed in a process pool, or in a thread pool on free-threaded Python builds, and their results are
+    concatenated in submission order so that the output is identical to parsing the files serially. With a single
+    worker batches are parsed serially in a background thread, which keeps the event loop free for file reads.
+    Inline parsers parse in the event loop's thread instead, where profilers see them.
+    """
+
+    def __init__(self, workers: int | None = None, chunk_size: int = DEFAULT_CHUNK_SIZE, inline: bool = False) -> None:
+        self.workers = 1 if inline else workers or os.cpu_count() or 1
+        self.chunk_size = max(chunk_size, 1)
+        self.inline = inline
+        self.executor: Executor | None = None
+
+    def __enter__(self) -> "ParallelParser":
+        if self.inline:
+            return self
+        if self.workers == 1 or is_free_threaded():
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        else:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context(START_METHOD)
+            )
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.executor:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    async def _submit(
+        self, function: Callable[[SourceBatch, TagMatcher], T], batch: SourceBatch, tags: TagMatcher
+    ) -> T:
+        if self.inline:
+            return function(batch, tags)
+        if self.executor is None:
+            raise RuntimeError("ParallelParser must be used as a context manager")
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, function, batch, tags)
+
+    async def parse_chunk(self, batch: SourceBatch, tags: TagMatcher) -> list[Comment]:
+        return await self._submit(parse_batch, batch, tags)
+
+    async def parse_chunk_timed(
+        self, batch: SourceBatch, tags: TagMatcher
+    ) -> tuple[list[Comment], list[tuple[str, float, float]]]:
+        return await self._submit(parse_batch_timed, batch, tags)
+
+    async def parse(self, files: list[tuple[str, str]], tags: TagMatcher) -> list[Comment]:
+        calls = [self.parse_chunk(batch, tags) for batch in split_batches(files, self.chunk_size)]
+        results = await asyncio.gather(*calls)
+        return [comment for batch_comments in results for comment in batch_comments]
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+
+from notter.explorers.parallel import MAX_BATCH_BYTES, ParallelParser
+from notter.explorers.tags import TagMatcher
+from notter.instrumentation import DiscoveryStats
+from notter.model import Comment
+
+# Returns None for files that are too large to read, the parsers map those instead
+FileReader = Callable[[str], Awaitable[str | None]]
+
+
+class DiscoveryPipeline:
+    """Streams files through bounded read and parse stages.
+
+    Reader tasks pull paths from a shared iterator and hand batches of file contents to parser tasks over a bounded
+    queue, parsers hand the comments they find to the consumer over another one. When a stage falls behind, the
+    stage before it blocks on the full queue, so at most `readers` files are open and a handful of batches are in
+    memory at any time, regardless of the size of the repository.
+
+    Every file is timed on its way through the stages, the time is added to the `read`, `scan` and `parse` phases of
+    the stats and to the file's extension.
+    """
+
+    def __init__(
+        self, reader: FileReader, parser: ParallelParser, readers: int, stats: DiscoveryStats | None = None
+    ) -> None:
+        self.reader = reader
+        self.parser = parser
+        self.readers = max(readers, 1)
+        self.parsers = self.parser.workers
+        self.stats = stats if stats is not None else DiscoveryStats()
+        # Bytes and read and scan seconds of the files waiting to be parsed
+        self.pending: dict[str, tuple[int, float]] = {}
+        self.contents: asyncio.Queue[list[tuple[str, str | None]] | None] = asyncio.Queue(maxsize=self.parsers * 2)
+        self.results: asyncio.Queue[list[Comment] | None] = asyncio.Queue(maxsize=self.parsers * 2)
+
+    async def _read(self, paths: Iterator[str], tags: TagMatcher) -> None:
+        batch: list[tuple[str, str | None]] = []
+        batch_bytes = 0
+
+        # The iterator is shared by all readers, each path is read exactly once
+        for path in paths:
+            started = time.perf_counter()
+            try:
+                content = await self.reader(path)
+            except OSError:
+                self.stats.unreadable += 1
+                self.stats.unreadable_files.append(path)
+                continue
+            # Includes the time other tasks ran before this one was resumed, the read's CPU time is spent in a thread
+            read_seconds = time.perf_counter() - started
+            self.stats.add_phase("read", read_seconds)
+
+            self.stats.files += 1
+            if content is None:
+                # Mapped and scanned by a parser, which also skips the file if it contains no tag
+                try:
+                    nbytes = os.path.getsize(path)
+                except OSError:
+                    nbytes = 0
+                self.stats.mapped += 1
+                elapsed = read_seconds
+            else:
+                nbytes = len(content)
+                scan_started, scan_cpu = time.perf_counter(), time.thread_time()
+                may_contain_todo = tags.may_contain_todo(content)
+                scan_seconds = time.perf_counter() - scan_started
+                self.stats.add_phase("scan", scan_seconds, time.thread_time() - scan_cpu)
+                elapsed = read_seconds + scan_seconds
+                # Files without any tag cannot contain a todo, skip tokenizing them and shipping them to the parsers
+                if not may_contain_todo:
+                    self.stats.bytes += nbytes
+                    self.stats.skipped += 1
+                    self.stats.add_file(path, nbytes, elapsed)
+                    continue
+
+            self.stats.bytes += nbytes
+            self.pending[path] = (nbytes, elapsed)
+            batch.append((path, content))
+            batch_bytes += nbytes
+            if len(batch) >= self.parser.chunk_size or batch_bytes >= MAX_BATCH_BYTES:
+                await self.contents.put(batch)
+                batch, batch_bytes = [], 0
+
+        if batch:
+            await self.contents.put(batch)
+
+    async def _parse(self, tags: TagMatcher) -> None:
+        while (batch := await self.contents.get()) is not None:
+            comments, timings = await self.parser.parse_chunk_timed(batch, tags)
+            for path, seconds, cpu_seconds in timings:
+                self.stats.add_phase("parse", seconds, cpu_seconds)
+                nbytes, elapsed = self.pending.pop(path)
+                self.stats.add_file(path, nbytes, elapsed + seconds)
+            await self.results.put(comments)
+
+    async def _feed(self, paths: Iterator[str], tags: TagMatcher) -> None:
+        readers = [asyncio.create_task(self._read(paths, tags)) for _ in range(self.readers)]
+        try:
+            await asyncio.gather(*readers)
+        finally:
+            for task in readers:
+                task.cancel()
+
+        for _ in range(self.parsers):
+            await self.contents.put(None)
+
+    async def _run(self, files: list[str], tags: TagMatcher) -> None:
+        tasks = [asyncio.create_task(self._feed(iter(files), tags))]
+        tasks.extend(asyncio.create_task(self._parse(tags)) for _ in range(self.parsers))
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            errors = [task.exception() for task in done if task.exception()]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        await self.results.put(None)
+        if errors:
+            raise errors[0]  # type: ignore [misc]
+
+    async def run(self, files: list[str], tags: TagMatcher) -> AsyncIterator[list[Comment]]:
+        producer = asyncio.create_task(self._run(files, tags))
+        try:
+            while (comments := await self.results.get()) is not None:
+                yield comments
+            # Re-raise the errors of the read and parse stages, if any
+            await producer
+        finally:
+            producer.cancel()
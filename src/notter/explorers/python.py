@@ -1,30 +1,204 @@
+import contextlib
+import functools
 import io
+import mmap
+import re
 import tokenize
+from collections.abc import Iterable, Iterator
 
 from notter.constants import PYTHON_EXT
 from notter.explorers.base import LexicalExplorer
+from notter.explorers.lexer import Source, compile_pattern
+from notter.explorers.regex import LineCounter, MappedLineCounter
 from notter.explorers.registry import register_explorer
+from notter.explorers.source import FALLBACK_ENCODING, decode_span
+from notter.explorers.tags import TagMatcher
 from notter.model import Comment, NoteType
 
+# Encodings whose files are scanned as bytes, the delimiters are ASCII and never part of a multi-byte character
+UTF8_ENCODINGS = {"utf-8", "utf-8-sig"}
+
+# Closed string literals, escapes included, apart from f-strings which contain code. Single-quoted strings end at the
+# newline, a triple quote that is not closed is not taken for an empty string
+STRING = (
+    r"'''[^'\\]*(?:(?:\\(?s:.)|'(?!''))[^'\\]*)*'''"
+    r'|"""[^"\\]*(?:(?:\\(?s:.)|"(?!""))[^"\\]*)*"""'
+    r"|(?!'''|\"\"\")(?:'[^'\\\n]*(?:\\(?:\r\n|(?s:.))[^'\\\n]*)*'|\"[^\"\\\n]*(?:\\(?:\r\n|(?s:.))[^\"\\\n]*)*\")"
+)
+TOKENS = (
+    r"(?P<comment>#[^\r\n]*)"
+    r"|(?P<fstring>(?<!\w)(?:[fFtT][rR]?|[rR][fFtT])(?:'''|\"\"\"|'|\"))"
+    rf"|(?P<string>{STRING})"
+    r"|(?P<unterminated>'''|\"\"\"|'|\")"
+)
+CODE_TOKEN = rf"(?=[#'\"fFtTrR])(?:{TOKENS})"
+# In the expression of a replacement field, the brackets are counted to find the `:` of a format spec and the `}`
+# that closes the field
+FIELD_TOKEN = rf"{TOKENS}|(?P<open>[\[({{])|(?P<close>[\])}}])|(?P<colon>:)"
+BODY, FIELD, SPEC = range(3)
+
+
+class UnterminatedLiteral(ValueError):
+    """A string or f-string is not closed, e.g. the source does not compile or uses a newer syntax."""
+
+
+@functools.cache
+def fstring_patterns(quote: str, raw: bool) -> tuple[str, str, str]:
+    """Patterns of the literal text in the body of an f-string and in its format specs, and of the delimiter after
+    the text, i.e. the closing quote or the `{` of a replacement field."""
+    char = re.escape(quote[0])
+    if len(quote) == 3:
+        plain, spec = f"[^{{}}\\\\{char}]+|{char}(?!{char}{char})", "[^{}]*"
+    else:
+        plain, spec = f"[^{{}}\\\\{char}\\n]+", "[^{}\\n]*"
+    # A backslash does not escape braces, `\N{...}` names a character outside of raw strings
+    escapes = r"\\(?:\r\n|[^{}])?" if raw else r"\\N\{[^}\n]*\}|\\(?:\r\n|[^{}])?"
+    body = f"(?:{plain}|\\{{\\{{|\\}}\\}}|{escapes})*"
+    return body, spec, f"({re.escape(quote)})|(\\{{)"
+
+
+def scan_comments(source: Source, pos: int = 0) -> Iterator[tuple[int, int]]:
+    """Yields the start and end offsets of the comments in Python source, from `pos` on. Raises UnterminatedLiteral
+    at the first string or f-string that is not closed.
+
+    F-strings are followed into their replacement fields, which may contain strings, other f-strings and, in
+    multi-line f-strings since Python 3.12, comments. A `#` in a format spec like `{x:#x}` is not a comment.
+    """
+    binary = not isinstance(source, str)
+    code = compile_pattern(CODE_TOKEN, binary)
+    field = compile_pattern(FIELD_TOKEN, binary)
+    # The innermost last: the body of an f-string, the expression of one of its fields with the depth of the brackets
+    # opened in it, or the format spec of a field
+    stack: list[list] = []
+
+    while True:
+        if not stack:
+            for match in code.finditer(source, pos):
+                if match.lastgroup == "comment":
+                    yield match.span()
+                elif match.lastgroup != "string":
+                    break
+            else:
+                return
+        else:
+            match = field.search(source, pos)  # type: ignore [assignment]
+            if match is None:
+                raise UnterminatedLiteral(pos)
+
+        pos = match.end()
+        kind = match.lastgroup
+        if kind == "comment":
+            yield match.span()
+        elif kind == "unterminated":
+            raise UnterminatedLiteral(match.start())
+        elif kind == "fstring":
+            text = match.group().decode("ascii") if binary else match.group()
+            quote = text.lstrip("fFtTrR")
+            stack.append([BODY, fstring_patterns(quote, "r" in text[: -len(quote)].lower()), 0])
+        elif kind == "open":
+            stack[-1][2] += 1
+        elif kind == "close" and stack[-1][2]:
+            stack[-1][2] -= 1
+        elif kind == "close":
+            stack.pop()
+        elif kind == "colon" and not stack[-1][2]:
+            stack[-1][0] = SPEC
+
+        # Literal text of f-strings up to the next field, or the end of the f-string or of the field
+        while stack and stack[-1][0] != FIELD:
+            mode, (body, spec, delimiter), _ = stack[-1]
+            text = compile_pattern(body if mode == BODY else spec, binary).match(source, pos)
+            pos = text.end() if text else pos
+            if mode == BODY:
+                end = compile_pattern(delimiter, binary).match(source, pos)
+            else:
+                end = compile_pattern("(\\})|(\\{)", binary).match(source, pos)
+            if end is None:
+                raise UnterminatedLiteral(pos)
+            pos = end.end()
+            if end.lastindex == 2:
+                stack.append([FIELD, stack[-1][1], 0])
+                break
+            stack.pop()
+
+
+def scan_spans(source: Source, pos: int = 0) -> tuple[list[tuple[int, int]], bool]:
+    """Returns the comments found up to the first unterminated literal, if any, and whether the scan completed."""
+    spans: list[tuple[int, int]] = []
+    try:
+        for span in scan_comments(source, pos):
+            spans.append(span)
+    except UnterminatedLiteral:
+        return spans, False
+    return spans, True
+
 
 @register_explorer(PYTHON_EXT)
 class PythonExplorer(LexicalExplorer):
     @classmethod
-    def _discover_comments_in_file(cls, filepath: str, file_content: str, tags: list[str]) -> list[Comment]:
-        comments: list[Comment] = []
+    def _discover_comments_in_file(cls, filepath: str, file_content: str, tags: TagMatcher) -> list[Comment]:
+        spans, complete = scan_spans(file_content)
+        if not complete:
+            # Before Python 3.12, the tokenizer recovers from some errors, e.g. it goes on after an unterminated
+            # single-quoted string
+            with contextlib.suppress(SyntaxError, tokenize.TokenError):
+                tokens = tokenize.generate_tokens(io.StringIO(file_content).readline)
+                return cls._discover_comments_in_tokens(filepath, tokens, tags)
+
+        lines = LineCounter(file_content)
+        return cls._merge_comments(
+            filepath, ((lines.line_at(start), file_content[start + 1 : end]) for start, end in spans), tags
+        )
+
+    @classmethod
+    def _discover_comments_in_bytes(cls, filepath: str, data: mmap.mmap, start: int, tags: TagMatcher) -> list[Comment]:
+        # Picks the encoding from the BOM or coding cookie like the tokenizer
+        data.seek(0)
+        try:
+            encoding, _ = tokenize.detect_encoding(data.readline)
+        except SyntaxError:
+            encoding = FALLBACK_ENCODING
+        if encoding not in UTF8_ENCODINGS:
+            # Rare enough to be decoded whole, the delimiters may be part of a multi-byte character
+            try:
+                file_content = data[:].decode(encoding)
+            except UnicodeDecodeError:
+                file_content = data[:].decode(FALLBACK_ENCODING)
+            return cls._discover_comments_in_file(filepath, file_content, tags)
 
-        tokens = tokenize.tokenize(io.BytesIO(file_content.encode()).readline)
-        for token_type, token_content, token_start, _, _ in tokens:
-            if token_type == tokenize.COMMENT:
-                token_content = token_content[1:]
+        spans, complete = scan_spans(data, start)
+        if not complete:
+            with contextlib.suppress(SyntaxError, tokenize.TokenError, UnicodeDecodeError):
+                data.seek(0)
+                return cls._discover_comments_in_tokens(filepath, tokenize.tokenize(data.readline), tags)
+
+        lines = MappedLineCounter(data)
+        comments = ((lines.line_at(start), decode_span(data[start + 1 : end])) for start, end in spans)
+        return cls._merge_comments(filepath, comments, tags)
+
+    @classmethod
+    def _discover_comments_in_tokens(
+        cls, filepath: str, tokens: Iterator[tokenize.TokenInfo], tags: TagMatcher
+    ) -> list[Comment]:
+        comments = (
+            (start[0], string[1:]) for token_type, string, start, _, _ in tokens if token_type == tokenize.COMMENT
+        )
+        return cls._merge_comments(filepath, comments, tags)
+
+    @classmethod
+    def _merge_comments(cls, filepath: str, comments: Iterable[tuple[int, str]], tags: TagMatcher) -> list[Comment]:
+        """Builds the comments from their line and text without the `#`, comments on the line after the first line of
+        the previous one are appended to it unless they are todos."""
+        merged: list[Comment] = []
 
-                note_type = LexicalExplorer.determine_note_type(token_content, tags)
-                is_todo = True if note_type == NoteType.TODO else False
+        for line, text in comments:
+            note_type = LexicalExplorer.determine_note_type(text, tags)
+            is_todo = True if note_type == NoteType.TODO else False
 
-                if comments and token_start[0] == (comments[-1].line + 1) and not is_todo:
-                    comments[-1].text += f"\n{token_content}"
-                    comments[-1].multiline = True
-                else:
-                    comments.append(Comment(filepath, token_content, token_start[0], note_type))
+            if merged and line == (merged[-1].line + 1) and not is_todo:
+                merged[-1].text += f"\n{text}"
+                merged[-1].multiline = True
+            else:
+                merged.append(Comment(filepath, text, line, note_type))
 
-        return comments
+        return merged
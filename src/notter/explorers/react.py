@@ -1,12 +1,17 @@
 from notter.constants import REACT_EXT, REACT_TS_EXT
+from notter.explorers.lexer import BlockComment, LanguageSpec, StringLiteral
 from notter.explorers.regex import RegexExplorer
 from notter.explorers.registry import register_explorer
 
 
 @register_explorer(REACT_EXT)
 class ReactExplorer(RegexExplorer):
-    single_line_comment_patterns = [r"//.*|<!--.*?-->"]
-    multi_line_comment_patterns = [r"/\*.*?\*/|<!--.*?[\r\n]+.*?-->"]
+    spec = LanguageSpec(
+        line_comments=("//",),
+        block_comments=(BlockComment("/*", "*/"), BlockComment("<!--", "-->")),
+        strings=(StringLiteral('"'), StringLiteral("'"), StringLiteral("`", multiline=True, interpolation="${")),
+        regex_literals=True,
+    )
 
 
 @register_explorer(REACT_TS_EXT)
@@ -1,28 +1,99 @@
-import re
+import mmap
+from typing import Any
 
 from notter.explorers.base import LexicalExplorer
-from notter.model import Comment
+from notter.explorers.lexer import BlockComment, LanguageSpec, Lexer, get_lexer
+from notter.explorers.source import decode_span
+from notter.explorers.tags import TagMatcher
+from notter.model import Comment, NoteType
+
+# Bytes of a mapped file copied at once to count its newlines
+LINE_COUNT_CHUNK = 1024 * 1024
+
+
+class LineCounter:
+    """Maps increasing offsets in a file to line numbers, counting every newline of the file at most once."""
+
+    def __init__(self, file_content: str) -> None:
+        self.file_content = file_content
+        self.offset = 0
+        self.line = 1
+
+    def count(self, start: int, end: int) -> int:
+        return self.file_content.count("\n", start, end)
+
+    def line_at(self, offset: int) -> int:
+        if offset < self.offset:
+            self.offset, self.line = 0, 1
+        self.line += self.count(self.offset, offset)
+        self.offset = offset
+        return self.line
+
+
+class MappedLineCounter(LineCounter):
+    """Counts the lines of a mapped file, which has no count(), a bounded slice at a time."""
+
+    def __init__(self, data: mmap.mmap) -> None:
+        super().__init__("")
+        self.data = data
+
+    def count(self, start: int, end: int) -> int:
+        if end - start <= LINE_COUNT_CHUNK:
+            return self.data[start:end].count(b"\n")
+        return sum(
+            self.data[chunk : min(chunk + LINE_COUNT_CHUNK, end)].count(b"\n")
+            for chunk in range(start, end, LINE_COUNT_CHUNK)
+        )
 
 
 class RegexExplorer(LexicalExplorer):
-    single_line_comment_patterns = [r"//.*"]
-    multi_line_comment_patterns = [r"/\*.*?\*/"]
+    # C-style comments, the explorers of other languages declare their own
+    spec = LanguageSpec(line_comments=("//",), block_comments=(BlockComment("/*", "*/"),))
+    lexer: Lexer
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.lexer = get_lexer(cls.spec)
 
     @classmethod
-    def _discover_comments_in_file(cls, filepath: str, file_content: str, tags: list[str]) -> list[Comment]:
+    def _discover_comments_in_file(cls, filepath: str, file_content: str, tags: TagMatcher) -> list[Comment]:
         comments: list[Comment] = []
+        lines = LineCounter(file_content)
 
-        for pattern in cls.single_line_comment_patterns:
-            for match in re.finditer(pattern, file_content):
-                line_number = file_content.count("\n", 0, match.start()) + 1
-                note_type = LexicalExplorer.determine_note_type(match.group(0), tags)
-                comments.append(Comment(filepath, match.group(0), line_number, note_type, multiline=False))
+        for start, end in cls.lexer.spans(file_content):
+            text = file_content[start:end]
+            note_type = LexicalExplorer.determine_note_type(text, tags)
+            comments.append(Comment(filepath, text, lines.line_at(start), note_type, multiline="\n" in text))
 
-        for pattern in cls.multi_line_comment_patterns:
-            for match in re.finditer(pattern, file_content, re.DOTALL):
-                line_number = file_content.count("\n", 0, match.start()) + 1
-                note_type = LexicalExplorer.determine_note_type(match.group(0), tags)
-                is_multiline = "\n" in match.group(0)
-                comments.append(Comment(filepath, match.group(0), line_number, note_type, multiline=is_multiline))
+        return comments
+
+    @classmethod
+    def _discover_comments_in_bytes(cls, filepath: str, data: mmap.mmap, start: int, tags: TagMatcher) -> list[Comment]:
+        return cls._scan_bytes(filepath, data, start, tags, todos_only=False)
+
+    @classmethod
+    def _discover_todos_in_bytes(cls, filepath: str, data: mmap.mmap, start: int, tags: TagMatcher) -> list[Comment]:
+        return cls._scan_bytes(filepath, data, start, tags, todos_only=True)
+
+    @classmethod
+    def _scan_bytes(
+        cls, filepath: str, data: mmap.mmap, start: int, tags: TagMatcher, todos_only: bool
+    ) -> list[Comment]:
+        comments: list[Comment] = []
+        lines = MappedLineCounter(data)
+
+        # Only the matched comments are copied out of the map, and only those that may be todos are decoded
+        for span_start, span_end in cls.lexer.spans(data, start):
+            span = data[span_start:span_end]
+            if todos_only and not tags.may_contain_todo_bytes(span):
+                continue
+            text = decode_span(span)
+            note_type = LexicalExplorer.determine_note_type(text, tags)
+            if todos_only and note_type != NoteType.TODO:
+                continue
+            comments.append(Comment(filepath, text, lines.line_at(span_start), note_type, multiline="\n" in text))
 
         return comments
+
+
+RegexExplorer.lexer = get_lexer(RegexExplorer.spec)
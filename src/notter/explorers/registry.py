@@ -1,7 +1,61 @@
-from collections.abc import Callable
+import importlib
+from collections.abc import Callable, Iterator
 from typing import Any
 
-registry = {}
+import notter.constants as ncons
+
+# Extension -> module whose explorer handles it, the module registers the explorer when it is imported
+EXPLORER_MODULES = {
+    ncons.C_EXT: "notter.explorers.c",
+    ncons.CPP_EXT: "notter.explorers.c",
+    ncons.C_SHARP_EXT: "notter.explorers.c",
+    ncons.HEADER_EXT: "notter.explorers.c",
+    ncons.HEADER_CPP_EXT: "notter.explorers.c",
+    ncons.GO_EXT: "notter.explorers.go",
+    ncons.HASKELL_EXT: "notter.explorers.haskell",
+    ncons.JAVA_EXT: "notter.explorers.java",
+    ncons.JAVASCRIPT_EXT: "notter.explorers.javascript",
+    ncons.TYPESCRIPT_EXT: "notter.explorers.javascript",
+    ncons.KOTLIN_EXT: "notter.explorers.kotlin",
+    ncons.LUA_EXT: "notter.explorers.lua",
+    ncons.PERL_EXT: "notter.explorers.perl",
+    ncons.PHP_EXT: "notter.explorers.php",
+    ncons.PYTHON_EXT: "notter.explorers.python",
+    ncons.R_EXT: "notter.explorers.r",
+    ncons.REACT_EXT: "notter.explorers.react",
+    ncons.REACT_TS_EXT: "notter.explorers.react",
+    ncons.RUBY_EXT: "notter.explorers.ruby",
+    ncons.RUST_EXT: "notter.explorers.rust",
+    ncons.SCALA_EXT: "notter.explorers.scala",
+    ncons.SWIFT_EXT: "notter.explorers.swift",
+    ncons.VUE_EXT: "notter.explorers.vue",
+}
+
+
+class ExplorerRegistry:
+    """Maps file extensions to explorer classes, importing an explorer module the first time its extension is looked
+    up, so that a run only pays for the languages it actually sees."""
+
+    def __init__(self, modules: dict[str, str]) -> None:
+        self.modules = modules
+        self.explorers: dict[str, Any] = {}
+
+    def __setitem__(self, extension: str, explorer_cls: Any) -> None:
+        self.explorers[extension] = explorer_cls
+
+    def __contains__(self, extension: object) -> bool:
+        return extension in self.explorers or extension in self.modules
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.modules.keys() | self.explorers.keys())
+
+    def get(self, extension: str) -> Any:
+        if extension not in self.explorers and extension in self.modules:
+            importlib.import_module(self.modules[extension])
+        return self.explorers.get(extension)
+
+
+registry = ExplorerRegistry(EXPLORER_MODULES)
 
 
 def register_explorer(extension: str) -> Callable[..., Any]:
@@ -1,9 +1,13 @@
 from notter.constants import RUBY_EXT
+from notter.explorers.lexer import BlockComment, LanguageSpec, StringLiteral
 from notter.explorers.regex import RegexExplorer
 from notter.explorers.registry import register_explorer
 
 
 @register_explorer(RUBY_EXT)
 class RubyExplorer(RegexExplorer):
-    single_line_comment_patterns = [r"#.*"]
-    multi_line_comment_patterns = [r"=begin.*?=\end"]
+    spec = LanguageSpec(
+        line_comments=("#",),
+        block_comments=(BlockComment("=begin", "=end", line_start=True),),
+        strings=(StringLiteral('"'), StringLiteral("'")),
+    )
@@ -1,9 +1,19 @@
 from notter.constants import RUST_EXT
+from notter.explorers.lexer import BlockComment, LanguageSpec, StringLiteral
 from notter.explorers.regex import RegexExplorer
 from notter.explorers.registry import register_explorer
 
 
 @register_explorer(RUST_EXT)
 class RustExplorer(RegexExplorer):
-    single_line_comment_patterns = [r"//.*"]
-    multi_line_comment_patterns = [r"/\*.*?\*/"]
+    spec = LanguageSpec(
+        line_comments=("//",),
+        block_comments=(BlockComment("/*", "*/", nested=True),),
+        strings=(
+            StringLiteral('"', multiline=True),
+            StringLiteral('r"', '"', escapes=False, multiline=True),
+            StringLiteral('r#"', '"#', escapes=False, multiline=True),
+            StringLiteral('r##"', '"##', escapes=False, multiline=True),
+        ),
+        char_literals=True,
+    )
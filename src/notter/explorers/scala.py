@@ -1,9 +1,14 @@
 from notter.constants import SCALA_EXT
+from notter.explorers.lexer import BlockComment, LanguageSpec, StringLiteral
 from notter.explorers.regex import RegexExplorer
 from notter.explorers.registry import register_explorer
 
 
 @register_explorer(SCALA_EXT)
 class ScalaExplorer(RegexExplorer):
-    single_line_comment_patterns = [r"//.*"]
-    multi_line_comment_patterns = [r"/\*.*?\*/"]
+    spec = LanguageSpec(
+        line_comments=("//",),
+        block_comments=(BlockComment("/*", "*/", nested=True),),
+        strings=(StringLiteral('"'), StringLiteral('"""', escapes=False, multiline=True)),
+        char_literals=True,
+    )
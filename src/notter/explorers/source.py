@@ -0,0 +1,51 @@
+import codecs
+import contextlib
+import mmap
+from collections.abc import Iterator
+
+# Files at least this large are mapped and scanned as bytes by the parsers instead of being read and decoded whole
+MMAP_MIN_BYTES = 1024 * 1024
+# Maps every byte to a character, so that files which are not valid UTF-8 are still scanned rather than skipped
+FALLBACK_ENCODING = "latin-1"
+# The UTF-32 LE mark starts with the UTF-16 LE one, so it is checked first
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+# Encodings in which comment delimiters are the ASCII bytes, so that they can be found without decoding
+ASCII_COMPATIBLE = {None, "utf-8-sig"}
+
+
+def detect_bom(data: bytes | mmap.mmap) -> tuple[str | None, int]:
+    """Returns the encoding announced by the byte order mark `data` starts with, if any, and the length of the mark."""
+    for bom, encoding in BOMS:
+        if data[: len(bom)] == bom:
+            return encoding, len(bom)
+    return None, 0
+
+
+def decode_span(data: bytes) -> str:
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode(FALLBACK_ENCODING)
+
+
+def decode_source(data: bytes) -> str:
+    encoding, _ = detect_bom(data)
+    if encoding is not None:
+        with contextlib.suppress(UnicodeDecodeError):
+            return data.decode(encoding)
+    return decode_span(data)
+
+
+@contextlib.contextmanager
+def map_file(filepath: str) -> Iterator[mmap.mmap]:
+    """Maps the file read-only. Matches and memoryviews of the map must be gone by the end of the block, or closing
+    the map fails."""
+    with open(filepath, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
@@ -1,9 +1,17 @@
 from notter.constants import SWIFT_EXT
+from notter.explorers.lexer import BlockComment, LanguageSpec, StringLiteral
 from notter.explorers.regex import RegexExplorer
 from notter.explorers.registry import register_explorer
 
 
 @register_explorer(SWIFT_EXT)
 class SwiftExplorer(RegexExplorer):
-    single_line_comment_patterns = [r"//.*"]
-    multi_line_comment_patterns = [r"/\*.*?\*/"]
+    spec = LanguageSpec(
+        line_comments=("//",),
+        block_comments=(BlockComment("/*", "*/", nested=True),),
+        strings=(
+            StringLiteral('"'),
+            StringLiteral('"""', multiline=True),
+            StringLiteral('#"', '"#', escapes=False),
+        ),
+    )
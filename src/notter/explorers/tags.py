@@ -0,0 +1,98 @@
+import mmap
+import re
+from collections.abc import Mapping, Sequence
+
+from notter.model import NoteType
+
+# Types are checked in this order, so a comment containing both a TODO and a NOTE tag is a TODO
+TYPE_PRIORITY = [NoteType.TODO, NoteType.NOTE]
+# Up to this many tags per type, substring checks on the lowercased text beat a regex alternation
+MAX_SUBSTRING_TAGS = 8
+
+
+class TagRule:
+    def __init__(self, note_type: NoteType, tags: list[str], word_boundary: bool) -> None:
+        self.note_type = note_type
+        self.tags = tuple(sorted({tag.lower() for tag in tags}, key=lambda tag: (-len(tag), tag)))
+        self.substring = len(self.tags) <= MAX_SUBSTRING_TAGS
+
+        # Longer tags first, so that with word boundaries `todos` is not cut short by `todo`
+        alternation = "|".join(re.escape(tag) for tag in self.tags)
+        self.search_pattern = None if self.substring else re.compile(alternation)
+        self.boundary_pattern = re.compile(rf"(?<!\w)(?:{alternation})(?!\w)") if word_boundary else None
+
+    def occurs_in(self, lowered_text: str) -> bool:
+        if self.search_pattern is not None:
+            return self.search_pattern.search(lowered_text) is not None
+
+        for tag in self.tags:
+            if tag in lowered_text:
+                return True
+        return False
+
+    def matches(self, lowered_text: str) -> bool:
+        # Cheap substring checks first, the word boundary pattern only runs if one of the tags is in the text
+        if not self.occurs_in(lowered_text):
+            return False
+        return self.boundary_pattern is None or self.boundary_pattern.search(lowered_text) is not None
+
+
+class TagMatcher:
+    """Classifies comments by the tags they contain.
+
+    Tags are lowercased and compiled into one rule per note type once per discovery run, so classifying a comment
+    costs a single `lower()` plus a few substring checks (or one regex search for large tag sets and word boundary
+    matching). Tags given as a list all map to `NoteType.TODO`, a mapping assigns a type to each tag (e.g.
+    FIXME -> TODO, NOTE -> NOTE).
+    """
+
+    def __init__(self, tags: Sequence[str] | Mapping[str, NoteType], word_boundary: bool = False) -> None:
+        tag_types = dict(tags) if isinstance(tags, Mapping) else dict.fromkeys(tags, NoteType.TODO)
+        self.tag_types = {tag: NoteType(note_type) for tag, note_type in tag_types.items() if tag}
+        self.word_boundary = word_boundary
+
+        self.rules: list[TagRule] = []
+        for note_type in TYPE_PRIORITY:
+            type_tags = [tag for tag, tag_type in self.tag_types.items() if tag_type == note_type]
+            if type_tags:
+                self.rules.append(TagRule(note_type, type_tags, word_boundary))
+
+        # Searches the raw bytes of mapped files, IGNORECASE only folds ASCII letters in bytes patterns
+        todo_tags = [tag for tag, tag_type in self.tag_types.items() if tag_type == NoteType.TODO]
+        self.todo_bytes_pattern = None
+        if todo_tags and all(tag.isascii() for tag in todo_tags):
+            alternation = b"|".join(re.escape(tag.encode()) for tag in todo_tags)
+            self.todo_bytes_pattern = re.compile(alternation, re.IGNORECASE)
+        self.has_todo_tags = bool(todo_tags)
+
+    def __repr__(self) -> str:
+        return f"TagMatcher({self.tag_types!r}, word_boundary={self.word_boundary})"
+
+    @staticmethod
+    def from_tags(tags: "TagsLike") -> "TagMatcher":
+        return tags if isinstance(tags, TagMatcher) else TagMatcher(tags)
+
+    def may_contain_todo(self, file_content: str) -> bool:
+        """Cheap check whether a file can contain a todo at all, i.e. any of the todo tags occurs anywhere in it."""
+        lowered_content = file_content.lower()
+        for rule in self.rules:
+            if rule.note_type == NoteType.TODO:
+                return rule.occurs_in(lowered_content)
+        return False
+
+    def may_contain_todo_bytes(self, data: bytes | mmap.mmap) -> bool:
+        """Same for the raw bytes of a file in an ASCII compatible encoding, which are searched without a copy."""
+        if self.todo_bytes_pattern is None:
+            # Tags with other characters cannot be searched for in bytes, such files are always parsed
+            return self.has_todo_tags
+        return self.todo_bytes_pattern.search(data) is not None
+
+    def classify(self, text: str) -> NoteType:
+        lowered_text = text.lower()
+        for rule in self.rules:
+            if rule.matches(lowered_text):
+                return rule.note_type
+        return NoteType.NOTE
+
+
+TagsLike = TagMatcher | Sequence[str] | Mapping[str, NoteType]
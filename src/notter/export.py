@@ -0,0 +1,110 @@
+import contextlib
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from collections.abc import Iterable, Iterator
+from typing import IO
+
+import notter.constants as ncons
+from notter.exceptions import CompressionNotAvailable
+from notter.model import NoteWithContent
+
+JSON, NDJSON, CSV = ncons.EXPORT_FORMATS
+GZIP, ZSTD = ncons.EXPORT_COMPRESSIONS
+COMPRESSION_SUFFIXES = {GZIP: ".gz", ZSTD: ".zst"}
+
+# Keys of NoteWithContent.to_dict, i.e. the columns of a CSV export
+FIELDS = ("id", "filepath", "line", "type", "created_at", "updated_at", "content")
+
+
+def export_filename(stem: str, format: str, compression: str | None = None) -> str:
+    return f"{stem}.{format}{COMPRESSION_SUFFIXES.get(compression or '', '')}"
+
+
+@contextlib.contextmanager
+def open_compressed(file: IO[bytes], compression: str | None) -> Iterator[IO[bytes]]:
+    if compression is None:
+        yield file
+    elif compression == GZIP:
+        # No file name or timestamp in the header, the same notes always compress to the same bytes
+        with gzip.GzipFile(fileobj=file, mode="wb", filename="", mtime=0) as gzip_file:
+            yield gzip_file  # type: ignore [misc]
+    elif compression == ZSTD:
+        try:
+            import zstandard  # type: ignore [import-not-found]
+        except ImportError:
+            raise CompressionNotAvailable from None
+        with zstandard.ZstdCompressor().stream_writer(file, closefd=False) as zstd_file:
+            yield zstd_file
+    else:
+        raise ValueError(f"Unknown compression: {compression}")
+
+
+def write_notes(notes: Iterable[NoteWithContent], output: IO[str], format: str) -> int:
+    """Writes the notes one at a time, returns how many were written."""
+    count = 0
+    if format == JSON:
+        # A JSON array written element by element, json.dump would need the whole list
+        output.write("[")
+        for note in notes:
+            output.write(", " if count else "")
+            output.write(json.dumps(note.to_dict()))
+            count += 1
+        output.write("]")
+    elif format == NDJSON:
+        for note in notes:
+            output.write(json.dumps(note.to_dict()))
+            output.write("\n")
+            count += 1
+    elif format == CSV:
+        writer = csv.DictWriter(output, FIELDS)
+        writer.writeheader()
+        for note in notes:
+            writer.writerow(note.to_dict())
+            count += 1
+    else:
+        raise ValueError(f"Unknown export format: {format}")
+    return count
+
+
+def default_file_mode() -> int:
+    """The mode `open()` creates new files with, i.e. 0o666 masked by the umask."""
+    # The umask can only be read by setting it
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def export_notes(
+    notes: Iterable[NoteWithContent], path: str, format: str = JSON, compression: str | None = None
+) -> int:
+    """Streams the notes into `path`. They are written to a temporary file next to it, which then replaces `path`,
+    so that readers never see a partial export, even if the export fails halfway."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as file:
+            with open_compressed(file, compression) as stream:
+                # The csv module does its own newline handling
+                output = io.TextIOWrapper(stream, encoding="utf-8", newline="" if format == CSV else None)
+                count = write_notes(notes, output, format)
+                output.flush()
+                # Leave closing the stream to the compressor, which still has to write its trailer
+                output.detach()
+            file.flush()
+            os.fsync(file.fileno())
+        # mkstemp creates the file readable by its owner only, keep the mode of the export being replaced
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = default_file_mode()
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+    return count
@@ -0,0 +1,116 @@
+import json
+import os
+import subprocess
+from dataclasses import asdict, dataclass, field
+
+
+@dataclass
+class GitState:
+    """What the last git-aware discovery saw: the HEAD commit and the files that differed from it."""
+
+    head: str
+    dirty: list[str] = field(default_factory=list)
+
+    @staticmethod
+    def load(state_file: str) -> "GitState | None":
+        try:
+            with open(state_file) as file:
+                return GitState(**json.load(file))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def save(self, state_file: str) -> None:
+        # Write to a temporary file first, an interrupted run must not leave a truncated state behind
+        tmp_file = f"{state_file}.tmp"
+        with open(tmp_file, "w") as file:
+            json.dump(asdict(self), file)
+        os.replace(tmp_file, state_file)
+
+
+@dataclass
+class GitChanges:
+    # Files whose notes have to be rediscovered, including deleted ones and both paths of renamed ones
+    changed: set[str] = field(default_factory=set)
+    # (old path, new path) pairs whose notes are moved before rediscovery
+    renamed: list[tuple[str, str]] = field(default_factory=list)
+
+
+class GitRepository:
+    def __init__(self, toplevel: str, pathspec: str) -> None:
+        self.toplevel = toplevel
+        # Limits every command to the source folder
+        self.pathspec = pathspec
+
+    @staticmethod
+    def find(path: str) -> "GitRepository | None":
+        try:
+            toplevel = GitRepository._git(path, "rev-parse", "--show-toplevel").strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return GitRepository(toplevel, os.path.realpath(path))
+
+    @staticmethod
+    def _git(cwd: str, *args: str) -> str:
+        result = subprocess.run(["git", "-C", cwd, *args], capture_output=True, text=True, check=True)
+        return result.stdout
+
+    def run(self, *args: str) -> str:
+        return GitRepository._git(self.toplevel, *args, "--", self.pathspec)
+
+    def _abspath(self, path: str) -> str:
+        return os.path.join(self.toplevel, *path.split("/"))
+
+    def head(self) -> str | None:
+        try:
+            return GitRepository._git(self.toplevel, "rev-parse", "--verify", "-q", "HEAD").strip() or None
+        except subprocess.CalledProcessError:
+            # No commits yet
+            return None
+
+    def dirty_files(self) -> list[str]:
+        """Files that differ from HEAD: modified, deleted or untracked in the working tree, or staged in the index."""
+        output = self.run("ls-files", "-z", "-m", "-o", "--exclude-standard")
+        output += self.run("diff", "-z", "--name-only", "--cached", "HEAD")
+        return sorted({self._abspath(path) for path in output.split("\0") if path})
+
+    def _add_name_status(self, output: str, changes: GitChanges, present_only: bool = False) -> None:
+        # Entries are `status\0path\0`, renames and copies are `Rxxx\0old\0new\0`
+        fields = iter(output.split("\0"))
+        for status in fields:
+            if not status:
+                continue
+            path = self._abspath(next(fields))
+            if status[0] == "R":
+                new_path = self._abspath(next(fields))
+                # A file created at the old path since the rename keeps its own notes
+                if not present_only or not os.path.lexists(path):
+                    changes.renamed.append((path, new_path))
+                changes.changed.add(path)
+                path = new_path
+            elif status[0] == "C":
+                path = self._abspath(next(fields))
+            changes.changed.add(path)
+
+    def changes_since(self, state: GitState, head: str, dirty: list[str]) -> GitChanges | None:
+        """Files changed between the state and `head` plus the `dirty` files, or None if the recorded commit is gone
+        (e.g. after a rebase followed by a gc).
+
+        Renames are detected between the commits and between `head` and the working tree, i.e. for staged renames
+        such as `git mv`. A file moved without git is untracked at its new path, so it counts as a deletion and an
+        addition, and its notes get new ids.
+        """
+        changes = GitChanges()
+        if head != state.head:
+            try:
+                output = self.run("diff", "-z", "--name-status", "-M", f"{state.head}..{head}")
+            except subprocess.CalledProcessError:
+                return None
+            self._add_name_status(output, changes)
+
+        # Moving the notes again on the next run is harmless, the old path has none left by then
+        self._add_name_status(self.run("diff", "-z", "--name-status", "-M", head), changes, present_only=True)
+
+        # Files that were dirty last time may have been reverted since, so they are rescanned too
+        changes.changed.update(dirty)
+        changes.changed.update(state.dirty)
+        return changes
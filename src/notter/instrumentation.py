@@ -0,0 +1,157 @@
+import contextlib
+import heapq
+import os
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+import notter.constants as ncons
+
+if TYPE_CHECKING:
+    from tracemalloc import Snapshot
+
+CPROFILE, TRACEMALLOC = ncons.PROFILERS
+# Number of files listed as the slowest ones, and of allocation sites in a tracemalloc report
+SLOWEST_FILES = 10
+TOP_ALLOCATIONS = 25
+TRACEMALLOC_FRAMES = 10
+
+
+@dataclass
+class PhaseTiming:
+    seconds: float = 0.0
+    # None for phases that wait on other threads or processes, whose CPU time is not seen from here
+    cpu_seconds: float | None = None
+    calls: int = 0
+
+
+@dataclass
+class ExtensionStats:
+    files: int = 0
+    bytes: int = 0
+    # Time spent reading, scanning and parsing the files
+    seconds: float = 0.0
+
+
+@dataclass(order=True)
+class FileTiming:
+    seconds: float
+    filepath: str = field(compare=False)
+    bytes: int = field(compare=False)
+
+
+@dataclass
+class DiscoveryStats:
+    files: int = 0
+    bytes: int = 0
+    # Files without any of the tags, these are not parsed at all
+    skipped: int = 0
+    unreadable: int = 0
+    # Their fingerprints are not saved to the manifest, so that the next discovery tries them again
+    unreadable_files: list[str] = field(default_factory=list)
+    # Files large enough to be mapped and scanned as bytes, their sizes are counted in bytes rather than characters
+    mapped: int = 0
+    phases: dict[str, PhaseTiming] = field(default_factory=dict)
+    extensions: dict[str, ExtensionStats] = field(default_factory=dict)
+    # Min-heap of the slowest files, the fastest of them is replaced first
+    slowest: list[FileTiming] = field(default_factory=list)
+
+    def add_phase(self, name: str, seconds: float, cpu_seconds: float | None = None) -> None:
+        phase = self.phases.setdefault(name, PhaseTiming())
+        phase.seconds += seconds
+        if cpu_seconds is not None:
+            phase.cpu_seconds = (phase.cpu_seconds or 0.0) + cpu_seconds
+        phase.calls += 1
+
+    @contextlib.contextmanager
+    def phase(self, name: str, cpu_clock: Callable[[], float] = time.thread_time) -> Iterator[None]:
+        """Times the block. The default clock only counts the CPU time of the calling thread, which is exact for
+        blocks that do not await, pass `time.process_time` to include the threads the block waits on."""
+        wall, cpu = time.perf_counter(), cpu_clock()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - wall, cpu_clock() - cpu)
+
+    def add_file(self, filepath: str, nbytes: int, seconds: float) -> None:
+        ext = os.path.splitext(filepath)[-1].lower()
+        extension = self.extensions.setdefault(ext, ExtensionStats())
+        extension.files += 1
+        extension.bytes += nbytes
+        extension.seconds += seconds
+
+        timing = FileTiming(seconds, filepath, nbytes)
+        if len(self.slowest) < SLOWEST_FILES:
+            heapq.heappush(self.slowest, timing)
+        elif timing > self.slowest[0]:
+            heapq.heapreplace(self.slowest, timing)
+
+    def __str__(self) -> str:
+        lines = [
+            f"Scanned {self.files} files ({self.bytes} characters), skipped {self.skipped} files without tags, "
+            f"{self.unreadable} unreadable files" + (f", mapped {self.mapped} large files" if self.mapped else "")
+        ]
+        if self.phases:
+            # Read, scan and parse times are summed over the files, which are processed concurrently
+            lines.append(f"\n{'phase':<12} {'wall (s)':>10} {'cpu (s)':>10} {'calls':>8}")
+            for name, phase in self.phases.items():
+                cpu = "-" if phase.cpu_seconds is None else f"{phase.cpu_seconds:.3f}"
+                lines.append(f"{name:<12} {phase.seconds:>10.3f} {cpu:>10} {phase.calls:>8}")
+        if self.extensions:
+            lines.append(f"\n{'extension':<12} {'files':>8} {'bytes':>12} {'MiB/s':>10}")
+            for ext, extension in sorted(self.extensions.items(), key=lambda item: -item[1].bytes):
+                rate = extension.bytes / max(extension.seconds, 1e-9) / 1024 / 1024
+                lines.append(f"{ext:<12} {extension.files:>8} {extension.bytes:>12} {rate:>10.1f}")
+        if self.slowest:
+            lines.append("\nslowest files")
+            for timing in sorted(self.slowest, reverse=True):
+                lines.append(f"{timing.seconds:>10.4f}s {timing.bytes:>10} {timing.filepath}")
+        return "\n".join(lines)
+
+
+def profile_filename(profiler: str) -> str:
+    return ncons.PROFILE_FILENAME if profiler == CPROFILE else ncons.MEMORY_PROFILE_FILENAME
+
+
+def write_memory_report(snapshot: "Snapshot", peak: int, path: str) -> None:
+    import tracemalloc
+
+    # Leave out the allocations of the tracing itself
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    statistics = snapshot.statistics("lineno")
+    with open(path, "w") as file:
+        file.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n")
+        file.write(f"Traced at the end: {sum(stat.size for stat in statistics) / 1024:.1f} KiB\n\n")
+        for stat in statistics[:TOP_ALLOCATIONS]:
+            frame = stat.traceback[0]
+            file.write(f"{stat.size / 1024:>10.1f} KiB {stat.count:>8} blocks  {frame.filename}:{frame.lineno}\n")
+
+
+@contextlib.contextmanager
+def profile(profiler: str, path: str) -> Iterator[None]:
+    """Profiles the block with cProfile, writing stats that `pstats` or snakeviz can load, or traces its memory
+    allocations with tracemalloc, writing the peak and the largest allocation sites as text."""
+    if profiler == CPROFILE:
+        import cProfile
+
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+        try:
+            yield
+        finally:
+            cprofile.disable()
+            cprofile.dump_stats(path)
+    elif profiler == TRACEMALLOC:
+        import tracemalloc
+
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            write_memory_report(snapshot, peak, path)
+    else:
+        raise ValueError(f"Unknown profiler: {profiler}")
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+
+import notter.constants as ncons
+
+HASH_READ_SIZE = 1024 * 1024
+
+
+@dataclass
+class FileFingerprint:
+    filepath: str
+    size: int
+    mtime_ns: int
+    inode: int
+    content_hash: str | None = None
+
+    @staticmethod
+    def from_path(filepath: str) -> "FileFingerprint":
+        stat = os.stat(filepath)
+        return FileFingerprint(filepath, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    @staticmethod
+    def from_db_row(row: tuple) -> "FileFingerprint":
+        return FileFingerprint(*row)
+
+    def to_db_row(self) -> tuple:
+        return (self.filepath, self.size, self.mtime_ns, self.inode, self.content_hash)
+
+    def same_stat(self, other: "FileFingerprint") -> bool:
+        return self.size == other.size and self.mtime_ns == other.mtime_ns and self.inode == other.inode
+
+
+@dataclass
+class ManifestDiff:
+    changed: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    deleted: list[str] = field(default_factory=list)
+    # Files that could not be stat'ed or hashed, e.g. for lack of permissions, they are neither changed nor unchanged
+    unreadable: list[str] = field(default_factory=list)
+    # Fingerprints that need to be (re)written to the manifest, i.e. new, changed or touched files
+    fingerprints: list[FileFingerprint] = field(default_factory=list)
+
+
+def hash_file(filepath: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as file:
+        while chunk := file.read(HASH_READ_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_key(tags: list[str], word_boundary: bool) -> str:
+    """Identifies the settings the manifest was built with, a manifest built with other tags or parsers is stale."""
+    settings = {"parser": ncons.PARSER_VERSION, "tags": sorted(tags), "word_boundary": word_boundary}
+    return hashlib.blake2b(json.dumps(settings).encode(), digest_size=16).hexdigest()
+
+
+def diff_manifest(previous: dict[str, FileFingerprint], filepaths: list[str], use_hash: bool = False) -> ManifestDiff:
+    """Compares the files found on disk against the previously persisted manifest.
+
+    A file is unchanged when its size, mtime and inode match the manifest. If content hashing is enabled, a file whose
+    stat changed but whose content hash did not (e.g. a `touch` or a checkout of the same content) is also unchanged.
+    """
+    diff = ManifestDiff()
+    found: set[str] = set()
+
+    for filepath in filepaths:
+        try:
+            current = FileFingerprint.from_path(filepath)
+        except FileNotFoundError:
+            continue
+        except OSError:
+            found.add(filepath)
+            diff.unreadable.append(filepath)
+            continue
+
+        found.add(filepath)
+
+        known = previous.get(filepath)
+        if known and current.same_stat(known):
+            diff.unchanged.append(filepath)
+            continue
+
+        if use_hash:
+            try:
+                current.content_hash = hash_file(filepath)
+            except OSError:
+                diff.unreadable.append(filepath)
+                continue
+            if known and known.content_hash == current.content_hash:
+                diff.unchanged.append(filepath)
+                diff.fingerprints.append(current)
+                continue
+
+        diff.changed.append(filepath)
+        diff.fingerprints.append(current)
+
+    diff.deleted = [filepath for filepath in previous if filepath not in found]
+    return diff
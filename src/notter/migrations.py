@@ -0,0 +1,39 @@
+import sqlite3
+
+from notter import sql_statements
+
+# Each entry upgrades the schema by one version, the version of a database is kept in `PRAGMA user_version`.
+# Databases created before migrations existed are at version 0 and may already have some of the tables, so every
+# statement has to be idempotent. Never edit a released migration, append a new one instead.
+MIGRATIONS: list[list[str]] = [
+    [sql_statements.CREATE_NOTE_TABLE],
+    [sql_statements.CREATE_FILE_TABLE],
+    [sql_statements.CREATE_NOTE_TYPE_INDEX, sql_statements.CREATE_NOTE_UPDATED_AT_INDEX],
+    [
+        sql_statements.CREATE_NOTE_FTS_TABLE,
+        *sql_statements.CREATE_NOTE_FTS_TRIGGERS,
+        sql_statements.REBUILD_NOTE_FTS,
+    ],
+    [sql_statements.CREATE_SETTING_TABLE],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute(sql_statements.GET_USER_VERSION).fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> list[int]:
+    """Applies the pending migrations, the caller runs this inside a write transaction. Returns the applied versions."""
+    applied = []
+    for version in range(get_schema_version(conn) + 1, SCHEMA_VERSION + 1):
+        for statement in MIGRATIONS[version - 1]:
+            conn.execute(statement)
+        conn.execute(sql_statements.SET_USER_VERSION.format(version=version))
+        applied.append(version)
+
+    if applied:
+        # Refresh the planner statistics so that the new indexes are picked up
+        conn.execute(sql_statements.ANALYZE)
+    return applied
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 
@@ -8,23 +9,28 @@ class NoteType(str, Enum):
     TODO = "TODO"
 
 
+# A file and a line, the filepath is interned so that every key of the same file shares one string
+Location = tuple[str, int]
+
+
 # TODO: Add input validation, max number of characters for each field
-@dataclass
+@dataclass(slots=True)
 class Note:
     id: str
     filepath: str
     line: int
     type: NoteType = NoteType.NOTE
-    created_at: str | None = datetime.now().isoformat()
-    updated_at: str | None = datetime.now().isoformat()
+    # Stamped when each note is built, not once at import time
+    created_at: str | None = field(default_factory=lambda: datetime.now().isoformat())
+    updated_at: str | None = field(default_factory=lambda: datetime.now().isoformat())
 
 
-@dataclass
+@dataclass(slots=True)
 class Content:
     text: str
 
 
-@dataclass
+@dataclass(slots=True)
 class NoteWithContent:
     note: Note
     content: Content
@@ -32,6 +38,10 @@ class NoteWithContent:
     def __str__(self) -> str:
         return f"{self.content.text} / {self.note.updated_at}"
 
+    @property
+    def location(self) -> Location:
+        return self.note.filepath, self.note.line
+
     @property
     def location_id(self) -> str:
         return f"{self.note.filepath}:{self.note.line}"
@@ -47,12 +57,25 @@ class NoteWithContent:
             "content": self.content.text,
         }
 
+    @staticmethod
+    def from_dict(data: dict) -> "NoteWithContent":
+        note = Note(
+            id=data["id"],
+            filepath=data["filepath"],
+            line=data["line"],
+            type=NoteType(data["type"]),
+            created_at=data["created_at"],
+            updated_at=data["updated_at"],
+        )
+        return NoteWithContent(note, Content(text=data["content"]))
+
     # TODO: This is too ugly, find a better way to do this
     @staticmethod
     def from_db_row(row: tuple) -> "NoteWithContent":
         note = Note(
             id=row[0],
-            filepath=row[1],
+            # SQLite returns a new string for every row, share one per file instead
+            filepath=sys.intern(row[1]),
             line=row[2],
             type=NoteType(row[3]),
             created_at=row[4],
@@ -73,7 +96,27 @@ class NoteWithContent:
         )
 
 
-@dataclass
+@dataclass(slots=True)
+class SearchResult(NoteWithContent):
+    snippet: str = ""
+    rank: float = 0.0
+
+    @staticmethod
+    def from_db_row(row: tuple) -> "SearchResult":
+        note_with_content = NoteWithContent.from_db_row(row)
+        return SearchResult(note_with_content.note, note_with_content.content, snippet=row[7], rank=row[8])
+
+    def to_dict(self) -> dict:
+        # Zero-argument super() fails in slotted dataclasses, the decorator returns a new class the method does not know
+        return {**NoteWithContent.to_dict(self), "snippet": self.snippet, "rank": self.rank}
+
+    @staticmethod
+    def from_dict(data: dict) -> "SearchResult":
+        note_with_content = NoteWithContent.from_dict(data)
+        return SearchResult(note_with_content.note, note_with_content.content, data["snippet"], data["rank"])
+
+
+@dataclass(slots=True)
 class Comment:
     filepath: str
     text: str
@@ -84,6 +127,26 @@ class Comment:
     def __str__(self) -> str:
         return f"{self.filepath}:{self.line} - {self.text}"
 
+    @property
+    def location(self) -> Location:
+        return self.filepath, self.line
+
     @property
     def location_id(self) -> str:
         return f"{self.filepath}:{self.line}"
+
+    def to_dict(self) -> dict:
+        # Same keys as NoteWithContent.to_dict, minus those only known once the note is stored
+        return {
+            "filepath": self.filepath,
+            "line": self.line,
+            "type": self.type.value,
+            "content": self.text,
+            "multiline": self.multiline,
+        }
+
+    @staticmethod
+    def from_note_with_content(note_with_content: NoteWithContent) -> "Comment":
+        text = note_with_content.content.text
+        note = note_with_content.note
+        return Comment(note.filepath, text, note.line, note.type, multiline="\n" in text)
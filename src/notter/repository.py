@@ -1,9 +1,12 @@
+from collections.abc import Iterator
 from pathlib import Path
 
 import notter.constants as ncons
-from notter.db_manager import DatabaseManager
-from notter.model import Comment, NoteWithContent
+from notter.db_manager import DEFAULT_CACHE_SIZE_KIB, DEFAULT_MMAP_SIZE, DatabaseManager
+from notter.manifest import FileFingerprint
+from notter.model import Comment, NoteWithContent, SearchResult
 from notter.notter import Notter
+from notter.utils import to_bool
 
 
 class BaseRepository:
@@ -31,26 +34,52 @@ class SQLiteRepository(BaseRepository):
         notter_path = Path(self.notter.get_config(ncons.PATH))
         notes_db_path = str(notter_path / ncons.NOTES_DB_FILENAME)
 
-        self.db_manager = DatabaseManager(notes_db_path)
+        self.db_manager = DatabaseManager(
+            notes_db_path,
+            cache_size_kib=int(self.notter.config.get(ncons.DB_CACHE_SIZE, DEFAULT_CACHE_SIZE_KIB)),
+            mmap_size=int(self.notter.config.get(ncons.DB_MMAP_SIZE, DEFAULT_MMAP_SIZE)),
+        )
+        # Creates the tables of a new database, and upgrades the schema of an existing one in place
+        self.db_manager.migrate()
+        self.db_manager.set_trigram_index(to_bool(self.notter.config.get(ncons.SEARCH_TRIGRAM, False)))
         if not db_initialized:
-            self.db_manager.create_tables()
             self.notter.set_config(ncons.DB_INITIALIZED_FLAG, True)
 
+    def close(self) -> None:
+        self.db_manager.close()
+
     def create(self, note_with_content: NoteWithContent) -> None:
         self.db_manager.insert(note_with_content)
 
     def get_all(self) -> list[NoteWithContent]:
         return self.db_manager.get_all()
 
+    def iter_notes(
+        self, type: str | None = None, path_prefix: str | None = None, updated_since: str | None = None
+    ) -> Iterator[NoteWithContent]:
+        return self.db_manager.iter_notes(type, path_prefix, updated_since)
+
     def read(self, filepath: str, line: int) -> NoteWithContent:
         return self.db_manager.get_by_filepath_and_line(filepath, line)
 
     def read_file(self, filepath: str) -> list[NoteWithContent]:
         return self.db_manager.get_by_filepath(filepath)
 
+    def iter_read_file(self, filepath: str) -> Iterator[NoteWithContent]:
+        return self.db_manager.iter_by_filepath(filepath)
+
     def search(self, content: str) -> list[NoteWithContent]:
         return self.db_manager.search(content)
 
+    def iter_search(self, content: str) -> Iterator[NoteWithContent]:
+        return self.db_manager.iter_search(content)
+
+    def full_text_search(self, query: str, limit: int | None = None) -> list[SearchResult]:
+        return self.db_manager.full_text_search(query, limit)
+
+    def iter_full_text_search(self, query: str, limit: int | None = None) -> Iterator[SearchResult]:
+        return self.db_manager.iter_full_text_search(query, limit)
+
     def update(self, filepath: str, line: int, note_with_content: NoteWithContent) -> None:
         self.db_manager.update(filepath, line, note_with_content)
 
@@ -60,21 +89,30 @@ class SQLiteRepository(BaseRepository):
     def delete_all_in_file(self, filepath: str) -> None:
         self.db_manager.delete_all_in_file(filepath)
 
-    def prune(self, comments: list[Comment], filepath: str | None) -> list[str]:
-        comments_set = set()
-        for comment in comments:
-            comments_set.add(f"{comment.filepath}:{comment.line}")
+    def move_file(self, filepath: str, new_filepath: str) -> None:
+        self.db_manager.move_file(filepath, new_filepath)
 
-        entry_set = set()
-        entries: list[NoteWithContent] = (
-            self.db_manager.get_by_filepath(filepath) if filepath else self.db_manager.get_all()
-        )
-        for entry in entries:
-            entry_set.add(f"{entry.note.filepath}:{entry.note.line}")
+    def sync_notes(
+        self,
+        notes: list[NoteWithContent],
+        keys: list[tuple[str, int]],
+        filepath: str | None = None,
+        moves: list[tuple[str, int]] | None = None,
+    ) -> list[tuple[str, int]]:
+        return self.db_manager.sync_notes(notes, keys, filepath, moves)
+
+    def get_manifest(self) -> dict[str, FileFingerprint]:
+        return self.db_manager.get_manifest()
+
+    def get_manifest_key(self) -> str | None:
+        return self.db_manager.get_manifest_key()
+
+    def save_manifest(self, fingerprints: list[FileFingerprint], deleted: list[str], key: str | None = None) -> None:
+        self.db_manager.save_manifest(fingerprints, deleted, key)
 
-        items_to_prune = list(entry_set.difference(comments_set))
-        for item in items_to_prune:
-            item_filepath, line = item.split(":")
-            self.delete(item_filepath, int(line))
+    def clear_manifest(self) -> None:
+        self.db_manager.clear_manifest()
 
-        return items_to_prune
+    def prune(self, comments: list[Comment], filepath: str | None) -> list[tuple[str, int]]:
+        keys = [(comment.filepath, comment.line) for comment in comments]
+        return self.db_manager.prune(keys, filepath)
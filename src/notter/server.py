@@ -0,0 +1,208 @@
+import asyncio
+import contextlib
+import inspect
+import json
+import os
+import socket
+import sys
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict
+from typing import Any
+
+from notter.controller import NoteController
+from notter.exceptions import NotterException, ServerAlreadyRunning
+from notter.model import Comment, NoteType, NoteWithContent, SearchResult
+
+# JSON-RPC 2.0 error codes, -32000 is the first code reserved for application errors
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+NOTTER_ERROR = -32000
+
+# Requests are single lines, but a note may be long
+MAX_LINE_LENGTH = 16 * 1024 * 1024
+
+
+class InvalidParams(ValueError):
+    """The params of a request do not fit its method, reported to the client as INVALID_PARAMS."""
+
+
+def parse_note_type(value: str) -> NoteType:
+    try:
+        return NoteType(value)
+    except ValueError:
+        raise InvalidParams(f"unknown note type {value!r}") from None
+
+
+def encode_result(result: Any) -> Any:
+    if isinstance(result, list):
+        return [encode_result(item) for item in result]
+    if isinstance(result, NoteWithContent):
+        return result.to_dict()
+    if isinstance(result, Comment):
+        return asdict(result)
+    return result
+
+
+class NotterServer:
+    """Serves the controller over JSON-RPC 2.0, one JSON message per line.
+
+    The server keeps the controller, and with it the config, the explorers and the database connection, loaded between
+    requests, so that editors do not pay for the startup of a CLI process on every call.
+    """
+
+    def __init__(self, controller: NoteController, tags: list[str]) -> None:
+        self.controller = controller
+        self.tags = tags
+        self.methods: dict[str, Callable[..., Awaitable[Any]]] = {
+            "ping": self.ping,
+            "create": self.create,
+            "read": self.read,
+            "read_file": self.read_file,
+            "search": self.search,
+            "full_text_search": self.full_text_search,
+            "update": self.update,
+            "delete": self.delete,
+            "discover_file": self.discover_file,
+        }
+
+    async def ping(self) -> str:
+        return "pong"
+
+    async def create(self, filepath: str, line: int, text: str, type: str = NoteType.NOTE) -> None:
+        self.controller.create(filepath, line, text, parse_note_type(type))
+
+    async def read(self, filepath: str, line: int) -> NoteWithContent:
+        return self.controller.read(filepath, line)
+
+    async def read_file(self, filepath: str) -> list[NoteWithContent]:
+        return self.controller.read_file(filepath)
+
+    async def search(self, content: str) -> list[NoteWithContent]:
+        return self.controller.search_note_with_content(content)
+
+    async def full_text_search(self, query: str, limit: int | None = None) -> list[SearchResult]:
+        return self.controller.full_text_search(query, limit)
+
+    async def update(self, filepath: str, line: int, text: str, type: str = NoteType.NOTE) -> None:
+        self.controller.update(filepath, line, text, parse_note_type(type))
+
+    async def delete(self, filepath: str, line: int) -> None:
+        self.controller.delete(filepath, line)
+
+    async def discover_file(self, filepath: str) -> list[Comment]:
+        return await self.controller.discover_single_file(filepath, self.tags)
+
+    async def handle(self, message: str | bytes) -> dict | None:
+        try:
+            request = json.loads(message)
+        except ValueError:
+            return NotterServer.error(None, PARSE_ERROR, "Parse error")
+
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return NotterServer.error(None, INVALID_REQUEST, "Invalid request")
+
+        request_id = request.get("id")
+        method = self.methods.get(request["method"])
+        if method is None:
+            return NotterServer.error(request_id, METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+
+        params = request.get("params") or {}
+        try:
+            # Bound before the call, a TypeError raised by the method itself is a bug rather than bad params
+            if isinstance(params, dict):
+                arguments = inspect.signature(method).bind(**params)
+            elif isinstance(params, list):
+                arguments = inspect.signature(method).bind(*params)
+            else:
+                raise InvalidParams("params must be an object or an array")
+        except (TypeError, InvalidParams) as exc:
+            return NotterServer.error(request_id, INVALID_PARAMS, f"Invalid params: {exc}")
+
+        try:
+            result = encode_result(await method(*arguments.args, **arguments.kwargs))
+        except NotterException as exc:
+            return NotterServer.error(request_id, NOTTER_ERROR, exc.message, type(exc).__name__)
+        except InvalidParams as exc:
+            return NotterServer.error(request_id, INVALID_PARAMS, f"Invalid params: {exc}")
+        except Exception as exc:
+            return NotterServer.error(request_id, INTERNAL_ERROR, f"Internal error: {exc}")
+
+        # Requests without an id are notifications and get no response
+        if "id" not in request:
+            return None
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    async def respond(self, message: str | bytes) -> str | None:
+        """Handles a message and serializes the response. Any failure of the server itself is answered with an
+        INTERNAL_ERROR, so that the client is not left without a response."""
+        response = None
+        try:
+            response = await self.handle(message)
+            return None if response is None else json.dumps(response)
+        except Exception as exc:
+            request_id = response.get("id") if response else None
+            return json.dumps(NotterServer.error(request_id, INTERNAL_ERROR, f"Internal error: {exc}"))
+
+    @staticmethod
+    def error(request_id: Any, code: int, message: str, error_type: str | None = None) -> dict:
+        error: dict[str, Any] = {"code": code, "message": message}
+        if error_type is not None:
+            error["data"] = {"type": error_type}
+        return {"jsonrpc": "2.0", "id": request_id, "error": error}
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                # Left to json.loads to decode, bytes that are not UTF-8 are a parse error
+                response = await self.respond(line)
+                if response is not None:
+                    writer.write(response.encode() + b"\n")
+                    await writer.drain()
+        except (ConnectionError, ValueError):
+            # The client went away, or sent a line over the limit
+            pass
+        finally:
+            writer.close()
+
+    async def serve_unix(self, socket_path: str, started: Callable[[], None] | None = None) -> None:
+        if is_server_running(socket_path):
+            raise ServerAlreadyRunning
+        # Left behind by a server that did not shut down cleanly
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(socket_path)
+
+        server = await asyncio.start_unix_server(self._serve_connection, socket_path, limit=MAX_LINE_LENGTH)
+        # Only the user running the server may talk to it
+        os.chmod(socket_path, 0o600)
+        try:
+            if started is not None:
+                started()
+            async with server:
+                await server.serve_forever()
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(socket_path)
+
+    async def serve_stdio(self) -> None:
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=MAX_LINE_LENGTH)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        while line := await reader.readline():
+            response = await self.respond(line)
+            if response is not None:
+                sys.stdout.write(response + "\n")
+                sys.stdout.flush()
+
+
+def is_server_running(socket_path: str) -> bool:
+    if not os.path.exists(socket_path):
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
@@ -11,6 +11,96 @@ CREATE TABLE IF NOT EXISTS notes (
 )
 """
 
+CREATE_FILE_TABLE = """
+CREATE TABLE IF NOT EXISTS files (
+    filepath TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    inode INTEGER,
+    content_hash TEXT
+)
+"""
+
+# The UNIQUE(filepath, line) index already serves filepath lookups and prefix ranges, so filepath gets no index of its
+# own. (type, updated_at) answers type filters already sorted by recency, and covers counting notes per type.
+CREATE_NOTE_TYPE_INDEX = "CREATE INDEX IF NOT EXISTS notes_type ON notes (type, updated_at)"
+CREATE_NOTE_UPDATED_AT_INDEX = "CREATE INDEX IF NOT EXISTS notes_updated_at ON notes (updated_at)"
+
+# Full-text index over notes, an external content table so the text is not stored twice. It is kept in sync by the
+# triggers below and refers to notes by rowid, so it needs a 'rebuild' if the notes table is ever vacuumed.
+CREATE_NOTE_FTS_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    content,
+    filepath,
+    content = 'notes',
+    content_rowid = 'rowid'
+)
+"""
+
+# Same, with the trigram tokenizer which answers LIKE '%x%' queries from the index (optional, see `search_trigram`)
+CREATE_NOTE_TRIGRAM_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_trigram USING fts5(
+    content,
+    content = 'notes',
+    content_rowid = 'rowid',
+    tokenize = 'trigram'
+)
+"""
+
+CREATE_NOTE_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+        INSERT INTO notes_fts (rowid, content, filepath) VALUES (new.rowid, new.content, new.filepath);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+        INSERT INTO notes_fts (notes_fts, rowid, content, filepath)
+        VALUES ('delete', old.rowid, old.content, old.filepath);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE OF content, filepath ON notes BEGIN
+        INSERT INTO notes_fts (notes_fts, rowid, content, filepath)
+        VALUES ('delete', old.rowid, old.content, old.filepath);
+        INSERT INTO notes_fts (rowid, content, filepath) VALUES (new.rowid, new.content, new.filepath);
+    END
+    """,
+]
+
+CREATE_NOTE_TRIGRAM_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS notes_trigram_insert AFTER INSERT ON notes BEGIN
+        INSERT INTO notes_trigram (rowid, content) VALUES (new.rowid, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notes_trigram_delete AFTER DELETE ON notes BEGIN
+        INSERT INTO notes_trigram (notes_trigram, rowid, content) VALUES ('delete', old.rowid, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notes_trigram_update AFTER UPDATE OF content ON notes BEGIN
+        INSERT INTO notes_trigram (notes_trigram, rowid, content) VALUES ('delete', old.rowid, old.content);
+        INSERT INTO notes_trigram (rowid, content) VALUES (new.rowid, new.content);
+    END
+    """,
+]
+
+REBUILD_NOTE_FTS = "INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')"
+REBUILD_NOTE_TRIGRAM = "INSERT INTO notes_trigram (notes_trigram) VALUES ('rebuild')"
+HAS_NOTE_TRIGRAM = "SELECT 1 FROM sqlite_master WHERE name = 'notes_trigram'"
+DROP_NOTE_TRIGRAM = [
+    "DROP TRIGGER IF EXISTS notes_trigram_insert",
+    "DROP TRIGGER IF EXISTS notes_trigram_delete",
+    "DROP TRIGGER IF EXISTS notes_trigram_update",
+    "DROP TABLE IF EXISTS notes_trigram",
+]
+
+GET_USER_VERSION = "PRAGMA user_version"
+SET_USER_VERSION = "PRAGMA user_version = {version}"
+ANALYZE = "ANALYZE"
+
 INSERT_NOTE = """
 INSERT INTO notes (
     id,
@@ -33,11 +123,114 @@ UPDATE notes SET
     content = ? WHERE id = ?
 """
 
+# Keeps the id and creation date of existing notes, and skips the write if nothing changed
+UPSERT_NOTE = """
+INSERT INTO notes (
+    id,
+    filepath,
+    line,
+    type,
+    created_at,
+    updated_at,
+    content
+) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(filepath, line) DO UPDATE SET
+    type = excluded.type,
+    updated_at = excluded.updated_at,
+    content = excluded.content
+WHERE notes.type IS NOT excluded.type OR notes.content IS NOT excluded.content
+"""
+
+# Holds the (filepath, line) keys found by a discovery, so that stale notes are pruned with a single statement
+CREATE_DISCOVERED_TABLE = """
+CREATE TEMP TABLE IF NOT EXISTS discovered (
+    filepath TEXT,
+    line INTEGER,
+    PRIMARY KEY (filepath, line)
+) WITHOUT ROWID
+"""
+
+INSERT_DISCOVERED = "INSERT OR IGNORE INTO discovered (filepath, line) VALUES (?, ?)"
+CLEAR_DISCOVERED = "DELETE FROM discovered"
+
+PRUNE_NOTES = """
+DELETE FROM notes
+WHERE (:filepath IS NULL OR filepath = :filepath)
+AND NOT EXISTS (
+    SELECT 1 FROM discovered WHERE discovered.filepath = notes.filepath AND discovered.line = notes.line
+)
+RETURNING filepath, line
+"""
+
+# Notes whose comment moved to another line are first parked at unique negative lines, then placed at their new line,
+# so that notes swapping lines never conflict with each other. A stale note still at the new line is deleted first,
+# the conflict would otherwise make the move a no-op
+PARK_NOTE = "UPDATE notes SET line = -1 - line WHERE id = ?"
+CLEAR_NOTE_TARGET = "DELETE FROM notes WHERE line = :line AND filepath = (SELECT filepath FROM notes WHERE id = :id)"
+MOVE_NOTE = "UPDATE notes SET line = :line WHERE id = :id"
+
 DELETE_NOTE = "DELETE FROM notes WHERE id = ?"
 DELETE_NOTES_IN_FILE = "DELETE FROM notes WHERE filepath = ?"
+# Notes conflicting with an existing one at the new path are ignored, and deleted along with the rest of the old file
+MOVE_NOTES_TO_FILE = "UPDATE notes SET filepath = ? WHERE filepath = ?"
 GET_NOTE = "SELECT * FROM notes WHERE id = ?"
 GET_NOTES = "SELECT * FROM notes"
 GET_NOTE_BY_FILEPATH = "SELECT * FROM notes WHERE filepath = ?"
 GET_NOTE_BY_FILEPATH_AND_LINE = "SELECT * FROM notes WHERE filepath = ? AND line = ?"
 GET_NOTE_BY_TYPE = "SELECT * FROM notes WHERE type = ?"
+# Every filter is optional, the path prefix is matched as a range so that the (filepath, line) index can serve it
+GET_NOTES_FILTERED = """
+SELECT * FROM notes
+WHERE (:type IS NULL OR type = :type)
+AND (:prefix IS NULL OR (filepath >= :prefix AND filepath < :prefix_end))
+AND (:updated_since IS NULL OR updated_at >= :updated_since)
+ORDER BY filepath, line
+"""
 SEARCH_NOTES_WITH_CONTENT = "SELECT * FROM notes WHERE content LIKE ?"
+SEARCH_NOTES_WITH_CONTENT_TRIGRAM = """
+SELECT notes.* FROM notes_trigram
+JOIN notes ON notes.rowid = notes_trigram.rowid
+WHERE notes_trigram.content LIKE ?
+"""
+
+# Best matches first, a match in the content weighs twice as much as one in the filepath
+SEARCH_NOTES_FULL_TEXT = """
+SELECT notes.*, snippet(notes_fts, 0, :start, :end, '...', :tokens), bm25(notes_fts, 1.0, 0.5) AS rank
+FROM notes_fts
+JOIN notes ON notes.rowid = notes_fts.rowid
+WHERE notes_fts MATCH :query
+ORDER BY rank
+LIMIT :limit
+"""
+
+UPSERT_FILE = """
+INSERT INTO files (
+    filepath,
+    size,
+    mtime_ns,
+    inode,
+    content_hash
+) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(filepath) DO UPDATE SET
+    size = excluded.size,
+    mtime_ns = excluded.mtime_ns,
+    inode = excluded.inode,
+    content_hash = excluded.content_hash
+"""
+
+DELETE_FILE = "DELETE FROM files WHERE filepath = ?"
+DELETE_FILES = "DELETE FROM files"
+GET_FILES = "SELECT filepath, size, mtime_ns, inode, content_hash FROM files"
+
+CREATE_SETTING_TABLE = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+)
+"""
+
+GET_SETTING = "SELECT value FROM settings WHERE key = ?"
+SET_SETTING = """
+INSERT INTO settings (key, value) VALUES (?, ?)
+ON CONFLICT(key) DO UPDATE SET value = excluded.value
+"""
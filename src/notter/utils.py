@@ -1,3 +1,5 @@
+import dataclasses
+import functools
 import json
 import os
 from typing import Any
@@ -7,8 +9,16 @@ import click
 import notter.constants as ncons
 
 
+@functools.cache
+def field_names(cls: type) -> tuple[str, ...]:
+    return tuple(field.name for field in dataclasses.fields(cls))
+
+
 class CustomEncoder(json.JSONEncoder):
     def default(self, o):
+        # The model classes have slots instead of a __dict__
+        if dataclasses.is_dataclass(o):
+            return {name: getattr(o, name) for name in field_names(type(o))}
         return o.__dict__
 
 
@@ -23,6 +33,22 @@ def load_config(config_file: str) -> dict[str, Any] | None:
     return config_data
 
 
+def to_bool(value: Any) -> bool:
+    # Configs set through the CLI are stored as strings
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def to_list(value: Any) -> list[str]:
+    # Lists set through the CLI are stored as comma separated strings
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return [str(item) for item in value]
+
+
 def convert_to_local_path(filepath: str, src_path: str) -> str:
     filepath = filepath.replace(src_path, "")
     if filepath.startswith(os.sep):
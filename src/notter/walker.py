@@ -0,0 +1,301 @@
+import os
+import re
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+IGNORE_FILENAMES = (".gitignore", ".notterignore")
+# Never worth scanning, on top of the ignore files and the configured excludes
+DEFAULT_EXCLUDE = (
+    ".git",
+    ".hg",
+    ".svn",
+    ".notter",
+    "node_modules",
+    "venv",
+    ".venv",
+    "__pycache__",
+    ".tox",
+    ".nox",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".ruff_cache",
+)
+
+
+def translate_pattern(pattern: str) -> str:
+    """Translates a gitignore glob into a regex matching a slash separated relative path."""
+    parts = []
+    idx, length = 0, len(pattern)
+    while idx < length:
+        char = pattern[idx]
+        if char == "*" and pattern.startswith("**", idx):
+            idx += 2
+            if idx < length and pattern[idx] == "/":
+                # `**/` matches zero or more leading directories
+                parts.append("(?:.*/)?")
+                idx += 1
+            else:
+                parts.append(".*")
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[" and (end := pattern.find("]", idx + 2)) != -1:
+            body = pattern[idx + 1 : end].replace("\\", "\\\\")
+            parts.append(f"[^{body[1:]}]" if body.startswith("!") else f"[{body}]")
+            idx = end
+        elif char == "\\" and idx + 1 < length:
+            idx += 1
+            parts.append(re.escape(pattern[idx]))
+        else:
+            parts.append(re.escape(char))
+        idx += 1
+    return "".join(parts)
+
+
+@dataclass(frozen=True)
+class IgnoreRule:
+    pattern: re.Pattern
+    negate: bool
+    dir_only: bool
+
+    @staticmethod
+    def parse(line: str) -> "IgnoreRule | None":
+        line = line.rstrip("\n")
+        if not line.endswith("\\ "):
+            line = line.rstrip()
+        if not line or line.startswith("#"):
+            return None
+
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith(("\\!", "\\#")):
+            line = line[1:]
+
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+
+        # A pattern with a slash is relative to the ignore file, otherwise it matches at any depth
+        anchored = "/" in line
+        regex = translate_pattern(line.lstrip("/"))
+        if not anchored:
+            regex = f"(?:.*/)?{regex}"
+        return IgnoreRule(re.compile(regex, re.DOTALL), negate, dir_only)
+
+
+class IgnoreFile:
+    """The compiled rules of one ignore file, matched against paths relative to the directory it is in.
+
+    Without negations, which is the common case, all rules are merged into one regex per entry kind, so checking a
+    path costs a single match however many patterns there are.
+    """
+
+    def __init__(self, base: str, rules: list[IgnoreRule]) -> None:
+        self.base = base
+        self.rules = rules
+        self.merged: dict[bool, re.Pattern | None] | None = None
+        if not any(rule.negate for rule in rules):
+            self.merged = {
+                is_dir: IgnoreFile._merge([rule for rule in rules if is_dir or not rule.dir_only])
+                for is_dir in (False, True)
+            }
+
+    @staticmethod
+    def _merge(rules: list[IgnoreRule]) -> re.Pattern | None:
+        if not rules:
+            return None
+        return re.compile("|".join(f"(?:{rule.pattern.pattern})" for rule in rules), re.DOTALL)
+
+    @staticmethod
+    def from_lines(base: str, lines: Iterable[str]) -> "IgnoreFile":
+        return IgnoreFile(base, [rule for line in lines if (rule := IgnoreRule.parse(line)) is not None])
+
+    @staticmethod
+    def load(base: str, filenames: Iterable[str] = IGNORE_FILENAMES) -> "IgnoreFile | None":
+        lines: list[str] = []
+        for filename in filenames:
+            try:
+                with open(os.path.join(base, filename), encoding="utf-8", errors="replace") as file:
+                    lines.extend(file)
+            except OSError:
+                continue
+        ignore_file = IgnoreFile.from_lines(base, lines)
+        return ignore_file if ignore_file.rules else None
+
+    def match(self, relpath: str, is_dir: bool) -> bool | None:
+        """Returns whether the path is ignored, or None if no rule of this file applies to it."""
+        if self.merged is not None:
+            pattern = self.merged[is_dir]
+            return True if pattern is not None and pattern.fullmatch(relpath) else None
+
+        # The last matching rule wins
+        for rule in reversed(self.rules):
+            if (is_dir or not rule.dir_only) and rule.pattern.fullmatch(relpath):
+                return not rule.negate
+        return None
+
+
+class Walker:
+    """Finds source files below a root directory with `os.scandir`.
+
+    Whole subtrees are pruned as soon as a directory is excluded or ignored, so vendored and generated directories are
+    never listed. Ignore files are read and compiled once per directory, including those of the parent directories up
+    to the repository root. Directories are tracked by (dev, inode) so that symlink loops are skipped, and files by
+    (dev, inode) so that hardlinked (or symlinked) copies are only returned once.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        extensions: Iterable[str] | None = None,
+        exclude: Iterable[str] = (),
+        follow_symlinks: bool = False,
+        ignore_filenames: Iterable[str] = IGNORE_FILENAMES,
+    ) -> None:
+        self.root = os.path.abspath(root)
+        self.extensions = {ext.lower() for ext in extensions} if extensions is not None else None
+        self.exclude = IgnoreFile.from_lines(self.root, [*DEFAULT_EXCLUDE, *exclude])
+        self.follow_symlinks = follow_symlinks
+        self.ignore_filenames = tuple(ignore_filenames)
+
+    def _parent_ignore_files(self) -> list[IgnoreFile]:
+        # Ignore files above the root only apply if the root is inside a repository
+        if os.path.exists(os.path.join(self.root, ".git")):
+            return []
+
+        parents = []
+        path = self.root
+        while (parent := os.path.dirname(path)) != path:
+            path = parent
+            parents.append(path)
+            if os.path.exists(os.path.join(path, ".git")):
+                break
+        else:
+            return []
+
+        ignore_files = [IgnoreFile.load(parent, self.ignore_filenames) for parent in reversed(parents)]
+        return [ignore_file for ignore_file in ignore_files if ignore_file is not None]
+
+    def is_source_file(self, path: str, ignore_files: list[IgnoreFile]) -> bool:
+        if self.extensions is not None and os.path.splitext(path)[1].lower() not in self.extensions:
+            return False
+        return not self.is_ignored(path, False, ignore_files)
+
+    def is_ignored(self, path: str, is_dir: bool, ignore_files: list[IgnoreFile]) -> bool:
+        if self.exclude.match(path[len(self.root) + 1 :], is_dir):
+            return True
+
+        # Deeper ignore files take precedence
+        for ignore_file in reversed(ignore_files):
+            ignored = ignore_file.match(path[len(ignore_file.base) + 1 :], is_dir)
+            if ignored is not None:
+                return ignored
+        return False
+
+    def filter_paths(self, paths: Iterable[str]) -> list[str]:
+        """Keeps the paths of source files the walk would find, without walking the tree, e.g. files reported by git.
+        Only the ignore files of their directories are loaded, the files themselves need not exist anymore."""
+        # Ignore files that apply inside each directory, or None if the directory is not walked
+        directories: dict[str, list[IgnoreFile] | None] = {}
+
+        def ignore_files_in(directory: str) -> list[IgnoreFile] | None:
+            if directory not in directories:
+                if directory == self.root:
+                    ignore_files: list[IgnoreFile] | None = self._parent_ignore_files()
+                elif not directory.startswith(self.root + os.sep):
+                    ignore_files = None
+                else:
+                    ignore_files = ignore_files_in(os.path.dirname(directory))
+                    if ignore_files is not None and self.is_ignored(directory, True, ignore_files):
+                        ignore_files = None
+                if ignore_files is not None:
+                    ignore_file = IgnoreFile.load(directory, self.ignore_filenames)
+                    if ignore_file is not None:
+                        ignore_files = [*ignore_files, ignore_file]
+                directories[directory] = ignore_files
+            return directories[directory]
+
+        selected = []
+        for path in paths:
+            path = os.path.abspath(path)
+            ignore_files = ignore_files_in(os.path.dirname(path))
+            if ignore_files is not None and self.is_source_file(path, ignore_files):
+                selected.append(path)
+        return selected
+
+    def walk(self) -> Iterator[str]:
+        for path, is_dir, _ in self.entries():
+            if not is_dir:
+                yield path
+
+    def entries(
+        self, start: str | None = None, ignore_files: list[IgnoreFile] | None = None
+    ) -> Iterator[tuple[str, bool, list[IgnoreFile]]]:
+        """Yields (path, is_dir, ignore files that apply inside the directory of path) for every directory visited and
+        every file found, starting at the root or at `start`, a directory below it with the given ignore files."""
+        start = self.root if start is None else os.path.abspath(start)
+        try:
+            start_stat = os.stat(start)
+        except OSError:
+            return
+
+        seen_dirs = {(start_stat.st_dev, start_stat.st_ino)}
+        seen_files: set[tuple[int, int]] = set()
+        if ignore_files is None:
+            ignore_files = self._parent_ignore_files()
+        stack = [(start, start_stat.st_dev, ignore_files)]
+        while stack:
+            path, dev, ignore_files = stack.pop()
+            ignore_file = IgnoreFile.load(path, self.ignore_filenames)
+            if ignore_file is not None:
+                ignore_files = [*ignore_files, ignore_file]
+            yield path, True, ignore_files
+
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                continue
+
+            for entry in entries:
+                try:
+                    is_symlink = entry.is_symlink()
+                    is_dir = entry.is_dir(follow_symlinks=self.follow_symlinks)
+                    if not is_dir and not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+
+                if is_dir:
+                    if self.is_ignored(entry.path, True, ignore_files):
+                        continue
+                    try:
+                        # Mount points and followed symlinks have a different device than their parent
+                        entry_stat = entry.stat()
+                    except OSError:
+                        continue
+                    key = (entry_stat.st_dev, entry_stat.st_ino)
+                    if key not in seen_dirs:
+                        seen_dirs.add(key)
+                        stack.append((entry.path, entry_stat.st_dev, ignore_files))
+                    continue
+
+                if not self.is_source_file(entry.path, ignore_files):
+                    continue
+
+                # The inode of a regular file comes with the directory listing, only symlinks need a stat call
+                try:
+                    if is_symlink:
+                        entry_stat = entry.stat()
+                        key = (entry_stat.st_dev, entry_stat.st_ino)
+                    else:
+                        key = (dev, entry.inode())
+                except OSError:
+                    continue
+                if key in seen_files:
+                    continue
+                seen_files.add(key)
+                yield entry.path, False, ignore_files
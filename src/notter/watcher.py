@@ -0,0 +1,220 @@
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+import sys
+from collections.abc import AsyncIterator
+
+import click
+
+import notter.constants as ncons
+from notter.walker import IgnoreFile, Walker
+
+# Wait this long after the last event before syncing, so that bursts like a checkout or a formatter run coalesce
+DEFAULT_DEBOUNCE = 0.1
+# But never delay a batch by more than this, even if events keep coming
+DEFAULT_MAX_DELAY = 1.0
+DEFAULT_POLL_INTERVAL = ncons.WATCH_POLL_INTERVAL
+
+# Marks that events were lost and every file has to be checked, e.g. when the inotify queue overflowed
+RESCAN = None
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR | IN_EXCL_UNLINK
+)
+# inotify_add_watch fails with these once `fs.inotify.max_user_watches` is reached
+WATCH_LIMIT_ERRORS = {errno.ENOSPC, errno.ENOMEM}
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+
+async def debounce(
+    queue: "asyncio.Queue[str | None]", delay: float = DEFAULT_DEBOUNCE, max_delay: float = DEFAULT_MAX_DELAY
+) -> AsyncIterator[set[str] | None]:
+    """Groups the paths put on the queue into batches, a batch is `RESCAN` if any of its items was."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = {await queue.get()}
+        deadline = loop.time() + max_delay
+        while (timeout := min(delay, deadline - loop.time())) > 0:
+            # wait_for raises asyncio.TimeoutError, not the builtin TimeoutError before Python 3.11
+            try:
+                batch.add(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:  # noqa: UP041
+                break
+
+        yield RESCAN if RESCAN in batch else {path for path in batch if path is not None}
+
+
+class InotifyWatcher:
+    """Watches every directory the walker would visit with inotify, so that nothing runs while no file changes.
+
+    If the system runs out of inotify watches, some directories could not be watched, the watcher then falls back to
+    polling rather than missing their changes.
+    """
+
+    def __init__(
+        self,
+        walker: Walker,
+        delay: float = DEFAULT_DEBOUNCE,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        interval: float = DEFAULT_POLL_INTERVAL,
+    ) -> None:
+        self.walker = walker
+        self.delay = delay
+        self.max_delay = max_delay
+        self.interval = interval
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = -1
+        # Watch descriptor -> (directory, ignore files that apply inside of it)
+        self.watches: dict[int, tuple[str, list[IgnoreFile]]] = {}
+        self.out_of_watches = False
+
+    @staticmethod
+    def is_supported() -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+        except OSError:
+            return False
+        return hasattr(libc, "inotify_init1")
+
+    def _add_watches(self, start: str | None, ignore_files: list[IgnoreFile] | None, queue: asyncio.Queue) -> None:
+        # Files already in a new directory (e.g. created by a checkout before the watch was added) are reported too
+        for path, is_dir, entry_ignore_files in self.walker.entries(start, ignore_files):
+            if not is_dir:
+                if start is not None:
+                    queue.put_nowait(path)
+                continue
+
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+            if wd >= 0:
+                self.watches[wd] = (path, entry_ignore_files)
+            elif ctypes.get_errno() in WATCH_LIMIT_ERRORS:
+                # Other errors are for directories that are gone or cannot be read, and would not be walked either
+                self.out_of_watches = True
+                queue.put_nowait(RESCAN)
+                return
+
+    def _read_events(self, queue: asyncio.Queue) -> None:
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                return
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + EVENT_HEADER.size : offset + EVENT_HEADER.size + length].rstrip(b"\0"))
+                offset += EVENT_HEADER.size + length
+                self._handle_event(wd, mask, name, queue)
+
+    def _handle_event(self, wd: int, mask: int, name: str, queue: asyncio.Queue) -> None:
+        if mask & IN_Q_OVERFLOW:
+            queue.put_nowait(RESCAN)
+            return
+        if mask & IN_IGNORED:
+            self.watches.pop(wd, None)
+            return
+        if wd not in self.watches or not name:
+            return
+
+        directory, ignore_files = self.watches[wd]
+        path = os.path.join(directory, name)
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO) and not self.walker.is_ignored(path, True, ignore_files):
+                self._add_watches(path, ignore_files, queue)
+            elif mask & IN_MOVED_FROM:
+                # The files that were in the directory are not known here, let the rescan find them gone
+                queue.put_nowait(RESCAN)
+        elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE):
+            if self.walker.is_source_file(path, ignore_files):
+                queue.put_nowait(path)
+
+    async def watch(self) -> AsyncIterator[set[str] | None]:
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        queue: asyncio.Queue[str | None] = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        try:
+            self._add_watches(None, None, queue)
+            if not self.out_of_watches:
+                loop.add_reader(self.fd, self._read_events, queue)
+                async for batch in debounce(queue, self.delay, self.max_delay):
+                    # Ends with the rescan that follows running out of watches, polling takes over from there
+                    yield batch
+                    if self.out_of_watches:
+                        break
+        finally:
+            loop.remove_reader(self.fd)
+            os.close(self.fd)
+            self.watches.clear()
+
+        click.secho(
+            "Out of inotify watches, polling for changes instead. Raise fs.inotify.max_user_watches to watch this "
+            "folder with inotify.",
+            fg="yellow",
+            err=True,
+        )
+        async for batch in PollingWatcher(self.walker, self.interval).watch():
+            yield batch
+
+
+class PollingWatcher:
+    """Fallback for platforms without inotify, compares the stat of every file at a fixed interval."""
+
+    def __init__(self, walker: Walker, interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        self.walker = walker
+        self.interval = interval
+
+    def _snapshot(self) -> dict[str, tuple[int, int, int]]:
+        snapshot = {}
+        for path in self.walker.walk():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        return snapshot
+
+    async def watch(self) -> AsyncIterator[set[str] | None]:
+        loop = asyncio.get_running_loop()
+        snapshot = await loop.run_in_executor(None, self._snapshot)
+        while True:
+            await asyncio.sleep(self.interval)
+            current = await loop.run_in_executor(None, self._snapshot)
+            changed = {path for path, stat in current.items() if snapshot.get(path) != stat}
+            changed.update(snapshot.keys() - current.keys())
+            snapshot = current
+            if changed:
+                yield changed
+
+
+def create_watcher(
+    walker: Walker, polling: bool = False, interval: float = DEFAULT_POLL_INTERVAL, delay: float = DEFAULT_DEBOUNCE
+) -> InotifyWatcher | PollingWatcher:
+    if polling or not InotifyWatcher.is_supported():
+        return PollingWatcher(walker, interval)
+    return InotifyWatcher(walker, delay, interval=interval)
@@ -0,0 +1,65 @@
+import pytest
+from notter.anchoring import align, anchor_notes, normalize_text
+from notter.model import Comment, Content, Note, NoteType, NoteWithContent
+
+
+def make_note(note_id: str, filepath: str, line: int, text: str) -> NoteWithContent:
+    return NoteWithContent(Note(note_id, filepath, line, NoteType.TODO), Content(text))
+
+
+def make_comment(filepath: str, line: int, text: str) -> Comment:
+    return Comment(filepath, text, line, NoteType.TODO)
+
+
+def anchored_ids(notes: list[NoteWithContent], comments: list[Comment]) -> dict[int, str]:
+    return {line: note.note.id for (_, line), note in anchor_notes(notes, comments).items()}
+
+
+class TestAnchoring:
+    @pytest.mark.parametrize(
+        ("text", "expected"),
+        [(" TODO: fix  it ", "TODO: fix it"), ("\tTODO:\tfix\nit", "TODO: fix it"), ("", "")],
+    )
+    def test_normalize_text(self, text: str, expected: str) -> None:
+        assert normalize_text(text) == expected
+
+    def test_anchor_unchanged(self) -> None:
+        notes = [make_note("1", "a.py", 1, "TODO: a"), make_note("2", "a.py", 2, "TODO: b")]
+
+        assert anchored_ids(notes, [make_comment("a.py", 1, "TODO: a"), make_comment("a.py", 2, "TODO: b")]) == {
+            1: "1",
+            2: "2",
+        }
+
+    def test_anchor_shifted_lines(self) -> None:
+        notes = [make_note("1", "a.py", 1, "TODO: a"), make_note("2", "a.py", 2, "TODO: b")]
+        comments = [make_comment("a.py", 2, "TODO: a"), make_comment("a.py", 3, " TODO:  b")]
+
+        assert anchored_ids(notes, comments) == {2: "1", 3: "2"}
+
+    def test_anchor_text_changed_in_place(self) -> None:
+        notes = [make_note("1", "a.py", 1, "TODO: a"), make_note("2", "a.py", 5, "TODO: b")]
+        comments = [make_comment("a.py", 1, "TODO: a, changed"), make_comment("a.py", 6, "TODO: new")]
+
+        assert anchored_ids(notes, comments) == {1: "1"}
+
+    def test_anchor_stays_in_file(self) -> None:
+        notes = [make_note("1", "a.py", 1, "TODO: a")]
+
+        assert anchored_ids(notes, [make_comment("b.py", 2, "TODO: a")]) == {}
+
+    def test_anchor_duplicates_nearest_line(self) -> None:
+        notes = [make_note("1", "a.py", 10, "TODO"), make_note("2", "a.py", 50, "TODO")]
+        comments = [make_comment("a.py", 3, "TODO"), make_comment("a.py", 48, "TODO"), make_comment("a.py", 90, "TODO")]
+
+        assert anchored_ids(notes, comments) == {3: "1", 48: "2"}
+
+    def test_align_keeps_order(self) -> None:
+        notes = [make_note(str(line), "a.py", line, "TODO") for line in (1, 2, 3)]
+        comments = [make_comment("a.py", line, "TODO") for line in (11, 12, 13)]
+
+        assert [(note.note.line, comment.line) for note, comment in align(notes, comments)] == [
+            (1, 11),
+            (2, 12),
+            (3, 13),
+        ]
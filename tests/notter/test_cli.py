@@ -1,3 +1,6 @@
+import json
+from pathlib import Path
+
 from click.testing import CliRunner
 from notter.cli import cli
 
@@ -10,4 +13,19 @@ class TestCLI:
     #     result = runner.invoke(cli, ["dummy  --version"])
     #     assert result.exit_code == 0
     #     assert result.output.strip("\n") == pkg_version("notter")
-    pass
+
+    def test_search_ndjson(self, tmp_path: Path) -> None:
+        src_path = tmp_path / "src"
+        src_path.mkdir()
+        runner = CliRunner()
+        assert runner.invoke(cli, ["--init", str(src_path)]).exit_code == 0
+        for line, text in ((1, "fix the parser"), (2, "unrelated")):
+            result = runner.invoke(cli, [str(src_path), "create", "a.py", str(line), text, "TODO"])
+            assert result.exit_code == 0, result.output
+
+        result = runner.invoke(cli, [str(src_path), "search", "parser", "--format", "ndjson"])
+
+        assert result.exit_code == 0, result.output
+        rows = [json.loads(line) for line in result.output.splitlines()]
+        assert [(row["content"], row["snippet"]) for row in rows] == [("fix the parser", "fix the [parser]")]
+        assert isinstance(rows[0]["rank"], float)
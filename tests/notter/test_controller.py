@@ -1,11 +1,12 @@
+from datetime import datetime
 from pathlib import Path
 
 import notter.constants as ncons
 
-from unittest.mock import MagicMock, call
+from unittest.mock import MagicMock, call, patch
 from notter.controller import NoteController
-from notter.exceptions import NoteAlreadyExists
-from notter.model import Comment, NoteWithContent
+from notter.explorers.base import LexicalExplorer
+from notter.model import Comment, NoteType, NoteWithContent
 
 
 class TestNoteController:
@@ -45,6 +46,12 @@ class TestNoteController:
 
         note_controller.repository.search.assert_called_once_with("test")
 
+    def test_full_text_search(self, note_controller: NoteController) -> None:
+        note_controller.repository = MagicMock()
+        note_controller.full_text_search("test*", limit=5)
+
+        note_controller.repository.full_text_search.assert_called_once_with("test*", 5)
+
     def test_update(self, note_controller: NoteController) -> None:
         mock_note = "pikachu"
         note_controller.repository = MagicMock()
@@ -59,73 +66,237 @@ class TestNoteController:
 
         note_controller.repository.delete.assert_called_once_with("path/to/file.py", 1)
 
+    def test_export(self, note_controller: NoteController, note_with_content: NoteWithContent) -> None:
+        note_controller.repository = MagicMock()
+        note_controller.repository.iter_notes.return_value = iter([note_with_content])
+
+        count = note_controller.export(format="ndjson", compression="gzip", type=NoteType.TODO, path_prefix="path/")
+
+        assert count == 1
+        assert note_controller.default_export_path("ndjson", "gzip").endswith("todos.ndjson.gz")
+        assert Path(note_controller.default_export_path("ndjson", "gzip")).is_file()
+        note_controller.repository.iter_notes.assert_called_once_with("TODO", "path/", None)
+
+    def _mock_discovery(self, note_controller: NoteController, comments: list[Comment], existing=None) -> None:
+        async def iter_discover(*args, **kwargs):
+            for comment in comments:
+                yield comment
+
+        note_controller.repository = MagicMock()
+        note_controller.repository.get_all.return_value = existing or []
+        note_controller.repository.get_manifest.return_value = {}
+        note_controller.explorer = MagicMock(
+            find_files=MagicMock(return_value=[]), iter_discover=MagicMock(side_effect=iter_discover)
+        )
+
     async def test_discover(self, note_controller: NoteController) -> None:
         mock_comments = [
-            Comment("path/to/file.py", "This is a note", 1, "NOTE"),
-            Comment("path/to/file.py", "This is a todo", 2, "TODO"),
+            Comment("path/to/file.py", "This is a note", 1, NoteType.NOTE),
+            Comment("path/to/file.py", "This is a todo", 2, NoteType.TODO),
         ]
-
-        note_controller.create = MagicMock()
-        note_controller.repository = MagicMock()
-        note_controller.explorer = MagicMock(discover=MagicMock(return_value=mock_comments))
+        self._mock_discovery(note_controller, mock_comments)
 
         comments = await note_controller.discover(["tag1", "tag2"])
 
         assert comments == mock_comments
-        note_controller.repository.prune.assert_called_once_with(mock_comments)
-        note_controller.create.assert_has_calls(
-            [call("path/to/file.py", 1, "This is a note", "NOTE"), call("path/to/file.py", 2, "This is a todo", "TODO")]
-        )
+        note_controller.explorer.iter_discover.assert_called_once_with(["tag1", "tag2"], [])
+        notes, keys, filepath = note_controller.repository.sync_notes.call_args.args
+        assert [(note.note.filepath, note.note.line, note.content.text, note.note.type) for note in notes] == [
+            ("path/to/file.py", 1, "This is a note", NoteType.NOTE),
+            ("path/to/file.py", 2, "This is a todo", NoteType.TODO),
+        ]
+        assert keys == [("path/to/file.py", 1), ("path/to/file.py", 2)]
+        assert filepath is None
 
-    async def test_discover_no_save(self, note_controller: NoteController) -> None:
+    async def test_iter_discover(self, note_controller: NoteController) -> None:
         mock_comments = [
-            Comment("path/to/file.py", "This is a note", 1, "NOTE"),
-            Comment("path/to/file.py", "This is a todo", 2, "TODO"),
+            Comment("path/to/file.py", "This is a todo", 1, NoteType.TODO),
+            Comment("path/to/other.py", "This is a todo", 1, NoteType.TODO),
         ]
+        self._mock_discovery(note_controller, mock_comments)
 
-        note_controller.create = MagicMock()
-        note_controller.repository = MagicMock()
-        note_controller.explorer = MagicMock(discover=MagicMock(return_value=mock_comments))
+        comments = note_controller.iter_discover(["TODO"])
+        assert await anext(comments) == mock_comments[0]
+        # Nothing is written before the discovery is complete
+        note_controller.repository.sync_notes.assert_not_called()
+
+        assert [comment async for comment in comments] == mock_comments[1:]
+        note_controller.repository.sync_notes.assert_called_once()
+        note_controller.repository.save_manifest.assert_called_once()
 
-        comments = await note_controller.discover(["tag1", "tag2"], save_as_notter_notes=False)
+    async def test_discover_stats(self, note_controller: NoteController) -> None:
+        self._mock_discovery(note_controller, [Comment("path/to/file.py", "This is a todo", 1, NoteType.TODO)])
+
+        await note_controller.discover(["TODO"])
+
+        phases = note_controller.explorer.stats.phases
+        assert list(phases) == ["load", "walk", "manifest", "write", "total"]
+        assert phases["total"].seconds >= sum(phases[name].seconds for name in ("load", "walk", "manifest", "write"))
+
+    async def test_discover_unchanged_notes_skip_write(
+        self, note_controller: NoteController, note_with_content: NoteWithContent
+    ) -> None:
+        mock_comments = [
+            Comment("path/to/file", "This is a note", 1, NoteType.TODO),
+            Comment("path/to/file", "This is a todo", 2, NoteType.TODO),
+        ]
+        self._mock_discovery(note_controller, mock_comments, existing=[note_with_content])
+
+        comments = await note_controller.discover(["tag1", "tag2"])
 
         assert comments == mock_comments
-        note_controller.repository.prune.assert_called_once_with(mock_comments)
-        note_controller.create.assert_not_called()
+        notes, keys, _ = note_controller.repository.sync_notes.call_args.args
+        assert [note.location_id for note in notes] == ["path/to/file:2"]
+        assert keys == [("path/to/file", 1), ("path/to/file", 2)]
 
     async def test_discover_duplicate_comment(self, note_controller: NoteController) -> None:
-        mock_comments = [Comment("path/to/file.py", "This is a note", 1, "NOTE")]
-        note_controller.create = MagicMock()
-        note_controller.create.side_effect = NoteAlreadyExists
-        note_controller.repository = MagicMock()
-        note_controller.explorer = MagicMock(discover=MagicMock(return_value=mock_comments))
+        mock_comments = [
+            Comment("path/to/file.py", "This is a note", 1, NoteType.NOTE),
+            Comment("path/to/file.py", "This is another note", 1, NoteType.NOTE),
+        ]
+        self._mock_discovery(note_controller, mock_comments)
 
         comments = await note_controller.discover(["tag1", "tag2"])
 
         assert comments == mock_comments
-        note_controller.repository.prune.assert_called_once_with(mock_comments)
-        note_controller.create.assert_called_once_with("path/to/file.py", 1, "This is a note", "NOTE")
+        notes, _, _ = note_controller.repository.sync_notes.call_args.args
+        assert [note.content.text for note in notes] == ["This is a note"]
 
-    async def test_discover_no_comments(self, note_controller: NoteController) -> None:
-        mock_comments = []
-        note_controller.create = MagicMock()
-        note_controller.repository = MagicMock()
-        note_controller.explorer = MagicMock(discover=MagicMock(return_value=mock_comments))
+    async def test_discover_no_comments(
+        self, note_controller: NoteController, note_with_content: NoteWithContent
+    ) -> None:
+        self._mock_discovery(note_controller, [], existing=[note_with_content])
 
         comments = await note_controller.discover(["tag1", "tag2"])
 
-        assert comments == mock_comments
-        note_controller.repository.prune.assert_called_once_with(mock_comments)
-        note_controller.create.assert_not_called()
+        assert comments == []
+        note_controller.repository.sync_notes.assert_called_once_with([], [], None, moves=[])
 
     async def test_discover_no_tags(self, note_controller: NoteController) -> None:
-        mock_comments = []
-        note_controller.create = MagicMock()
-        note_controller.repository = MagicMock()
-        note_controller.explorer = MagicMock(discover=MagicMock(return_value=mock_comments))
+        self._mock_discovery(note_controller, [])
 
         comments = await note_controller.discover([])
 
-        assert comments == mock_comments
-        note_controller.repository.prune.assert_called_once_with(mock_comments)
-        note_controller.create.assert_not_called()
+        assert comments == []
+        note_controller.explorer.iter_discover.assert_called_once_with([], [])
+        note_controller.repository.sync_notes.assert_called_once_with([], [], None, moves=[])
+
+    async def test_discover_keeps_moved_notes(self, note_controller: NoteController) -> None:
+        src_path = Path(note_controller.notter.get_config(ncons.SRC_PATH))
+        src_path.mkdir(parents=True, exist_ok=True)
+        file_a = src_path / "a.py"
+        file_a.write_text("# TODO: first\nx = 1\n# TODO: second\n")
+        await note_controller.discover(["TODO"])
+        before = {note.content.text: note.note for note in note_controller.get_all()}
+
+        file_a.write_text("import os\n\n#   TODO:   first\nx = 1\n# TODO: second\n# TODO: third\n")
+        await note_controller.discover(["TODO"])
+
+        after = {note.content.text: note.note for note in note_controller.get_all()}
+        assert sorted((note.line, text) for text, note in after.items()) == [
+            (3, "   TODO:   first"),
+            (5, " TODO: second"),
+            (6, " TODO: third"),
+        ]
+        assert after["   TODO:   first"].id == before[" TODO: first"].id
+        assert (after[" TODO: second"].id, after[" TODO: second"].created_at) == (
+            before[" TODO: second"].id,
+            before[" TODO: second"].created_at,
+        )
+
+    async def test_discover_stamps_updated_at(self, note_controller: NoteController) -> None:
+        src_path = Path(note_controller.notter.get_config(ncons.SRC_PATH))
+        src_path.mkdir(parents=True, exist_ok=True)
+        file_a = src_path / "a.py"
+        file_a.write_text("# TODO: first\n")
+        await note_controller.discover(["TODO"])
+        (before,) = note_controller.get_all()
+
+        file_a.write_text("# TODO: edited\n")
+        with patch("notter.model.datetime") as mock_datetime:
+            mock_datetime.now.return_value = datetime(2100, 1, 1)
+            await note_controller.discover(["TODO"])
+
+        (after,) = note_controller.get_all()
+        assert (after.note.id, after.note.created_at) == (before.note.id, before.note.created_at)
+        assert after.note.updated_at == "2100-01-01T00:00:00"
+
+    async def test_discover_incremental(self, note_controller: NoteController) -> None:
+        src_path = Path(note_controller.notter.get_config(ncons.SRC_PATH))
+        src_path.mkdir(parents=True, exist_ok=True)
+        file_a, file_b = src_path / "a.py", src_path / "b.py"
+        file_a.write_text("x = 1  # TODO: first\n")
+        file_b.write_text("# FIXME: second\n")
+
+        comments = await note_controller.discover(["TODO", "FIXME"])
+        assert sorted(comment.location_id for comment in comments) == [f"{file_a}:1", f"{file_b}:1"]
+
+        explorer_iter_discover = note_controller.explorer.iter_discover
+        note_controller.explorer.iter_discover = MagicMock(side_effect=explorer_iter_discover)
+        comments = await note_controller.discover(["TODO", "FIXME"])
+        assert sorted(comment.text for comment in comments) == [" FIXME: second", " TODO: first"]
+        note_controller.explorer.iter_discover.assert_called_once_with(["TODO", "FIXME"], [])
+
+        file_b.unlink()
+        comments = await note_controller.discover(["TODO", "FIXME"])
+        assert [comment.location_id for comment in comments] == [f"{file_a}:1"]
+        assert [note.location_id for note in note_controller.get_all()] == [f"{file_a}:1"]
+        assert list(note_controller.repository.get_manifest()) == [str(file_a)]
+
+    async def test_discover_incremental_settings_changed(self, note_controller: NoteController) -> None:
+        src_path = Path(note_controller.notter.get_config(ncons.SRC_PATH))
+        src_path.mkdir(parents=True, exist_ok=True)
+        file_a = src_path / "a.py"
+        file_a.write_text("# TODO: first\n# HACK: second\n")
+        await note_controller.discover(["TODO"])
+
+        # Same files, other tags
+        comments = await note_controller.discover(["TODO", "HACK"])
+        assert sorted(comment.text for comment in comments) == [" HACK: second", " TODO: first"]
+
+        with patch.object(ncons, "PARSER_VERSION", ncons.PARSER_VERSION + 1):
+            explorer_iter_discover = note_controller.explorer.iter_discover
+            note_controller.explorer.iter_discover = MagicMock(side_effect=explorer_iter_discover)
+            await note_controller.discover(["TODO", "HACK"])
+        note_controller.explorer.iter_discover.assert_called_once_with(["TODO", "HACK"], [str(file_a)])
+
+    async def test_discover_incremental_retries_unreadable(self, note_controller: NoteController) -> None:
+        src_path = Path(note_controller.notter.get_config(ncons.SRC_PATH))
+        src_path.mkdir(parents=True, exist_ok=True)
+        file_a, file_b = src_path / "a.py", src_path / "b.py"
+        file_a.write_text("# TODO: first\n")
+        file_b.write_text("# TODO: second\n")
+
+        read_file = LexicalExplorer._read_file_async
+
+        async def read_file_or_fail(filepath: str) -> str | None:
+            if filepath == str(file_b):
+                raise PermissionError(filepath)
+            return await read_file(filepath)
+
+        with patch.object(LexicalExplorer, "_read_file_async", side_effect=read_file_or_fail):
+            comments = await note_controller.discover(["TODO"])
+        assert [comment.text for comment in comments] == [" TODO: first"]
+        assert list(note_controller.repository.get_manifest()) == [str(file_a)]
+
+        comments = await note_controller.discover(["TODO"])
+        assert sorted(comment.text for comment in comments) == [" TODO: first", " TODO: second"]
+
+    async def test_discover_single_file_vanishing(self, note_controller: NoteController) -> None:
+        src_path = Path(note_controller.notter.get_config(ncons.SRC_PATH))
+        src_path.mkdir(parents=True, exist_ok=True)
+        file_a = src_path / "a.py"
+        file_a.write_text("# TODO: first\n")
+        await note_controller.discover(["TODO"])
+
+        # Deleted between the read and the stat
+        with patch("notter.controller.FileFingerprint.from_path", side_effect=FileNotFoundError):
+            comments = await note_controller.discover_single_file(str(file_a), ["TODO"])
+        assert [comment.text for comment in comments] == [" TODO: first"]
+        assert note_controller.repository.get_manifest() == {}
+
+        await note_controller.discover(["TODO"])
+        with patch.object(note_controller.explorer, "discover_single_file", side_effect=PermissionError):
+            assert await note_controller.discover_single_file(str(file_a), ["TODO"]) == []
+        assert [note.content.text for note in note_controller.get_all()] == [" TODO: first"]
+        assert note_controller.repository.get_manifest() == {}
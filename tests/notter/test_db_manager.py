@@ -0,0 +1,173 @@
+import threading
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+import notter.db_manager as db_manager_module
+from notter.db_manager import DatabaseManager, build_match_query
+from notter.exceptions import NoteNotFound
+from notter.model import Content, Note, NoteType, NoteWithContent
+
+
+def make_note(note_id: str, filepath: str, line: int, text: str, updated_at: str = "2024-01-01") -> NoteWithContent:
+    note = Note(note_id, filepath, line, NoteType.TODO, created_at="2024-01-01", updated_at=updated_at)
+    return NoteWithContent(note, Content(text))
+
+
+class TestDatabaseManager:
+    @pytest.fixture
+    def db_manager(self, temp_directory: Path) -> Generator[DatabaseManager, None, None]:
+        db_manager = DatabaseManager(str(temp_directory / "notes.db"))
+        db_manager.create_tables()
+        yield db_manager
+        db_manager.close()
+
+    def test_sync_notes(self, db_manager: DatabaseManager) -> None:
+        db_manager.sync_notes(
+            [make_note("1", "a.py", 1, "TODO: a"), make_note("2", "a.py", 2, "TODO: b")], [("a.py", 1), ("a.py", 2)]
+        )
+
+        pruned = db_manager.sync_notes(
+            [
+                make_note("3", "a.py", 1, "TODO: a changed", updated_at="2024-02-01"),
+                make_note("5", "b.py", 1, "TODO: c"),
+            ],
+            [("a.py", 1), ("b.py", 1)],
+        )
+
+        assert pruned == [("a.py", 2)]
+        changed = db_manager.get_by_filepath_and_line("a.py", 1)
+        assert (changed.note.id, changed.note.created_at, changed.note.updated_at) == ("1", "2024-01-01", "2024-02-01")
+        assert changed.content.text == "TODO: a changed"
+        assert db_manager.get_by_filepath_and_line("b.py", 1).note.id == "5"
+        with pytest.raises(NoteNotFound):
+            db_manager.get_by_filepath_and_line("a.py", 2)
+
+    def test_sync_notes_skips_unchanged(self, db_manager: DatabaseManager) -> None:
+        db_manager.sync_notes([make_note("1", "a.py", 1, "TODO: a")], [("a.py", 1)])
+        db_manager.sync_notes([make_note("2", "a.py", 1, "TODO: a", updated_at="2024-02-01")], [("a.py", 1)])
+
+        note = db_manager.get_by_filepath_and_line("a.py", 1)
+        assert (note.note.id, note.note.updated_at) == ("1", "2024-01-01")
+
+    def test_sync_notes_moves(self, db_manager: DatabaseManager) -> None:
+        notes = [
+            make_note("1", "a.py", 1, "TODO: a"),
+            make_note("2", "a.py", 2, "TODO: b"),
+            make_note("3", "a.py", 3, "TODO: stale"),
+            make_note("4", "b.py", 2, "TODO: c"),
+        ]
+        db_manager.sync_notes(notes, [note.location for note in notes])
+
+        # The first two notes swap lines, the second one takes the line of a stale note
+        pruned = db_manager.sync_notes(
+            [make_note("5", "a.py", 4, "TODO: new")],
+            [("a.py", 1), ("a.py", 3), ("a.py", 4), ("b.py", 2)],
+            moves=[("1", 3), ("2", 1)],
+        )
+
+        assert pruned == []
+        locations = {note.note.id: note.location for note in db_manager.get_all()}
+        assert locations == {"1": ("a.py", 3), "2": ("a.py", 1), "4": ("b.py", 2), "5": ("a.py", 4)}
+        assert db_manager.get_by_filepath_and_line("a.py", 3).note.created_at == "2024-01-01"
+        assert [result.note.id for result in db_manager.full_text_search("stale")] == []
+
+    def test_prune(self, db_manager: DatabaseManager) -> None:
+        for note_id, (filepath, line) in enumerate([("a.py", 1), ("a.py", 2), ("c:/b.py", 1), ("c:/b.py", 2)]):
+            db_manager.insert(make_note(str(note_id), filepath, line, "TODO"))
+
+        assert db_manager.prune([("a.py", 1)], filepath="a.py") == [("a.py", 2)]
+        assert sorted(db_manager.prune([("a.py", 1), ("c:/b.py", 2), ("new.py", 1)])) == [("c:/b.py", 1)]
+        assert sorted(note.location_id for note in db_manager.get_all()) == ["a.py:1", "c:/b.py:2"]
+        assert sorted(db_manager.prune([])) == [("a.py", 1), ("c:/b.py", 2)]
+        assert db_manager.get_all() == []
+
+    def test_iter_all(self, db_manager: DatabaseManager, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(db_manager_module, "FETCH_SIZE", 2)
+        notes = [make_note(str(line), "a.py", line, f"TODO: {line}") for line in range(1, 6)]
+        db_manager.sync_notes(notes, [(note.note.filepath, note.note.line) for note in notes])
+
+        assert [note.note.id for note in db_manager.iter_all()] == ["1", "2", "3", "4", "5"]
+        assert [note.note.id for note in db_manager.iter_by_filepath("a.py")] == ["1", "2", "3", "4", "5"]
+        assert [note.note.id for note in db_manager.iter_search("TODO: 3")] == ["3"]
+
+    def test_connection_is_reused(self, db_manager: DatabaseManager) -> None:
+        with db_manager.conn as first, db_manager.conn as second:
+            assert first is second
+
+        conn = db_manager.conn.connection
+        assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+        assert conn.execute("PRAGMA synchronous").fetchone() == (1,)
+        assert conn.execute("PRAGMA temp_store").fetchone() == (2,)
+
+    def test_connection_per_thread(self, db_manager: DatabaseManager) -> None:
+        connections = []
+        thread = threading.Thread(target=lambda: connections.append(db_manager.conn.connection))
+        thread.start()
+        thread.join()
+
+        assert connections[0] is not db_manager.conn.connection
+        assert len(db_manager.conn.connections) == 2
+
+    def test_transaction_rollback(self, db_manager: DatabaseManager) -> None:
+        with pytest.raises(RuntimeError):
+            with db_manager.transaction():
+                db_manager.insert(make_note("1", "a.py", 1, "TODO: a"))
+                raise RuntimeError
+
+        assert db_manager.get_all() == []
+        assert not db_manager.conn.connection.in_transaction
+
+    def test_reads_do_not_open_transactions(self, db_manager: DatabaseManager) -> None:
+        db_manager.insert(make_note("1", "a.py", 1, "TODO: a"))
+
+        assert [note.note.id for note in db_manager.get_all()] == ["1"]
+        assert not db_manager.conn.connection.in_transaction
+
+    def test_full_text_search(self, db_manager: DatabaseManager) -> None:
+        db_manager.sync_notes(
+            [
+                make_note("1", "src/cache.py", 1, "TODO: fix the cache invalidation bug"),
+                make_note("2", "src/db.py", 1, "TODO: cache query results, cache them all"),
+                make_note("3", "src/cli.py", 1, "FIXME: bug in the parser"),
+            ],
+            [("src/cache.py", 1), ("src/db.py", 1), ("src/cli.py", 1)],
+        )
+
+        assert [result.note.id for result in db_manager.full_text_search("cache")] == ["2", "1"]
+        assert [result.note.id for result in db_manager.full_text_search("invalid*")] == ["1"]
+        assert [result.note.id for result in db_manager.full_text_search('"the cache"')] == ["1"]
+        assert [result.note.id for result in db_manager.full_text_search("fixme: bug")] == ["3"]
+        assert [result.note.id for result in db_manager.full_text_search("cli")] == ["3"]
+        assert (
+            db_manager.full_text_search("cache", limit=1)[0].snippet == "TODO: [cache] query results, [cache] them all"
+        )
+
+        db_manager.update("src/cli.py", 1, make_note("3", "src/cli.py", 1, "TODO: done"))
+        db_manager.delete("src/db.py", 1)
+        assert [result.note.id for result in db_manager.full_text_search("bug*")] == ["1"]
+        assert [result.note.id for result in db_manager.full_text_search("done")] == ["3"]
+
+    def test_search_trigram(self, db_manager: DatabaseManager) -> None:
+        db_manager.insert(make_note("1", "a.py", 1, "TODO: refactor the Parser"))
+        db_manager.set_trigram_index(True)
+        db_manager.insert(make_note("2", "a.py", 2, "TODO: parse more"))
+
+        assert [note.note.id for note in db_manager.search("pars")] == ["1", "2"]
+        assert [note.note.id for note in db_manager.search("actor the p")] == ["1"]
+
+        db_manager.set_trigram_index(False)
+        assert [note.note.id for note in db_manager.search("pars")] == ["1", "2"]
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ("fix bug", '"fix" "bug"'),
+            ("fix*", '"fix"*'),
+            ('"fix the bug" cache*', '"fix the bug" "cache"*'),
+            ('TODO: say "hi', '"TODO:" "say" """hi"'),
+            ("  * ", ""),
+        ],
+    )
+    def test_build_match_query(self, text: str, expected: str) -> None:
+        assert build_match_query(text) == expected
@@ -0,0 +1,116 @@
+import csv
+import gzip
+import io
+import json
+import os
+from collections.abc import Generator, Iterator
+from pathlib import Path
+
+import pytest
+from notter.db_manager import DatabaseManager
+from notter.export import export_filename, export_notes
+from notter.model import Content, Note, NoteType, NoteWithContent
+
+
+def make_note(note_id: str, filepath: str, line: int, type: NoteType, updated_at: str) -> NoteWithContent:
+    note = Note(note_id, filepath, line, type, created_at="2024-01-01T00:00:00", updated_at=updated_at)
+    return NoteWithContent(note, Content(f"note {note_id}, with a comma"))
+
+
+@pytest.fixture
+def notes() -> list[NoteWithContent]:
+    return [
+        make_note("1", "/src/a.py", 1, NoteType.TODO, "2024-01-01T00:00:00"),
+        make_note("2", "/src/a.py", 5, NoteType.NOTE, "2024-03-01T00:00:00"),
+        make_note("3", "/src/lib/b.py", 2, NoteType.TODO, "2024-02-01T00:00:00"),
+        make_note("4", "/src/lib2/c.py", 3, NoteType.TODO, "2024-04-01T00:00:00"),
+    ]
+
+
+class TestExport:
+    @pytest.mark.parametrize("compression", [None, "gzip"])
+    def test_export_formats(self, notes: list[NoteWithContent], tmp_path: Path, compression: str | None) -> None:
+        expected = [note.to_dict() for note in notes]
+        read = gzip.open if compression else open
+
+        path = tmp_path / export_filename("todos", "json", compression)
+        assert export_notes(iter(notes), str(path), "json", compression) == 4
+        with read(path, "rt", encoding="utf-8") as file:
+            assert json.load(file) == expected
+
+        path = tmp_path / export_filename("todos", "ndjson", compression)
+        export_notes(iter(notes), str(path), "ndjson", compression)
+        with read(path, "rt", encoding="utf-8") as file:
+            assert [json.loads(line) for line in file] == expected
+
+        path = tmp_path / export_filename("todos", "csv", compression)
+        export_notes(iter(notes), str(path), "csv", compression)
+        with read(path, "rt", encoding="utf-8", newline="") as file:
+            rows = list(csv.DictReader(file))
+        assert rows == [{key: str(value) for key, value in row.items()} for row in expected]
+
+    def test_export_empty(self, tmp_path: Path) -> None:
+        path = tmp_path / "todos.json"
+        assert export_notes([], str(path)) == 0
+        assert json.loads(path.read_text()) == []
+
+    def test_export_zstd(self, notes: list[NoteWithContent], tmp_path: Path) -> None:
+        zstandard = pytest.importorskip("zstandard")
+        path = tmp_path / "todos.ndjson.zst"
+        export_notes(notes, str(path), "ndjson", "zstd")
+
+        with zstandard.ZstdDecompressor().stream_reader(path.open("rb")) as reader:
+            lines = io.TextIOWrapper(reader, encoding="utf-8").read().splitlines()
+        assert [json.loads(line)["id"] for line in lines] == ["1", "2", "3", "4"]
+
+    def test_export_is_atomic(self, notes: list[NoteWithContent], tmp_path: Path) -> None:
+        path = tmp_path / "todos.json"
+        path.write_text("[]")
+
+        def failing_notes() -> Iterator[NoteWithContent]:
+            yield notes[0]
+            raise RuntimeError("database went away")
+
+        with pytest.raises(RuntimeError):
+            export_notes(failing_notes(), str(path))
+        # The previous export is untouched and no temporary file is left behind
+        assert path.read_text() == "[]"
+        assert list(tmp_path.iterdir()) == [path]
+
+    def test_export_mode(self, notes: list[NoteWithContent], tmp_path: Path) -> None:
+        path = tmp_path / "todos.json"
+        umask = os.umask(0o027)
+        try:
+            export_notes(notes, str(path))
+        finally:
+            os.umask(umask)
+        assert path.stat().st_mode & 0o777 == 0o640
+
+        # The mode of an existing export is kept
+        path.chmod(0o600)
+        export_notes(notes, str(path))
+        assert path.stat().st_mode & 0o777 == 0o600
+
+
+class TestExportFilters:
+    @pytest.fixture
+    def db_manager(self, tmp_path: Path, notes: list[NoteWithContent]) -> Generator[DatabaseManager, None, None]:
+        db_manager = DatabaseManager(str(tmp_path / "notes.db"))
+        db_manager.create_tables()
+        db_manager.sync_notes(notes, [(note.note.filepath, note.note.line) for note in notes])
+        yield db_manager
+        db_manager.close()
+
+    @pytest.mark.parametrize(
+        "filters, expected",
+        [
+            ({}, ["1", "2", "3", "4"]),
+            ({"type": "TODO"}, ["1", "3", "4"]),
+            ({"path_prefix": "/src/lib/"}, ["3"]),
+            ({"path_prefix": "/src/lib"}, ["3", "4"]),
+            ({"updated_since": "2024-02-01"}, ["2", "3", "4"]),
+            ({"type": "TODO", "path_prefix": "/src/", "updated_since": "2024-02-01"}, ["3", "4"]),
+        ],
+    )
+    def test_iter_notes(self, db_manager: DatabaseManager, filters: dict, expected: list[str]) -> None:
+        assert [note.note.id for note in db_manager.iter_notes(**filters)] == expected
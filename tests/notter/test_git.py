@@ -0,0 +1,130 @@
+import subprocess
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from notter.controller import NoteController
+from notter.git import GitRepository, GitState
+
+
+def git(cwd: Path, *args: str) -> None:
+    subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@test", *args], cwd=cwd, check=True)
+
+
+class TestGitRepository:
+    def test_changes_since(self, tmp_path: Path) -> None:
+        src_path = tmp_path / "src"
+        src_path.mkdir()
+        git(tmp_path, "init", "-q")
+        (src_path / "a.py").write_text("# TODO: a\n")
+        (src_path / "b.py").write_text("# TODO: b\n")
+        (tmp_path / "outside.py").write_text("# TODO: outside\n")
+        git(tmp_path, "add", ".")
+        git(tmp_path, "commit", "-q", "-m", "init")
+
+        repository = GitRepository.find(str(src_path))
+        assert repository is not None
+        state = GitState(repository.head(), [])  # type: ignore [arg-type]
+
+        git(tmp_path, "mv", "src/b.py", "src/c.py")
+        git(tmp_path, "commit", "-q", "-m", "rename")
+        (src_path / "a.py").write_text("# TODO: changed\n")
+        (src_path / "new.py").write_text("# TODO: new\n")
+        (tmp_path / "outside.py").write_text("# TODO: changed outside\n")
+
+        dirty = repository.dirty_files()
+        changes = repository.changes_since(state, repository.head(), dirty)  # type: ignore [arg-type]
+
+        toplevel = Path(repository.toplevel) / "src"
+        assert dirty == [str(toplevel / "a.py"), str(toplevel / "new.py")]
+        assert changes is not None
+        assert changes.renamed == [(str(toplevel / "b.py"), str(toplevel / "c.py"))]
+        assert changes.changed == {str(toplevel / name) for name in ("a.py", "b.py", "c.py", "new.py")}
+        assert repository.changes_since(GitState("0" * 40), repository.head(), []) is None  # type: ignore [arg-type]
+
+    def test_find_outside_of_repository(self, tmp_path: Path) -> None:
+        assert GitRepository.find(str(tmp_path / "missing")) is None
+
+
+class TestDiscoverChanged:
+    async def test_discover_changed(self, note_controller: NoteController) -> None:
+        src_path = Path(note_controller.explorer.source_path)
+        repo_path = src_path.parent
+        src_path.mkdir(parents=True, exist_ok=True)
+        git(repo_path, "init", "-q")
+        (src_path / "a.py").write_text("x = 1  # TODO: a\n")
+        (src_path / "b.py").write_text("# TODO: b\n")
+        git(repo_path, "add", "src")
+        git(repo_path, "commit", "-q", "-m", "init")
+
+        comments = await note_controller.discover_changed(["TODO"])
+        assert sorted(comment.text for comment in comments) == [" TODO: a", " TODO: b"]
+        b_note = note_controller.read(str(src_path / "b.py"), 1)
+
+        spy = MagicMock(side_effect=note_controller.discover_single_file)
+        note_controller.discover_single_file = spy  # type: ignore [method-assign]
+        (src_path / "a.py").write_text("x = 1  # TODO: a changed\n")
+        comments = await note_controller.discover_changed(["TODO"])
+        assert [call.args[0] for call in spy.call_args_list] == [str(src_path / "a.py")]
+        assert sorted(comment.text for comment in comments) == [" TODO: a changed", " TODO: b"]
+
+        spy.reset_mock()
+        git(repo_path, "mv", "src/b.py", "src/c.py")
+        git(repo_path, "commit", "-q", "-am", "rename")
+        await note_controller.discover_changed(["TODO"])
+        assert sorted(call.args[0] for call in spy.call_args_list) == [
+            str(src_path / name) for name in ("a.py", "b.py", "c.py")
+        ]
+        assert note_controller.read(str(src_path / "c.py"), 1).note.id == b_note.note.id
+        assert note_controller.read_file(str(src_path / "b.py")) == []
+
+    async def test_discover_changed_staged_rename(self, note_controller: NoteController) -> None:
+        src_path = Path(note_controller.explorer.source_path)
+        repo_path = src_path.parent
+        src_path.mkdir(parents=True, exist_ok=True)
+        git(repo_path, "init", "-q")
+        (src_path / "b.py").write_text("# TODO: b\n")
+        git(repo_path, "add", "src")
+        git(repo_path, "commit", "-q", "-m", "init")
+        await note_controller.discover_changed(["TODO"])
+        b_note = note_controller.read(str(src_path / "b.py"), 1)
+
+        git(repo_path, "mv", "src/b.py", "src/c.py")
+        await note_controller.discover_changed(["TODO"])
+        assert note_controller.read(str(src_path / "c.py"), 1).note.id == b_note.note.id
+        assert note_controller.read_file(str(src_path / "b.py")) == []
+
+        # Still staged on the next run, a new file at the old path keeps its own notes
+        (src_path / "b.py").write_text("# TODO: new b\n")
+        comments = await note_controller.discover_changed(["TODO"])
+        assert sorted(comment.text for comment in comments) == [" TODO: b", " TODO: new b"]
+        new_b_note = note_controller.read(str(src_path / "b.py"), 1)
+        await note_controller.discover_changed(["TODO"])
+        assert note_controller.read(str(src_path / "b.py"), 1).note.id == new_b_note.note.id
+        assert note_controller.read(str(src_path / "c.py"), 1).note.id == b_note.note.id
+
+        git(repo_path, "commit", "-q", "-m", "rename")
+        await note_controller.discover_changed(["TODO"])
+        assert note_controller.read(str(src_path / "c.py"), 1).note.id == b_note.note.id
+
+    async def test_discover_changed_skips_ignored(self, note_controller: NoteController) -> None:
+        src_path = Path(note_controller.explorer.source_path)
+        repo_path = src_path.parent
+        (src_path / "vendor").mkdir(parents=True, exist_ok=True)
+        git(repo_path, "init", "-q")
+        (src_path / "a.py").write_text("# TODO: a\n")
+        (src_path / ".notterignore").write_text("vendor/\n")
+        git(repo_path, "add", "src")
+        git(repo_path, "commit", "-q", "-m", "init")
+        await note_controller.discover_changed(["TODO"])
+
+        # Committed, so git reports it, but ignored like in a full discovery
+        (src_path / "vendor" / "lib.py").write_text("# TODO: vendored\n")
+        git(repo_path, "add", "-f", "src/vendor")
+        git(repo_path, "commit", "-q", "-m", "vendor")
+        (src_path / "a.py").write_text("# TODO: a changed\n")
+        comments = await note_controller.discover_changed(["TODO"])
+
+        assert [comment.text for comment in comments] == [" TODO: a changed"]
+        assert sorted(comment.text for comment in await note_controller.discover(["TODO"], full=True)) == [
+            " TODO: a changed"
+        ]
@@ -0,0 +1,69 @@
+import pstats
+from pathlib import Path
+
+import pytest
+from notter.instrumentation import CPROFILE, SLOWEST_FILES, TRACEMALLOC, DiscoveryStats, profile
+
+
+class TestDiscoveryStats:
+    def test_phase(self) -> None:
+        stats = DiscoveryStats()
+        for _ in range(2):
+            with stats.phase("walk"):
+                sum(range(1000))
+        stats.add_phase("read", 0.5)
+
+        assert stats.phases["walk"].calls == 2
+        assert stats.phases["walk"].seconds > 0
+        assert stats.phases["walk"].cpu_seconds is not None
+        assert stats.phases["read"].seconds == 0.5
+        assert stats.phases["read"].cpu_seconds is None
+
+    def test_add_file(self) -> None:
+        stats = DiscoveryStats()
+        for idx in range(SLOWEST_FILES * 2):
+            stats.add_file(f"src/module_{idx}.py", 100, idx / 100)
+        stats.add_file("src/main.go", 50, 0.001)
+
+        assert stats.extensions[".py"].files == SLOWEST_FILES * 2
+        assert stats.extensions[".py"].bytes == SLOWEST_FILES * 200
+        assert stats.extensions[".go"].files == 1
+        slowest = sorted(stats.slowest, reverse=True)
+        assert [timing.filepath for timing in slowest] == [
+            f"src/module_{idx}.py" for idx in reversed(range(SLOWEST_FILES, SLOWEST_FILES * 2))
+        ]
+
+    def test_str(self) -> None:
+        stats = DiscoveryStats(files=2, bytes=150)
+        stats.add_phase("parse", 0.25, 0.2)
+        stats.add_file("src/a.py", 100, 0.1)
+
+        lines = str(stats).splitlines()
+        assert lines[0].startswith("Scanned 2 files (150 characters)")
+        assert any(line.split() == ["parse", "0.250", "0.200", "1"] for line in lines)
+        assert any(line.split()[:3] == [".py", "1", "100"] for line in lines)
+        assert lines[-1].split() == ["0.1000s", "100", "src/a.py"]
+
+
+class TestProfile:
+    def test_cprofile(self, tmp_path: Path) -> None:
+        path = tmp_path / "discover.prof"
+        with profile(CPROFILE, str(path)):
+            sorted(range(1000), reverse=True)
+
+        assert pstats.Stats(str(path)).total_calls > 0
+
+    def test_tracemalloc(self, tmp_path: Path) -> None:
+        path = tmp_path / "discover_memory.txt"
+        with profile(TRACEMALLOC, str(path)):
+            blocks = [bytes(1024) for _ in range(100)]
+
+        report = path.read_text()
+        assert report.startswith("Peak traced memory:")
+        assert __file__ in report
+        del blocks
+
+    def test_unknown_profiler(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError):
+            with profile("perf", str(tmp_path / "perf.data")):
+                pass
@@ -0,0 +1,85 @@
+import pytest
+from notter.explorers.c import CExplorer, CSharpExplorer
+from notter.explorers.go import GoExplorer
+from notter.explorers.haskell import HaskellExplorer
+from notter.explorers.javascript import JavascriptExplorer
+from notter.explorers.lexer import BlockComment, LanguageSpec, Lexer, StringLiteral, get_lexer
+from notter.explorers.lua import LuaExplorer
+from notter.explorers.react import ReactExplorer
+from notter.explorers.regex import RegexExplorer
+from notter.explorers.ruby import RubyExplorer
+from notter.explorers.rust import RustExplorer
+from notter.explorers.swift import SwiftExplorer
+from notter.explorers.vue import VueExplorer
+
+
+def comments(explorer_class: type[RegexExplorer], source: str) -> list[str]:
+    return [source[start:end] for start, end in explorer_class.lexer.spans(source)]
+
+
+class TestLexer:
+    @pytest.mark.parametrize(
+        "explorer_class, source, expected",
+        [
+            (CExplorer, 'puts("// not /* a */ comment"); // real', ["// real"]),
+            (CExplorer, "char c = '\"'; // after a quote char", ["// after a quote char"]),
+            (CExplorer, 'x = "escaped \\" // quote"; /* real */', ["/* real */"]),
+            (CSharpExplorer, 'var p = @"C:\\dir\\"; // real', ["// real"]),
+            (GoExplorer, "s := `raw // not\n/* not */` // real", ["// real"]),
+            (HaskellExplorer, "f' x = '-' -- real", ["-- real"]),
+            (
+                HaskellExplorer,
+                "{- outer {- inner -} still outer -} x -- real",
+                ["{- outer {- inner -} still outer -}", "-- real"],
+            ),
+            (JavascriptExplorer, "const url = 'http://example.com'; // real", ["// real"]),
+            (JavascriptExplorer, "t = `a ${ {b: '//'} } // not` // real", ["// real"]),
+            (JavascriptExplorer, "t = `${`${x /* inner */}`}` // real", ["/* inner */", "// real"]),
+            (JavascriptExplorer, "s.replace(/[`/]/g, '');\nif (/'/.test(s)) {} // TODO: real", ["// TODO: real"]),
+            (JavascriptExplorer, "const half = total / 2; // real\nx = a / b / c; // line", ["// real", "// line"]),
+            (
+                ReactExplorer,
+                "return /\\/`/.test(s) // TODO: real\n<p>{done}/{all} // text</p>",
+                ["// TODO: real", "// text</p>"],
+            ),
+            (LuaExplorer, "s = [[ -- not\n]] --[[ real\nblock ]] -- line", ["--[[ real\nblock ]]", "-- line"]),
+            (
+                RubyExplorer,
+                "x = '# not' # real\n  =begin not\n=begin\nblock\n=end\n",
+                ["# real", "=begin\nblock\n=end"],
+            ),
+            (RustExplorer, "fn f<'a>(s: &'a str) {} // real", ["// real"]),
+            (RustExplorer, 'let s = r#"raw "// not"#; /* a /* b */ c */', ["/* a /* b */ c */"]),
+            (SwiftExplorer, 'let s = """\n// not\n""" // real', ["// real"]),
+            (VueExplorer, "<p>Don't // stop</p>\n<!-- real --> // line", ["<!-- real -->", "// line"]),
+        ],
+    )
+    def test_strings_hide_comments(self, explorer_class: type[RegexExplorer], source: str, expected: list[str]) -> None:
+        assert comments(explorer_class, source) == expected
+
+    def test_unterminated(self) -> None:
+        assert comments(CExplorer, 'x = "open\n// real\n/* open\n// inside') == ["// real", "/* open\n// inside"]
+        assert comments(HaskellExplorer, "{- {- -} -- inside") == ["{- {- -} -- inside"]
+        assert comments(JavascriptExplorer, "t = `${ x // real\n") == ["// real"]
+
+    def test_unterminated_is_linear(self) -> None:
+        # Lazy patterns retried every opener to the end of the input, this took minutes
+        source = "<!-- /* x\n" * 100_000
+
+        assert comments(VueExplorer, source) == [source]
+        assert comments(LuaExplorer, "--[[ [[ '\n" * 100_000) == ["--[[ [[ '\n" * 100_000]
+
+    def test_mapped_spans(self) -> None:
+        source = "t = `${'//'}` // TODO: café\n/* \u00e9 */\n"
+        data = source.encode()
+
+        spans = [data[start:end].decode() for start, end in JavascriptExplorer.lexer.spans(data)]
+        assert spans == comments(JavascriptExplorer, source)
+
+    def test_shared_lexer(self) -> None:
+        spec = LanguageSpec(line_comments=("#",), strings=(StringLiteral('"'),))
+
+        assert get_lexer(spec) is get_lexer(LanguageSpec(line_comments=("#",), strings=(StringLiteral('"'),)))
+        assert CExplorer.lexer is get_lexer(CExplorer.spec)
+        assert list(Lexer(LanguageSpec()).spans("// nothing to find")) == []
+        assert list(Lexer(LanguageSpec(block_comments=(BlockComment("(*", "*)"),))).spans("a (* b *)")) == [(2, 9)]
@@ -0,0 +1,83 @@
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+from notter.manifest import FileFingerprint, diff_manifest, hash_file
+
+
+class TestManifest:
+    def _write(self, path: Path, content: str) -> str:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        return str(path)
+
+    def test_fingerprint_from_path(self, temp_directory: Path) -> None:
+        filepath = self._write(temp_directory / "a.py", "# TODO: a\n")
+        fingerprint = FileFingerprint.from_path(filepath)
+        stat = os.stat(filepath)
+
+        assert fingerprint.size == stat.st_size
+        assert fingerprint.mtime_ns == stat.st_mtime_ns
+        assert fingerprint.inode == stat.st_ino
+        assert fingerprint.content_hash is None
+        assert FileFingerprint.from_db_row(fingerprint.to_db_row()) == fingerprint
+
+    def test_diff_manifest_empty(self, temp_directory: Path) -> None:
+        file_a = self._write(temp_directory / "a.py", "# TODO: a\n")
+        file_b = self._write(temp_directory / "b.py", "# TODO: b\n")
+
+        diff = diff_manifest({}, [file_a, file_b])
+
+        assert diff.changed == [file_a, file_b]
+        assert diff.unchanged == []
+        assert diff.deleted == []
+        assert [fingerprint.filepath for fingerprint in diff.fingerprints] == [file_a, file_b]
+
+    def test_diff_manifest_changes(self, temp_directory: Path) -> None:
+        file_a = self._write(temp_directory / "a.py", "# TODO: a\n")
+        file_b = self._write(temp_directory / "b.py", "# TODO: b\n")
+        previous = {
+            file_a: FileFingerprint.from_path(file_a),
+            file_b: FileFingerprint.from_path(file_b),
+            "gone.py": FileFingerprint("gone.py", 1, 1, 1),
+        }
+
+        self._write(temp_directory / "b.py", "# TODO: b changed\n")
+        file_c = self._write(temp_directory / "c.py", "# TODO: c\n")
+        diff = diff_manifest(previous, [file_a, file_b, file_c])
+
+        assert diff.unchanged == [file_a]
+        assert diff.changed == [file_b, file_c]
+        assert diff.deleted == ["gone.py"]
+
+    def test_diff_manifest_hash_ignores_touch(self, temp_directory: Path) -> None:
+        file_a = self._write(temp_directory / "a.py", "# TODO: a\n")
+        fingerprint = FileFingerprint.from_path(file_a)
+        fingerprint.content_hash = hash_file(file_a)
+
+        stat = os.stat(file_a)
+        os.utime(file_a, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        diff = diff_manifest({file_a: fingerprint}, [file_a], use_hash=True)
+
+        assert diff.unchanged == [file_a]
+        assert diff.changed == []
+        assert diff.fingerprints[0].mtime_ns == stat.st_mtime_ns + 1_000_000_000
+
+    def test_diff_manifest_unreadable(self, temp_directory: Path) -> None:
+        file_a = self._write(temp_directory / "a.py", "# TODO: a\n")
+        file_b = self._write(temp_directory / "b.py", "# TODO: b\n")
+        previous = {file_a: FileFingerprint.from_path(file_a)}
+        from_path = FileFingerprint.from_path
+
+        def stat_or_fail(filepath: str) -> FileFingerprint:
+            if filepath == file_a:
+                raise PermissionError(filepath)
+            return from_path(filepath)
+
+        with patch.object(FileFingerprint, "from_path", side_effect=stat_or_fail):
+            diff = diff_manifest(previous, [file_a, file_b])
+        assert (diff.unreadable, diff.changed, diff.deleted) == ([file_a], [file_b], [])
+
+        with patch("notter.manifest.hash_file", side_effect=PermissionError):
+            diff = diff_manifest({}, [file_a, file_b], use_hash=True)
+        assert (diff.unreadable, diff.changed, diff.fingerprints) == ([file_a, file_b], [], [])
@@ -0,0 +1,42 @@
+import sqlite3
+from pathlib import Path
+
+from notter import sql_statements
+from notter.db_manager import DatabaseManager
+from notter.migrations import SCHEMA_VERSION, get_schema_version
+
+
+class TestMigrations:
+    def test_migrate_new_database(self, temp_directory: Path) -> None:
+        db_manager = DatabaseManager(str(temp_directory / "notes.db"))
+
+        assert db_manager.migrate() == list(range(1, SCHEMA_VERSION + 1))
+        assert db_manager.migrate() == []
+
+        conn = db_manager.conn.connection
+        assert get_schema_version(conn) == SCHEMA_VERSION
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql_statements.GET_NOTE_BY_TYPE}", ("TODO",)).fetchall()
+        assert "notes_type" in plan[0][-1]
+        db_manager.close()
+
+    def test_migrate_existing_database(self, temp_directory: Path) -> None:
+        db_path = str(temp_directory / "notes.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(sql_statements.CREATE_NOTE_TABLE)
+        conn.execute(sql_statements.INSERT_NOTE, ("1", "a.py", 1, "TODO", "2024-01-01", "2024-01-01", "TODO: keep me"))
+        conn.commit()
+        conn.close()
+
+        db_manager = DatabaseManager(db_path)
+        assert db_manager.migrate() == list(range(1, SCHEMA_VERSION + 1))
+
+        conn = db_manager.conn.connection
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"notes_type", "notes_updated_at"} <= indexes
+        assert conn.execute("SELECT count(*) FROM sqlite_stat1").fetchone()[0] > 0
+        assert db_manager.get_by_filepath_and_line("a.py", 1).content.text == "TODO: keep me"
+        assert db_manager.get_manifest() == {}
+        assert db_manager.get_manifest_key() is None
+        db_manager.save_manifest([], [], "key")
+        assert db_manager.get_manifest_key() == "key"
+        db_manager.close()
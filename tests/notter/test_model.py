@@ -0,0 +1,33 @@
+import pickle
+
+from notter.model import Comment, NoteType, NoteWithContent, SearchResult
+
+
+class TestModel:
+    def test_slots(self, note_with_content: NoteWithContent) -> None:
+        comment = Comment("a.py", "TODO: x", 1, NoteType.TODO)
+
+        for obj in (comment, note_with_content, note_with_content.note, note_with_content.content):
+            assert not hasattr(obj, "__dict__")
+        assert pickle.loads(pickle.dumps(comment)) == comment
+
+    def test_location(self, note_with_content: NoteWithContent) -> None:
+        comment = Comment.from_note_with_content(note_with_content)
+
+        assert comment.location == (note_with_content.note.filepath, note_with_content.note.line)
+        assert comment.location == note_with_content.location
+        assert comment.location_id == note_with_content.location_id
+
+    def test_from_db_row_shares_filepaths(self, note_with_content: NoteWithContent) -> None:
+        row = note_with_content.to_db_row()
+        # Strings built at runtime, like those SQLite returns, are distinct objects
+        first = NoteWithContent.from_db_row((row[0], "".join(["src/", "a.py"]), *row[2:]))
+        second = NoteWithContent.from_db_row((row[0], "".join(["src/", "a.py"]), *row[2:]))
+
+        assert first.note.filepath is second.note.filepath
+
+    def test_search_result_to_dict(self, note_with_content: NoteWithContent) -> None:
+        result = SearchResult(note_with_content.note, note_with_content.content, snippet="a [note]", rank=-1.5)
+
+        assert result.to_dict() == {**note_with_content.to_dict(), "snippet": "a [note]", "rank": -1.5}
+        assert SearchResult.from_dict(result.to_dict()) == result
@@ -0,0 +1,41 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from notter.explorers.parallel import START_METHOD, ParallelParser, parse_batch, split_batches
+
+
+class TestParallelParser:
+    files = [
+        (f"src/module_{idx}{ext}", f"{marker} TODO: item {idx}\n{marker} plain comment\nx = {idx}  {marker} FIXME: {idx}\n")
+        for idx in range(40)
+        for ext, marker in ((".py", "#"), (".js", "//"), (".go", "//"))
+    ]
+
+    def test_split_batches(self) -> None:
+        batches = split_batches(self.files, 7)
+
+        assert [len(batch) for batch in batches] == [7] * 17 + [1]
+        assert [item for batch in batches for item in batch] == self.files
+
+    async def test_parse_matches_serial(self) -> None:
+        serial = parse_batch(self.files, ["todo", "fixme"])
+
+        with ParallelParser(workers=2, chunk_size=5) as parser:
+            parallel = await parser.parse(self.files, ["todo", "fixme"])
+
+        assert len(serial) == 240
+        assert parallel == serial
+
+    def test_workers_are_not_forked(self) -> None:
+        with ParallelParser(workers=2) as parser:
+            assert isinstance(parser.executor, ProcessPoolExecutor)
+            assert parser.executor._mp_context.get_start_method() == START_METHOD
+
+        assert START_METHOD in ("forkserver", "spawn")
+
+    async def test_parse_inline(self) -> None:
+        parser = ParallelParser(workers=4, inline=True)
+        comments, timings = await parser.parse_chunk_timed(self.files[:3], ["todo", "fixme"])
+
+        assert parser.workers == 1
+        assert comments == parse_batch(self.files[:3], ["todo", "fixme"])
+        assert [filepath for filepath, _, _ in timings] == [filepath for filepath, _ in self.files[:3]]
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from notter.explorers.parallel import ParallelParser, parse_batch
+from notter.explorers.pipeline import DiscoveryPipeline
+from notter.explorers.tags import TagMatcher
+
+
+class TestDiscoveryPipeline:
+    contents = {f"src/module_{idx}.py": f"# TODO: item {idx}\nx = {idx}  # note\n" for idx in range(50)}
+    tags = TagMatcher(["TODO"])
+
+    async def _read(self, path: str) -> str:
+        await asyncio.sleep(0)
+        return self.contents[path]
+
+    async def test_run(self) -> None:
+        with ParallelParser(workers=1, chunk_size=3) as parser:
+            pipeline = DiscoveryPipeline(self._read, parser, readers=4)
+            comments = [comment async for batch in pipeline.run(list(self.contents), self.tags) for comment in batch]
+
+        expected = parse_batch(list(self.contents.items()), ["todo"])
+        assert len(comments) == 50
+        assert sorted(comments, key=lambda comment: comment.filepath) == sorted(
+            expected, key=lambda comment: comment.filepath
+        )
+
+    async def test_run_bounded_reads(self) -> None:
+        open_files, max_open_files = 0, 0
+
+        async def read(path: str) -> str:
+            nonlocal open_files, max_open_files
+            open_files += 1
+            max_open_files = max(max_open_files, open_files)
+            await asyncio.sleep(0)
+            open_files -= 1
+            return self.contents[path]
+
+        with ParallelParser(workers=1, chunk_size=2) as parser:
+            pipeline = DiscoveryPipeline(read, parser, readers=3)
+            batches = [batch async for batch in pipeline.run(list(self.contents), self.tags)]
+
+        assert max_open_files <= 3
+        assert sum(len(batch) for batch in batches) == 50
+
+    async def test_run_skips_unreadable_files(self) -> None:
+        async def read(path: str) -> str:
+            if path.endswith("_7.py"):
+                raise FileNotFoundError(path)
+            return self.contents[path]
+
+        with ParallelParser(workers=1) as parser:
+            pipeline = DiscoveryPipeline(read, parser, readers=2)
+            comments = [comment async for batch in pipeline.run(list(self.contents), self.tags) for comment in batch]
+
+        assert len(comments) == 49
+        assert pipeline.stats.unreadable == 1
+        assert "src/module_7.py" not in {comment.filepath for comment in comments}
+
+    async def test_run_skips_files_without_tags(self) -> None:
+        contents = {"src/a.py": "# TODO: a\n", "src/b.py": "# just a note\n", "src/c.py": "x = 1\n"}
+
+        async def read(path: str) -> str:
+            return contents[path]
+
+        with ParallelParser(workers=1) as parser:
+            pipeline = DiscoveryPipeline(read, parser, readers=2)
+            comments = [comment async for batch in pipeline.run(list(contents), self.tags) for comment in batch]
+
+        assert [comment.filepath for comment in comments] == ["src/a.py"]
+        assert pipeline.stats.files == 3
+        assert pipeline.stats.skipped == 2
+        assert pipeline.stats.phases["read"].calls == 3
+        assert pipeline.stats.phases["parse"].calls == 1
+        assert pipeline.stats.extensions[".py"].files == 3
+        assert sorted(timing.filepath for timing in pipeline.stats.slowest) == list(contents)
+        assert pipeline.pending == {}
+
+    async def test_run_raises_reader_errors(self) -> None:
+        async def read(path: str) -> str:
+            raise RuntimeError("boom")
+
+        with ParallelParser(workers=1) as parser:
+            pipeline = DiscoveryPipeline(read, parser, readers=2)
+            with pytest.raises(RuntimeError, match="boom"):
+                _ = [batch async for batch in pipeline.run(list(self.contents), self.tags)]
@@ -0,0 +1,97 @@
+import glob
+import io
+import mmap
+import sys
+import sysconfig
+import tokenize
+from pathlib import Path
+
+import pytest
+from notter.explorers.python import PythonExplorer, scan_spans
+from notter.explorers.tags import TagMatcher
+
+TAGS = TagMatcher(["TODO", "FIXME"])
+# Every eighth module of the standard library, the whole of it takes about 15 seconds to tokenize
+CORPUS = sorted(
+    path
+    for path in glob.glob(f"{sysconfig.get_paths()['stdlib']}/**/*.py", recursive=True)
+    if "site-packages" not in path and Path(path).stat().st_size
+)[::8]
+
+
+def scanned(source: str) -> list[str]:
+    spans, complete = scan_spans(source)
+    assert complete
+    return [source[start:end] for start, end in spans]
+
+
+def tokenized(filepath: str, source: str) -> list:
+    tokens = tokenize.generate_tokens(io.StringIO(source).readline)
+    return PythonExplorer._discover_comments_in_tokens(filepath, tokens, TAGS)
+
+
+class TestPythonExplorer:
+    @pytest.mark.parametrize(
+        "source, expected",
+        [
+            ("x = '# no' + \"# no\"  # yes", ["# yes"]),
+            ("x = '''\n# no\n''' + \"\"\"'''# no\"\"\"  # yes", ["# yes"]),
+            ("x = rb'\\' # no' if\"#\"else u'#' # yes", ["# yes"]),
+            ("x = 'a\\\n# no' # yes", ["# yes"]),
+            ("f'{x:#x} {y!r:>{width}} {{#}}' # yes", ["# yes"]),
+            ('f\'{ {"#": 1}["#"] }\' # yes', ["# yes"]),
+            ("f'{f\"{x:#}\"}' + rf'\\{{#}}\\}}' # yes", ["# yes"]),
+            ("f'\\N{NUMBER SIGN}' # yes", ["# yes"]),
+            ("f'''{\nx  # inner\n}''' # yes", ["# inner", "# yes"]),
+            # Same quotes in fields are allowed since Python 3.12
+            ('f"{x["#"]:{"#"}}" # yes', ["# yes"]),
+            ("x = 1\r\n# yes\r\n", ["# yes"]),
+        ],
+    )
+    def test_scan_comments(self, source: str, expected: list[str]) -> None:
+        assert scanned(source) == expected
+
+    def test_merges_consecutive_comments(self) -> None:
+        source = "# a\n# b\n# c\nx = 1  # TODO: d\n# e\n"
+
+        comments = PythonExplorer._discover_comments_in_file("a.py", source, TAGS)
+
+        assert [(comment.line, comment.text, comment.multiline) for comment in comments] == [
+            (1, " a\n b", True),
+            (3, " c", False),
+            (4, " TODO: d\n e", True),
+        ]
+        assert comments == tokenized("a.py", source)
+
+    def test_unterminated_falls_back_to_tokenize(self) -> None:
+        # Before Python 3.12, the tokenizer goes on after an unterminated single-quoted string
+        source = "x = 'abc # TODO: a\n# TODO: b\n"
+
+        assert scan_spans(source) == ([], False)
+        comments = PythonExplorer._discover_comments_in_file("a.py", source, TAGS)
+        if sys.version_info >= (3, 12):
+            assert comments == []
+        else:
+            assert [(comment.line, comment.text) for comment in comments] == [(1, " TODO: a"), (2, " TODO: b")]
+            assert comments == tokenized("a.py", source)
+
+    def test_unterminated_without_tokenize(self) -> None:
+        source = "# TODO: a\nx = '''\n# TODO: not a comment\n"
+
+        with pytest.raises(tokenize.TokenError):
+            tokenized("a.py", source)
+        comments = PythonExplorer._discover_comments_in_file("a.py", source, TAGS)
+        assert [comment.text for comment in comments] == [" TODO: a"]
+
+    @pytest.mark.parametrize("filepath", CORPUS, ids=lambda path: Path(path).name)
+    def test_matches_tokenize(self, filepath: str) -> None:
+        try:
+            source = Path(filepath).read_text(encoding="utf-8")
+            expected = tokenized(filepath, source)
+        except (UnicodeDecodeError, SyntaxError, tokenize.TokenError):
+            pytest.skip("not valid Python source")
+
+        assert scan_spans(source)[1]
+        assert PythonExplorer._discover_comments_in_file(filepath, source, TAGS) == expected
+        with open(filepath, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            assert PythonExplorer._discover_comments_in_bytes(filepath, data, 0, TAGS) == expected
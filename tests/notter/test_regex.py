@@ -0,0 +1,47 @@
+from notter.explorers.c import CExplorer
+from notter.explorers.lua import LuaExplorer
+from notter.explorers.regex import LineCounter
+from notter.explorers.ruby import RubyExplorer
+from notter.explorers.vue import VueExplorer
+from notter.model import NoteType
+
+
+class TestRegexExplorer:
+    def test_line_counter(self) -> None:
+        content = "a\nb\n\nc\n"
+        lines = LineCounter(content)
+
+        assert [lines.line_at(offset) for offset in (0, 2, 4, 5, 6)] == [1, 2, 3, 4, 4]
+        assert lines.line_at(2) == 2
+
+    def test_discover_comments(self) -> None:
+        content = "int a; // TODO: first\n/* block\n * FIXME: second\n */\nint b; // plain\n"
+        comments = CExplorer._discover_comments_in_file("file.c", content, ["todo", "fixme"])
+
+        assert [(comment.line, comment.type, comment.multiline) for comment in comments] == [
+            (1, NoteType.TODO, False),
+            (2, NoteType.TODO, True),
+            (5, NoteType.NOTE, False),
+        ]
+        assert comments[1].text == "/* block\n * FIXME: second\n */"
+
+    def test_multi_line_before_single_line(self) -> None:
+        content = "--[[ TODO: multi\nline ]]\n-- single\n"
+        comments = LuaExplorer._discover_comments_in_file("file.lua", content, ["todo"])
+
+        assert [(comment.line, comment.text) for comment in comments] == [
+            (1, "--[[ TODO: multi\nline ]]"),
+            (3, "-- single"),
+        ]
+
+    def test_html_comments(self) -> None:
+        content = "<!-- TODO: one -->\n<template></template>\n<!-- two\nlines -->\n// three\n"
+        comments = VueExplorer._discover_comments_in_file("file.vue", content, ["todo"])
+
+        assert [(comment.line, comment.multiline) for comment in comments] == [(1, False), (3, True), (5, False)]
+
+    def test_ruby_block_comments(self) -> None:
+        content = "=begin\nTODO: document\n=end\nx = 1 # FIXME\n"
+        comments = RubyExplorer._discover_todos_in_file("file.rb", content, ["todo", "fixme"])
+
+        assert [comment.line for comment in comments] == [1, 4]
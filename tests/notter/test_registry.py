@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import notter
+import notter.constants as ncons
+from notter.explorers.base import LexicalExplorer
+from notter.explorers.registry import EXPLORER_MODULES, registry
+
+
+class TestRegistry:
+    def test_every_extension_has_an_explorer(self) -> None:
+        assert sorted(EXPLORER_MODULES) == sorted(ncons.SUPPORTED_EXTENSIONS)
+        for extension in ncons.SUPPORTED_EXTENSIONS:
+            assert extension in registry
+            explorer_class = registry.get(extension)
+            assert issubclass(explorer_class, LexicalExplorer)
+            assert explorer_class.__module__ == EXPLORER_MODULES[extension]
+
+    def test_unknown_extension(self) -> None:
+        assert ".txt" not in registry
+        assert registry.get(".txt") is None
+
+    def test_explorers_are_imported_lazily(self) -> None:
+        code = (
+            "import sys\n"
+            "import notter.cli\n"
+            "from notter.explorers.registry import registry\n"
+            "assert 'notter.explorers.base' not in sys.modules\n"
+            "registry.get('.go')\n"
+            "assert 'notter.explorers.go' in sys.modules\n"
+            "assert 'notter.explorers.python' not in sys.modules\n"
+        )
+        env = {**os.environ, "PYTHONPATH": str(Path(notter.__file__).parents[1])}
+        subprocess.run([sys.executable, "-c", code], check=True, env=env)
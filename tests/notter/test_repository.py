@@ -1,7 +1,7 @@
 from pathlib import Path
-from unittest.mock import MagicMock, call, patch
+from unittest.mock import MagicMock, patch
 import notter.constants as ncons
-from notter.model import Comment, Content, Note, NoteType, NoteWithContent
+from notter.model import Comment, NoteType, NoteWithContent
 from notter.notter import Notter
 from notter.repository import SQLiteRepository
 
@@ -86,36 +86,13 @@ class TestSQLiteRepository:
 
         repository.db_manager.delete.assert_called_once_with("dummy_path", 5)
 
-    @patch("notter.repository.SQLiteRepository.delete")
     @patch("notter.repository.DatabaseManager")
-    def test_prune(
-        self, mock_db_manager: MagicMock, mock_delete: MagicMock
-    ) -> None:
+    def test_prune(self, mock_db_manager: MagicMock) -> None:
         notter_with_config = Notter()
         notter_with_config.configure(self.mock_src_folder)
         repository = SQLiteRepository(notter_with_config)
         repository.db_manager = mock_db_manager
-
-        mock_delete.return_value = None
-
-        repository.db_manager.get_all.return_value = [
-            NoteWithContent(
-                note=Note(id="1", filepath="file1.py", line=1),
-                content=Content(text="Note 1"),
-            ),
-            NoteWithContent(
-                note=Note(id="1", filepath="file1.py", line=2),
-                content=Content(text="Note 2"),
-            ),
-            NoteWithContent(
-                note=Note(id="1", filepath="file2.py", line=1),
-                content=Content(text="Note 3"),
-            ),
-            NoteWithContent(
-                note=Note(id="1", filepath="file2.py", line=2),
-                content=Content(text="Note 4"),
-            ),
-        ]
+        repository.db_manager.prune.return_value = [("file2.py", 1), ("file2.py", 2)]
 
         comments = [
             Comment("file1.py", "content1", 1, NoteType.TODO),
@@ -124,6 +101,5 @@ class TestSQLiteRepository:
         ]
         items_to_prune = repository.prune(comments, None)
 
-        expected_calls = [call("file2.py", 1), call("file2.py", 2)]
-        mock_delete.assert_has_calls(expected_calls, any_order=True)
-        assert sorted(items_to_prune) == ["file2.py:1", "file2.py:2"]
+        repository.db_manager.prune.assert_called_once_with([("file1.py", 1), ("file1.py", 2), ("file3.py", 1)], None)
+        assert items_to_prune == [("file2.py", 1), ("file2.py", 2)]
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import socket
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from notter.client import NotterClient, RemoteController
+from notter.exceptions import NoteNotFound, ServerAlreadyRunning, ServerNotResponding
+from notter.model import NoteType, NoteWithContent, SearchResult
+from notter.server import (
+    INTERNAL_ERROR,
+    INVALID_PARAMS,
+    METHOD_NOT_FOUND,
+    NOTTER_ERROR,
+    PARSE_ERROR,
+    NotterServer,
+    is_server_running,
+)
+
+
+@pytest.fixture
+def server(note_with_content: NoteWithContent) -> NotterServer:
+    controller = MagicMock()
+    controller.read.return_value = note_with_content
+    controller.discover_single_file = AsyncMock(return_value=[])
+    return NotterServer(controller, ["TODO"])
+
+
+def request(method: str, request_id: int | None = 1, **params) -> str:
+    message = {"jsonrpc": "2.0", "method": method, "params": params}
+    if request_id is not None:
+        message["id"] = request_id
+    return json.dumps(message)
+
+
+class TestNotterServer:
+    async def test_handle(self, server: NotterServer, note_with_content: NoteWithContent) -> None:
+        response = await server.handle(request("read", filepath="path/to/file", line=1))
+
+        assert response == {"jsonrpc": "2.0", "id": 1, "result": note_with_content.to_dict()}
+        server.controller.read.assert_called_once_with("path/to/file", 1)
+
+    async def test_handle_notification(self, server: NotterServer) -> None:
+        assert await server.handle(request("delete", None, filepath="path/to/file", line=1)) is None
+        server.controller.delete.assert_called_once_with("path/to/file", 1)
+
+    async def test_handle_errors(self, server: NotterServer) -> None:
+        server.controller.read.side_effect = NoteNotFound
+        response = await server.handle(request("read", filepath="path/to/file", line=1))
+        assert response["error"]["code"] == NOTTER_ERROR
+        assert response["error"]["data"] == {"type": "NoteNotFound"}
+
+        response = await server.handle(request("read", path="path/to/file"))
+        assert response["error"]["code"] == INVALID_PARAMS
+        response = await server.handle(request("create", filepath="a.py", line=1, text="a", type="BUG"))
+        assert response["error"]["code"] == INVALID_PARAMS
+
+        # Errors of the server itself are not blamed on the client
+        server.controller.read.side_effect = ValueError("bug")
+        response = await server.handle(request("read", filepath="path/to/file", line=1))
+        assert response["error"]["code"] == INTERNAL_ERROR
+        server.controller.read.side_effect = TypeError("bug")
+        response = await server.handle(request("read", filepath="path/to/file", line=1))
+        assert response["error"]["code"] == INTERNAL_ERROR
+
+        response = await server.handle(request("export"))
+        assert response["error"]["code"] == METHOD_NOT_FOUND
+
+        response = await server.handle("{not json")
+        assert response["error"]["code"] == PARSE_ERROR
+
+    async def test_full_text_search(self, server: NotterServer, note_with_content: NoteWithContent) -> None:
+        result = SearchResult(note_with_content.note, note_with_content.content, snippet="a [note]", rank=-1.5)
+        server.controller.full_text_search.return_value = [result]
+
+        response = await server.handle(request("full_text_search", query="note", limit=5))
+
+        assert response == {"jsonrpc": "2.0", "id": 1, "result": [result.to_dict()]}
+        server.controller.full_text_search.assert_called_once_with("note", 5)
+
+    async def test_respond_internal_errors(self, server: NotterServer) -> None:
+        # Not JSON serializable
+        server.controller.read.return_value = object()
+        response = json.loads(await server.respond(request("read", 7, filepath="path/to/file", line=1)))
+        assert (response["id"], response["error"]["code"]) == (7, INTERNAL_ERROR)
+
+        response = json.loads(await server.respond(b"\xff\n"))
+        assert response["error"]["code"] == PARSE_ERROR
+
+    async def test_serve_unix(self, server: NotterServer, tmp_path: Path) -> None:
+        socket_path = str(tmp_path / "notter.sock")
+        started = asyncio.Event()
+        task = asyncio.create_task(server.serve_unix(socket_path, started.set))
+        await asyncio.wait_for(started.wait(), timeout=5)
+
+        assert is_server_running(socket_path)
+        with pytest.raises(ServerAlreadyRunning):
+            await NotterServer(MagicMock(), []).serve_unix(socket_path)
+
+        # The client is blocking, keep it off the loop that runs the server
+        def use_client() -> NoteWithContent:
+            client = NotterClient.connect(socket_path)
+            assert client is not None
+            controller = RemoteController(client)
+            try:
+                controller.update("path/to/file", 1, "changed", NoteType.TODO)
+                server.controller.read.side_effect = NoteNotFound
+                with pytest.raises(NoteNotFound):
+                    controller.read("path/to/file", 2)
+                server.controller.read.side_effect = None
+                return controller.read("path/to/file", 1)
+            finally:
+                controller.close()
+
+        note = await asyncio.get_running_loop().run_in_executor(None, use_client)
+        assert note.to_dict() == server.controller.read.return_value.to_dict()
+        server.controller.update.assert_called_once_with("path/to/file", 1, "changed", NoteType.TODO)
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not Path(socket_path).exists()
+
+    async def test_stale_socket(self, server: NotterServer, tmp_path: Path) -> None:
+        socket_path = tmp_path / "notter.sock"
+        socket_path.touch()
+        assert not is_server_running(str(socket_path))
+        assert NotterClient.connect(str(socket_path)) is None
+
+        started = asyncio.Event()
+        task = asyncio.create_task(server.serve_unix(str(socket_path), started.set))
+        await asyncio.wait_for(started.wait(), timeout=5)
+        assert is_server_running(str(socket_path))
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    def test_client_timeout(self, tmp_path: Path) -> None:
+        socket_path = str(tmp_path / "notter.sock")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stuck_server:
+            stuck_server.bind(socket_path)
+            stuck_server.listen()
+            client = NotterClient.connect(socket_path, timeout=0.05)
+            assert client is not None
+            try:
+                with pytest.raises(ServerNotResponding):
+                    client.call("ping")
+            finally:
+                client.close()
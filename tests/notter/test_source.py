@@ -0,0 +1,81 @@
+import codecs
+from pathlib import Path
+
+import pytest
+from notter.explorers import base
+from notter.explorers.base import LexicalExplorer
+from notter.explorers.c import CExplorer
+from notter.explorers.lua import LuaExplorer
+from notter.explorers.python import PythonExplorer
+from notter.explorers.source import decode_source, detect_bom
+from notter.explorers.tags import TagMatcher
+
+SOURCES = {
+    CExplorer: "int x = 1; // TODO: first\n/* FIXME: second\n   spans lines */\nint y = 2; // plain\n// TODO: café\n",
+    LuaExplorer: "local x = 1 -- TODO: first\n--[[ FIXME: second\nspans lines ]]\n-- plain\n-- TODO: café\n",
+    PythonExplorer: "x = 1  # TODO: first\n# FIXME: second\n# plain\ny = 'a # TODO: not a comment'\n# TODO: café\n",
+}
+
+
+class TestSource:
+    @pytest.mark.parametrize(
+        "data, expected",
+        [
+            ("plain ascii".encode(), "plain ascii"),
+            ("café".encode(), "café"),
+            (codecs.BOM_UTF8 + "café".encode(), "café"),
+            ("café".encode("utf-16"), "café"),
+            ("café".encode("utf-32"), "café"),
+            ("café".encode("latin-1"), "café"),
+        ],
+    )
+    def test_decode_source(self, data: bytes, expected: str) -> None:
+        assert decode_source(data) == expected
+
+    def test_detect_bom(self) -> None:
+        assert detect_bom(codecs.BOM_UTF8 + b"x") == ("utf-8-sig", 3)
+        assert detect_bom(codecs.BOM_UTF32_LE + b"x") == ("utf-32", 4)
+        assert detect_bom(b"x = 1") == (None, 0)
+
+    @pytest.mark.parametrize("explorer_class", SOURCES)
+    @pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "utf-16", "latin-1"])
+    def test_mapped_matches_decoded(self, explorer_class: type[LexicalExplorer], encoding: str, tmp_path: Path) -> None:
+        content = SOURCES[explorer_class]
+        path = tmp_path / f"module{explorer_class.__name__}"
+        path.write_bytes(content.encode(encoding))
+        tags = TagMatcher(["TODO", "FIXME"])
+
+        mapped = explorer_class._discover_todos_in_mapped_file(str(path), tags)
+
+        assert len(mapped) == 3
+        assert mapped == explorer_class._discover_todos_in_file(str(path), content, tags)
+
+    def test_mapped_without_tags(self, tmp_path: Path) -> None:
+        path = tmp_path / "a.c"
+        path.write_text("// TODO: x\n")
+
+        assert CExplorer._discover_todos_in_mapped_file(str(path), TagMatcher(["FIXME"])) == []
+        assert TagMatcher(["todo"]).may_contain_todo_bytes(b"// ToDo: x")
+        # Non-ASCII tags cannot be searched for in bytes, files are always parsed
+        assert TagMatcher(["tâche"]).may_contain_todo_bytes(b"// nothing")
+
+    async def test_large_files_are_mapped(
+        self, note_controller, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(base, "MMAP_MIN_BYTES", 64)
+        small, large = tmp_path / "small.py", tmp_path / "large.js"
+        small.write_text("# TODO: small\n")
+        large.write_bytes(("x = 1;\n" * 20 + "// TODO: large, encoded in Latin-1: café\n").encode("latin-1"))
+
+        assert await LexicalExplorer._read_file_async(str(small)) == "# TODO: small\n"
+        assert await LexicalExplorer._read_file_async(str(large)) is None
+
+        explorer = note_controller.explorer
+        comments = await explorer.discover(["TODO"], [str(small), str(large)])
+
+        assert [(comment.filepath, comment.line, comment.text) for comment in comments] == [
+            (str(large), 21, "// TODO: large, encoded in Latin-1: café"),
+            (str(small), 1, " TODO: small"),
+        ]
+        assert explorer.stats.mapped == 1
+        assert explorer.stats.bytes == small.stat().st_size + large.stat().st_size
@@ -0,0 +1,61 @@
+import pickle
+
+import pytest
+from notter.explorers.base import LexicalExplorer
+from notter.explorers.tags import TagMatcher
+from notter.model import NoteType
+
+
+class TestTagMatcher:
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            (" TODO: fix this", NoteType.TODO),
+            ("  fixme later", NoteType.TODO),
+            ("todos are substrings", NoteType.TODO),
+            ("nothing to see", NoteType.NOTE),
+            ("", NoteType.NOTE),
+        ],
+    )
+    def test_classify(self, text: str, expected: NoteType) -> None:
+        assert TagMatcher(["TODO", "FIXME"]).classify(text) == expected
+
+    def test_classify_word_boundary(self) -> None:
+        matcher = TagMatcher(["TODO", "FIXME"], word_boundary=True)
+
+        assert matcher.classify("TODO: fix this") == NoteType.TODO
+        assert matcher.classify("(fixme)") == NoteType.TODO
+        assert matcher.classify("todos are not tags") == NoteType.NOTE
+        assert matcher.classify("MASTODON") == NoteType.NOTE
+
+    def test_classify_type_mapping(self) -> None:
+        matcher = TagMatcher({"FIXME": NoteType.TODO, "HACK": NoteType.TODO, "NOTE": NoteType.NOTE})
+
+        assert matcher.classify("HACK: works for now") == NoteType.TODO
+        assert matcher.classify("NOTE: see docs") == NoteType.NOTE
+        assert matcher.classify("NOTE: this is a hack") == NoteType.TODO
+
+    def test_classify_escapes_tags(self) -> None:
+        matcher = TagMatcher(["@todo", "X.Y"])
+
+        assert matcher.classify("@TODO: a") == NoteType.TODO
+        assert matcher.classify("x.y") == NoteType.TODO
+        assert matcher.classify("xzy") == NoteType.NOTE
+
+    def test_may_contain_todo(self) -> None:
+        matcher = TagMatcher({"FIXME": NoteType.TODO, "NOTE": NoteType.NOTE})
+
+        assert matcher.may_contain_todo("x = 1\n# fixme: later\n")
+        assert not matcher.may_contain_todo("x = 1\n# NOTE: no todo here\n")
+        assert not TagMatcher({"NOTE": NoteType.NOTE}).may_contain_todo("# NOTE")
+        assert TagMatcher([f"TAG{idx}" for idx in range(20)]).may_contain_todo("# tag13")
+
+    def test_pickle(self) -> None:
+        matcher = pickle.loads(pickle.dumps(TagMatcher(["TODO"], word_boundary=True)))
+
+        assert matcher.classify("TODO") == NoteType.TODO
+        assert matcher.classify("TODOS") == NoteType.NOTE
+
+    def test_determine_note_type(self) -> None:
+        assert LexicalExplorer.determine_note_type(" TODO: a", ["todo"]) == NoteType.TODO
+        assert LexicalExplorer.determine_note_type(" TODO: a", TagMatcher(["fixme"])) == NoteType.NOTE
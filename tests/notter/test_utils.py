@@ -1,5 +1,8 @@
+import json
+
 import pytest
-from notter.utils import convert_to_local_path
+from notter.model import Comment, NoteType, SearchResult
+from notter.utils import CustomEncoder, convert_to_local_path, to_bool
 
 
 class TestUtils:
@@ -15,3 +18,21 @@ class TestUtils:
     )
     def test_convert_to_local_path(self, filepath: str, src_path: str, expected: str) -> None:
         assert convert_to_local_path(filepath, src_path) == expected
+
+    @pytest.mark.parametrize(
+        "value, expected",
+        [(True, True), (False, False), ("true", True), ("False", False), ("1", True), ("0", False), (None, False)],
+    )
+    def test_to_bool(self, value, expected: bool) -> None:
+        assert to_bool(value) is expected
+
+    def test_custom_encoder(self, note_with_content) -> None:
+        comment = Comment("a.py", "TODO: x", 1, NoteType.TODO)
+        result = SearchResult(note_with_content.note, note_with_content.content, snippet="[x]", rank=-1.0)
+
+        assert json.loads(json.dumps([comment], cls=CustomEncoder)) == [
+            {"filepath": "a.py", "text": "TODO: x", "line": 1, "type": "TODO", "multiline": False}
+        ]
+        encoded = json.loads(json.dumps(result, cls=CustomEncoder))
+        assert list(encoded) == ["note", "content", "snippet", "rank"]
+        assert encoded["content"] == {"text": note_with_content.content.text}
@@ -0,0 +1,108 @@
+import os
+from pathlib import Path
+
+import pytest
+from notter.walker import IgnoreFile, Walker
+
+
+def make_files(root: Path, *paths: str) -> None:
+    for path in paths:
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text("# TODO\n")
+
+
+def walk(root: Path, **kwargs) -> list[str]:
+    return sorted(os.path.relpath(path, root) for path in Walker(str(root), [".py", ".js"], **kwargs).walk())
+
+
+class TestIgnoreFile:
+    @pytest.mark.parametrize(
+        "pattern, path, is_dir, expected",
+        [
+            ("*.py", "a/b/c.py", False, True),
+            ("*.py", "a/b/c.pyc", False, None),
+            ("build/", "src/build", True, True),
+            ("build/", "src/build", False, None),
+            ("/build", "src/build", True, None),
+            ("/build", "build", True, True),
+            ("docs/*.md", "docs/a.md", False, True),
+            ("docs/*.md", "docs/sub/a.md", False, None),
+            ("**/gen/*.py", "a/b/gen/x.py", False, True),
+            ("a/**/z.py", "a/z.py", False, True),
+            ("a/**/z.py", "a/b/c/z.py", False, True),
+            ("file[0-9].py", "file1.py", False, True),
+            ("file[!0-9].py", "file1.py", False, None),
+            ("\\#literal.py", "#literal.py", False, True),
+            ("# comment", "# comment", False, None),
+        ],
+    )
+    def test_match(self, pattern: str, path: str, is_dir: bool, expected: bool | None) -> None:
+        assert IgnoreFile.from_lines("", [pattern]).match(path, is_dir) is expected
+
+    def test_match_negation(self) -> None:
+        ignore_file = IgnoreFile.from_lines("", ["*.py", "!keep.py"])
+
+        assert ignore_file.match("drop.py", False) is True
+        assert ignore_file.match("keep.py", False) is False
+        assert ignore_file.match("other.js", False) is None
+
+
+class TestWalker:
+    def test_walk_prunes_excluded_and_ignored(self, tmp_path: Path) -> None:
+        make_files(
+            tmp_path,
+            "main.py",
+            "lib/util.js",
+            "lib/util.min.js",
+            "lib/README.md",
+            "node_modules/dep/index.js",
+            ".git/hooks/hook.py",
+            "build/out.py",
+            "gen/keep.py",
+            "gen/drop.py",
+            "vendor/thing.py",
+        )
+        (tmp_path / ".gitignore").write_text("build/\n*.min.js\n")
+        (tmp_path / "gen" / ".notterignore").write_text("*.py\n!keep.py\n")
+
+        assert walk(tmp_path, exclude=["vendor"]) == ["gen/keep.py", "lib/util.js", "main.py"]
+
+    def test_walk_parent_ignore_files(self, tmp_path: Path) -> None:
+        make_files(tmp_path, "src/a.py", "src/generated/b.py")
+        (tmp_path / ".git").mkdir()
+        (tmp_path / ".gitignore").write_text("src/generated/\n")
+
+        assert walk(tmp_path / "src") == ["a.py"]
+
+    def test_walk_deduplicates_links(self, tmp_path: Path) -> None:
+        make_files(tmp_path, "src/a.py")
+        os.link(tmp_path / "src/a.py", tmp_path / "src/hardlink.py")
+        os.symlink(tmp_path / "src", tmp_path / "src/loop")
+
+        assert walk(tmp_path) in (["src/a.py"], ["src/hardlink.py"])
+        assert len(walk(tmp_path, follow_symlinks=True)) == 1
+
+    def test_walk_follow_symlinks(self, tmp_path: Path) -> None:
+        make_files(tmp_path, "shared/lib.py", "src/a.py")
+        os.symlink(tmp_path / "shared", tmp_path / "src/shared")
+
+        assert walk(tmp_path / "src") == ["a.py"]
+        assert walk(tmp_path / "src", follow_symlinks=True) == ["a.py", "shared/lib.py"]
+
+    def test_filter_paths(self, tmp_path: Path) -> None:
+        paths = ["main.py", "lib/util.js", "lib/util.min.js", "build/out.py", "gen/keep.py", "gen/drop.py"]
+        make_files(tmp_path, *paths, "vendor/thing.py", "node_modules/dep/index.js")
+        (tmp_path / ".gitignore").write_text("build/\n*.min.js\n")
+        (tmp_path / "gen" / ".notterignore").write_text("*.py\n!keep.py\n")
+        walker = Walker(str(tmp_path), [".py", ".js"], ["vendor"])
+
+        paths += ["vendor/thing.py", "node_modules/dep/index.js", "deleted.py", "README.md", "../outside.py"]
+        selected = walker.filter_paths(str(tmp_path / path) for path in paths)
+
+        assert [os.path.relpath(path, tmp_path) for path in selected] == [
+            "main.py",
+            "lib/util.js",
+            "gen/keep.py",
+            "deleted.py",
+        ]
+        assert sorted(selected) == sorted([*walker.walk(), str(tmp_path / "deleted.py")])
@@ -0,0 +1,129 @@
+import asyncio
+import contextlib
+import errno
+from collections.abc import AsyncIterator
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from notter.controller import NoteController
+from notter.walker import Walker
+from notter.watcher import RESCAN, InotifyWatcher, PollingWatcher, debounce
+
+inotify_only = pytest.mark.skipif(not InotifyWatcher.is_supported(), reason="inotify is not available")
+
+
+async def next_batch(batches: AsyncIterator[set[str] | None]) -> set[str] | None:
+    return await asyncio.wait_for(batches.__anext__(), timeout=5)
+
+
+class TestDebounce:
+    async def test_debounce(self) -> None:
+        queue: asyncio.Queue[str | None] = asyncio.Queue()
+        batches = debounce(queue, delay=0.05, max_delay=0.2)
+
+        for path in ("a.py", "b.py", "a.py"):
+            queue.put_nowait(path)
+        assert await next_batch(batches) == {"a.py", "b.py"}
+
+        queue.put_nowait("c.py")
+        queue.put_nowait(RESCAN)
+        assert await next_batch(batches) is RESCAN
+
+    async def test_debounce_max_delay(self) -> None:
+        queue: asyncio.Queue[str | None] = asyncio.Queue()
+        batches = debounce(queue, delay=0.05, max_delay=0.1)
+
+        async def keep_writing() -> None:
+            for idx in range(20):
+                queue.put_nowait(f"{idx}.py")
+                await asyncio.sleep(0.02)
+
+        writer = asyncio.create_task(keep_writing())
+        first = await next_batch(batches)
+        assert first is not None and 0 < len(first) < 20
+        writer.cancel()
+
+    async def test_debounce_quiet_period(self) -> None:
+        # Each batch ends on a timeout of the wait for the next path, well before the max delay
+        queue: asyncio.Queue[str | None] = asyncio.Queue()
+        batches = debounce(queue, delay=0.02, max_delay=5)
+
+        for path in ("a.py", "b.py", "c.py"):
+            queue.put_nowait(path)
+            assert await next_batch(batches) == {path}
+
+
+class TestWatchers:
+    @inotify_only
+    async def test_inotify_watcher(self, tmp_path: Path) -> None:
+        (tmp_path / "a.py").write_text("# TODO\n")
+        (tmp_path / ".gitignore").write_text("ignored/\n*.min.js\n")
+        batches = InotifyWatcher(Walker(str(tmp_path), [".py", ".js"]), delay=0.05).watch()
+
+        write = asyncio.get_running_loop().call_later(0.1, (tmp_path / "a.py").write_text, "# TODO: changed\n")
+        assert await next_batch(batches) == {str(tmp_path / "a.py")}
+        write.cancel()
+
+        (tmp_path / "ignored").mkdir()
+        (tmp_path / "ignored" / "x.py").write_text("# TODO\n")
+        (tmp_path / "lib.min.js").write_text("// TODO\n")
+        (tmp_path / "pkg" / "sub").mkdir(parents=True)
+        (tmp_path / "pkg" / "sub" / "b.py").write_text("# TODO\n")
+        (tmp_path / "a.py").unlink()
+        assert await next_batch(batches) == {str(tmp_path / "a.py"), str(tmp_path / "pkg" / "sub" / "b.py")}
+        await batches.aclose()  # type: ignore [attr-defined]
+
+    @inotify_only
+    async def test_inotify_watcher_out_of_watches(self, tmp_path: Path) -> None:
+        (tmp_path / "pkg").mkdir()
+        (tmp_path / "pkg" / "a.py").write_text("# TODO\n")
+        watcher = InotifyWatcher(Walker(str(tmp_path), [".py"]), delay=0.05, interval=0.05)
+        libc, watcher.libc = watcher.libc, MagicMock()
+        watcher.libc.inotify_init1 = libc.inotify_init1
+        # The root is watched, there are no watches left for pkg/
+        watcher.libc.inotify_add_watch = MagicMock(side_effect=[1, -1])
+        batches = watcher.watch()
+
+        with patch("notter.watcher.ctypes.get_errno", return_value=errno.ENOSPC):
+            write = asyncio.get_running_loop().call_later(0.2, (tmp_path / "pkg" / "a.py").write_text, "# TODO: x\n")
+            assert await next_batch(batches) == {str(tmp_path / "pkg" / "a.py")}
+        write.cancel()
+        assert watcher.out_of_watches
+        await batches.aclose()  # type: ignore [attr-defined]
+
+    async def test_polling_watcher(self, tmp_path: Path) -> None:
+        (tmp_path / "a.py").write_text("# TODO\n")
+        (tmp_path / "b.py").write_text("# TODO\n")
+        batches = PollingWatcher(Walker(str(tmp_path), [".py"]), interval=0.05).watch()
+
+        asyncio.get_running_loop().call_later(0.1, (tmp_path / "a.py").write_text, "# TODO: longer\n")
+        assert await next_batch(batches) == {str(tmp_path / "a.py")}
+
+        (tmp_path / "b.py").unlink()
+        (tmp_path / "c.py").write_text("# TODO\n")
+        assert await next_batch(batches) == {str(tmp_path / "b.py"), str(tmp_path / "c.py")}
+        await batches.aclose()  # type: ignore [attr-defined]
+
+
+class TestControllerWatch:
+    @pytest.mark.parametrize("polling", [False, True])
+    async def test_watch(self, note_controller: NoteController, polling: bool) -> None:
+        if not polling and not InotifyWatcher.is_supported():
+            pytest.skip("inotify is not available")
+
+        src_path = Path(note_controller.explorer.source_path)
+        src_path.mkdir(parents=True, exist_ok=True)
+        (src_path / "a.py").write_text("# TODO: first\n")
+
+        synced: asyncio.Queue[set[str] | None] = asyncio.Queue()
+        task = asyncio.create_task(note_controller.watch(["TODO"], polling, 0.05, synced.put_nowait))
+        await asyncio.sleep(0.2)
+        assert [note.content.text for note in note_controller.get_all()] == [" TODO: first"]
+
+        (src_path / "a.py").write_text("# TODO: second\n")
+        assert await asyncio.wait_for(synced.get(), timeout=5) == {str(src_path / "a.py")}
+        assert [note.content.text for note in note_controller.get_all()] == [" TODO: second"]
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task